@@ -0,0 +1,154 @@
+"""
+In-memory evaluation of CBAC entries.
+
+The CBAC entries of a user are loaded once per user object (ie. once per request, as
+request.user is created anew for each request) and claims are matched against them in
+memory. Loaded entries are also kept in the Django cache across requests.
+
+Changes to CBACEntry (see access.handlers) invalidate both caches: the in-process
+generation counter makes user objects of this process reload their entries, and the
+per-user version in the Django cache makes other processes miss the cross-request cache.
+"""
+
+from __future__ import annotations
+
+import itertools
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils.timezone import now
+
+from core.utils.transaction_utils import OnCommitBatch
+
+if TYPE_CHECKING:
+    from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
+
+    from .models.cbac_entry import Claims
+
+
+CBAC_CACHE_TIMEOUT = 10 * 60
+USER_ATTRIBUTE_NAME = "_cbac_cache"
+
+_generation = itertools.count()
+_current_generation = next(_generation)
+
+
+@dataclass(frozen=True)
+class CompiledEntry:
+    valid_from: datetime
+    valid_until: datetime
+    claims: frozenset[tuple[str, str]]
+
+    def is_valid(self, t: datetime) -> bool:
+        return self.valid_from <= t < self.valid_until
+
+    def matches(self, claims: frozenset[tuple[str, str]]) -> bool:
+        """
+        Mirrors claims__contained_by: all claims of the entry must be present in the request.
+        """
+        return self.claims <= claims
+
+
+@dataclass
+class UserCBACCache:
+    generation: int
+    entries: list[CompiledEntry]
+    decisions: dict[frozenset[tuple[str, str]], bool] = field(default_factory=dict)
+
+    def is_allowed(self, claims: Claims, t: datetime | None = None) -> bool:
+        claims_set = frozenset(claims.items())
+
+        # memoized decisions are only valid for the current time, and as this cache is
+        # request-scoped, the current time is close enough for the lifetime of the cache
+        if t is None and (decision := self.decisions.get(claims_set)) is not None:
+            return decision
+
+        t_ = t or now()
+        decision = any(entry.is_valid(t_) and entry.matches(claims_set) for entry in self.entries)
+
+        if t is None:
+            self.decisions[claims_set] = decision
+
+        return decision
+
+
+def _version_key(user_id: int) -> str:
+    return f"access:cbac_version:{user_id}"
+
+
+def _get_user_version(user_id: int) -> int:
+    key = _version_key(user_id)
+    # not starting from 0 so that an evicted version does not resurrect old entries
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key, 0)
+
+
+def _load_entries(user_id: int) -> list[CompiledEntry]:
+    from .models.cbac_entry import CBACEntry
+
+    key = f"access:cbac_entries:{user_id}:{_get_user_version(user_id)}"
+
+    entries: list[CompiledEntry] | None = cache.get(key)
+    if entries is None:
+        entries = [
+            CompiledEntry(
+                valid_from=valid_from,
+                valid_until=valid_until,
+                claims=frozenset(claims.items()),
+            )
+            for valid_from, valid_until, claims in CBACEntry.objects.filter(user_id=user_id).values_list(
+                "valid_from",
+                "valid_until",
+                "claims",
+            )
+        ]
+
+        # do not share entries that may yet be rolled back with other processes
+        if not connection.in_atomic_block:
+            cache.set(key, entries, CBAC_CACHE_TIMEOUT)
+
+    return entries
+
+
+def get_user_cbac_cache(user: AbstractBaseUser | AnonymousUser) -> UserCBACCache:
+    user_cache: UserCBACCache | None = getattr(user, USER_ATTRIBUTE_NAME, None)
+
+    if user_cache is None or user_cache.generation != _current_generation:
+        user_cache = UserCBACCache(generation=_current_generation, entries=_load_entries(user.pk))
+        setattr(user, USER_ATTRIBUTE_NAME, user_cache)
+
+    return user_cache
+
+
+def _bump_user_versions(user_ids: Iterable[int]):
+    for user_id in user_ids:
+        key = _version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # not in cache, so there is nothing cached under the current version either
+            pass
+
+
+_bump_user_versions_on_commit = OnCommitBatch[int](_bump_user_versions)
+
+
+def invalidate_cbac_cache(user_ids: Iterable[int]):
+    """
+    Call this when CBAC entries of the users are changed by means that do not send signals
+    (bulk_create, QuerySet.update).
+    """
+    global _current_generation  # noqa: PLW0603
+    _current_generation = next(_generation)
+
+    user_ids = set(user_ids)
+
+    # Bump now so that this transaction sees its own changes, and again on commit so that
+    # entries cached by other processes in the meantime (from before the commit) are discarded.
+    _bump_user_versions(user_ids)
+    _bump_user_versions_on_commit.add_many(user_ids)
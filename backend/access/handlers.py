@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cbac_cache import invalidate_cbac_cache
+from .models.cbac_entry import CBACEntry
+
+
+@receiver([post_save, post_delete], sender=CBACEntry)
+def cbac_entry_post_save(sender, instance: CBACEntry, **kwargs):
+    invalidate_cbac_cache([instance.user_id])
@@ -1,19 +1,23 @@
 import logging
 from datetime import datetime, timedelta
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import HStoreField
-from django.db import models
+from django.db import models, transaction
 from django.utils.timezone import now
 
-from core.utils import get_objects_within_period, log_get_or_create
-from event_log_v2.utils.emit import emit
+from core.utils import get_objects_within_period
+from event_log_v2.utils.emit import buffered_emit, emit
 from intra.constants import SUPPORTED_APPS
 
+from ..cbac_cache import get_user_cbac_cache, invalidate_cbac_cache
 from ..constants import CBAC_VALID_AFTER_EVENT_DAYS
 
+if TYPE_CHECKING:
+    from core.models import Event
+
 Claims = dict[str, str]
 logger = logging.getLogger("kompassi")
 
@@ -82,10 +86,14 @@ class CBACEntry(models.Model):
 
     @classmethod
     def is_allowed(cls, user: AbstractUser, claims: Claims, t: datetime | None = None):
+        """
+        Evaluated in memory against the CBAC entries of the user, which are loaded once per request.
+        See access.cbac_cache.
+        """
         if not user.is_authenticated:
             return False
 
-        return cls.get_entries(user, claims, t=t).exists()
+        return get_user_cbac_cache(user).is_allowed(claims, t=t)
 
     @classmethod
     def ensure_admin_group_privileges(cls, t: datetime | None = None):
@@ -94,8 +102,7 @@ class CBACEntry(models.Model):
         if t is None:
             t = now()
 
-        for event in Event.objects.filter(end_time__gte=t):
-            cls.ensure_admin_group_privileges_for_event(event, t=t)
+        cls.ensure_admin_group_privileges_for_events(Event.objects.filter(end_time__gte=t), t=t)
 
     @classmethod
     def ensure_admin_group_privileges_for_event(
@@ -105,66 +112,123 @@ class CBACEntry(models.Model):
         t: datetime | None = None,
         request=None,
     ):
+        from core.models import Event
+
+        cls.ensure_admin_group_privileges_for_events(Event.objects.filter(id=event.id), t=t, request=request)
+
+    cbac_entry_batch_size = 500
+
+    @classmethod
+    @transaction.atomic
+    def ensure_admin_group_privileges_for_events(
+        cls,
+        events: models.QuerySet["Event"],
+        *,
+        t: datetime | None = None,
+        request=None,
+    ):
+        """
+        Makes the CBAC entries granted by the admin groups of the events match the members of those groups.
+        The desired set of entries is computed and diffed against the existing ones in a fixed number of queries
+        regardless of the number of events. Changes are applied in bulk.
+        """
+        from django.contrib.auth.models import Group, User
+
         if t is None:
             t = now()
 
-        for app_name in SUPPORTED_APPS:
-            meta = event.get_app_event_meta(app_name)
-
-            if not meta:
-                continue
+        app_names = [app_name for app_name in SUPPORTED_APPS if app_name in settings.INSTALLED_APPS]
+        events = events.select_related("organization", *(f"{app_name}eventmeta" for app_name in app_names))
+
+        # admin group id -> claims and validity of entries granted by it
+        claims_by_group_id: dict[int, tuple[Claims, datetime]] = {}
+        for event in events:
+            for app_name in app_names:
+                if meta := event.get_app_event_meta(app_name):
+                    claims_by_group_id.setdefault(
+                        meta.admin_group_id,
+                        (
+                            {
+                                "organization": event.organization.slug,
+                                # omit "event" to give permissions also to other events of same organizer
+                                # "event": event.slug,
+                                "app": app_name,
+                            },
+                            event.end_time + timedelta(CBAC_VALID_AFTER_EVENT_DAYS),
+                        ),
+                    )
 
-            admin_group = meta.admin_group
-            admin_group_members = admin_group.user_set.all()
+        group_ids = list(claims_by_group_id)
+        desired = set(User.groups.through.objects.filter(group_id__in=group_ids).values_list("user_id", "group_id"))
+        existing = {
+            (user_id, group_id): entry_id
+            for entry_id, user_id, group_id in cls.objects.filter(granted_by_group_id__in=group_ids).values_list(
+                "id", "user_id", "granted_by_group_id"
+            )
+        }
 
+        with buffered_emit():
             # remove access from those who should not have it
-            entries_to_remove = cls.objects.filter(granted_by_group=admin_group).exclude(user__in=admin_group_members)
+            entries_to_remove = cls.objects.filter(
+                id__in=[entry_id for key, entry_id in existing.items() if key not in desired]
+            ).select_related("user", "granted_by_group")
             for cbac_entry in entries_to_remove:
                 emit(
                     "access.cbacentry.deleted",
                     request=request,
                     other_fields=cbac_entry.as_dict(),
                 )
-            entries_to_remove.delete()
+            num_removed, _ = entries_to_remove.delete()
 
             # add access to those who should have it but do not yet have
-            for user in admin_group_members:
-                cbac_entry, created = cls.objects.get_or_create(
-                    user=user,
-                    granted_by_group=admin_group,
-                    defaults=dict(
+            keys_to_add = sorted(desired - existing.keys())
+            users = User.objects.in_bulk({user_id for user_id, _ in keys_to_add})
+            groups = Group.objects.in_bulk({group_id for _, group_id in keys_to_add})
+            entries_to_add = []
+            for user_id, group_id in keys_to_add:
+                claims, valid_until = claims_by_group_id[group_id]
+                entries_to_add.append(
+                    cls(
+                        user=users[user_id],
+                        granted_by_group=groups[group_id],
                         valid_from=t,
-                        valid_until=event.end_time + timedelta(CBAC_VALID_AFTER_EVENT_DAYS),
-                        claims={
-                            "organization": event.organization.slug,
-                            # omit "event" to give permissions also to other events of same organizer
-                            # "event": event.slug,
-                            "app": app_name,
-                        },
+                        valid_until=valid_until,
+                        claims=claims,
                         created_by=request.user if request else None,
-                    ),
-                )
-                log_get_or_create(logger, cbac_entry, created)
-                if created:
-                    emit(
-                        "access.cbacentry.created",
-                        request=request,
-                        other_fields=cbac_entry.as_dict(),
                     )
+                )
+
+            cls.objects.bulk_create(entries_to_add, batch_size=cls.cbac_entry_batch_size)
+            invalidate_cbac_cache(users.keys())
+
+            for cbac_entry in entries_to_add:
+                emit(
+                    "access.cbacentry.created",
+                    request=request,
+                    other_fields=cbac_entry.as_dict(),
+                )
+
+        logger.info(
+            "Admin group privileges for %d groups: created %d and removed %d CBAC entries",
+            len(group_ids),
+            len(entries_to_add),
+            num_removed,
+        )
 
     @classmethod
     def prune_expired(cls, *, t: datetime | None = None, request=None):
         if t is None:
             t = now()
 
-        expired_entries = cls.objects.filter(valid_until__lte=t)
+        expired_entries = cls.objects.filter(valid_until__lte=t).select_related("user", "granted_by_group")
         logger.info("Removing %d CBAC entries expired on or before %s", expired_entries.count(), t.isoformat())
 
-        for cbac_entry in expired_entries:
-            emit(
-                "access.cbacentry.deleted",
-                request=request,
-                other_fields=cbac_entry.as_dict(),
-            )
+        with transaction.atomic(), buffered_emit():
+            for cbac_entry in expired_entries:
+                emit(
+                    "access.cbacentry.deleted",
+                    request=request,
+                    other_fields=cbac_entry.as_dict(),
+                )
 
-        expired_entries.delete()
+            expired_entries.delete()
@@ -1,3 +1,4 @@
+from datetime import UTC, datetime, timedelta
 from unittest import TestCase as NonDatabaseTestCase
 
 import pytest
@@ -8,6 +9,7 @@ from core.models.event import Event
 from event_log_v2.models.entry import Entry
 from labour.models import LabourEventMeta
 
+from .cbac_cache import CompiledEntry, UserCBACCache
 from .email_aliases import firstname_surname
 from .models import CBACEntry, Claims, EmailAlias, EmailAliasType, GroupEmailAliasGrant
 from .utils import emailify
@@ -111,3 +113,24 @@ def test_ensure_admin_group_privileges():
 
     assert not CBACEntry.is_allowed(person.user, get_claims(event, "labour"))
     assert not CBACEntry.is_allowed(person.user, get_claims(event, "programme"))
+
+
+def test_user_cbac_cache():
+    t = datetime(2024, 7, 1, tzinfo=UTC)
+    user_cache = UserCBACCache(
+        generation=0,
+        entries=[
+            CompiledEntry(
+                valid_from=t - timedelta(days=1),
+                valid_until=t + timedelta(days=1),
+                claims=frozenset(dict(organization="tracon-ry", app="labour").items()),
+            ),
+        ],
+    )
+
+    assert user_cache.is_allowed(dict(organization="tracon-ry", app="labour", event="tracon2024"), t=t)
+    assert not user_cache.is_allowed(dict(organization="tracon-ry", app="programme"), t=t)
+    assert not user_cache.is_allowed(dict(organization="tracon-ry"), t=t)
+
+    # valid_until is exclusive
+    assert not user_cache.is_allowed(dict(organization="tracon-ry", app="labour"), t=t + timedelta(days=1))
@@ -279,6 +279,8 @@ class Badge(models.Model, CsvExportMixin):
 
         return perks, True
 
+    csv_prefetch_related = ("personnel_class",)
+
     @classmethod
     def get_csv_fields(cls, event):
         return [
@@ -1,8 +1,11 @@
 from collections import namedtuple
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import batched
+from typing import Any
 
 import unicodecsv as csv
 from django.db import models
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 ENCODING = "ISO-8859-15"
 
@@ -31,7 +34,16 @@ CSV_EXPORT_FORMATS = dict(
 )
 
 
+# rows are exported in batches of this many instances, related objects being loaded in bulk per batch
+EXPORT_BATCH_SIZE = 500
+
+M2MChoicesCache = dict[tuple[int, str, str], list[models.Model]]
+
+
 class CsvExportMixin:
+    # lookups passed to prefetch_related_objects for each batch of exported instances
+    csv_prefetch_related: Sequence[str] = ()
+
     @classmethod
     def get_csv_fields(cls, event):
         return [
@@ -43,7 +55,22 @@ class CsvExportMixin:
         return dict()
 
     @classmethod
-    def get_csv_header(cls, event, fields=None, m2m_mode="separate_columns"):
+    def prefetch_csv_related(cls, event, instances: list):
+        """
+        Called for each batch of exported instances before their rows are produced. Override to load
+        in bulk whatever get_csv_related of the instances would otherwise load one instance at a time.
+        """
+        if cls.csv_prefetch_related:
+            models.prefetch_related_objects(instances, *cls.csv_prefetch_related)
+
+    @classmethod
+    def get_csv_header(
+        cls,
+        event,
+        fields=None,
+        m2m_mode="separate_columns",
+        m2m_choices: M2MChoicesCache | None = None,
+    ):
         if fields is None:
             fields = cls.get_csv_fields(event)
 
@@ -59,7 +86,7 @@ class CsvExportMixin:
 
             if field_type == models.ManyToManyField:
                 if m2m_mode == "separate_columns":
-                    choices = get_m2m_choices(event, field)
+                    choices = get_m2m_choices(event, field, m2m_choices)
                     header_row.extend(f"{field_name}: {choice.__str__()}" for choice in choices)
                 elif m2m_mode == "comma_separated":
                     header_row.append(field_name)
@@ -70,9 +97,17 @@ class CsvExportMixin:
 
         return header_row
 
-    def get_csv_row(self, event, fields, m2m_mode="separate_columns"):
+    def get_csv_row(
+        self,
+        event,
+        fields,
+        m2m_mode="separate_columns",
+        m2m_choices: M2MChoicesCache | None = None,
+        related: dict | None = None,
+    ):
         result_row = []
-        related = self.get_csv_related()
+        if related is None:
+            related = self.get_csv_related()
 
         for model, field in fields:
             if isinstance(field, str):
@@ -90,10 +125,12 @@ class CsvExportMixin:
             field_value = getattr(source_instance, field_name) if source_instance is not None else None
 
             if field_type is models.ManyToManyField and field_value is not None:
+                # .all() is served from the prefetch cache when export_rows has prefetched the field
                 if m2m_mode == "separate_columns":
-                    choices = get_m2m_choices(event, field)
+                    choices = get_m2m_choices(event, field, m2m_choices)
+                    selected_pks = {item.pk for item in field_value.all()}
 
-                    result_row.extend(field_value.filter(pk=choice.pk).exists() for choice in choices)
+                    result_row.extend(choice.pk in selected_pks for choice in choices)
                 elif m2m_mode == "comma_separated":
                     result_row.append(", ".join(item.__str__() for item in field_value.all()))
                 else:
@@ -112,22 +149,99 @@ class CsvExportMixin:
         return result_row
 
 
-def get_m2m_choices(event, field):
+def get_m2m_choices(event, field, cache: M2MChoicesCache | None = None) -> list[models.Model]:
+    """
+    Returns the choices of a many-to-many field that get a column each in separate_columns mode.
+    Pass the same cache dict for the duration of one export so that the choices are only fetched
+    once and the header and the rows agree on them.
+    """
     target_model = field.related_model
     cache_key = (event.id, target_model._meta.app_label, target_model._meta.model_name)
 
-    if cache_key not in get_m2m_choices.cache:
-        if any(f.name == "event" for f in target_model._meta.fields):
-            choices = target_model.objects.filter(event=event)
-        else:
-            choices = target_model.objects.all()
+    if cache is not None and cache_key in cache:
+        return cache[cache_key]
+
+    if any(f.name == "event" for f in target_model._meta.fields):
+        choices = target_model.objects.filter(event=event)
+    else:
+        choices = target_model.objects.all()
+
+    choices = list(choices.order_by("pk"))
+
+    if cache is not None:
+        cache[cache_key] = choices
+
+    return choices
+
+
+def iter_batches(model, model_instances, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    """
+    Splits model_instances into lists of at most batch_size instances. Querysets are iterated in
+    chunks instead of being loaded into memory at once. Primary keys are fetched in bulk.
+    """
+    if isinstance(model_instances, models.QuerySet):
+        model_instances = model_instances.iterator(chunk_size=batch_size)
+
+    for batch in batched(model_instances, batch_size):
+        batch = list(batch)
+
+        if pks := [int(instance) for instance in batch if isinstance(instance, str | int)]:
+            instances_by_pk = model.objects.in_bulk(pks)
+            batch = [
+                instances_by_pk[int(instance)] if isinstance(instance, str | int) else instance for instance in batch
+            ]
+
+        yield batch
+
+
+def prefetch_m2m_fields(fields, instances: list, related_by_instance: list[dict]):
+    """
+    Prefetches the many-to-many fields that are exported for a batch of instances, grouped by the
+    model (ie. the instance itself or one of its get_csv_related objects) the field is read from.
+    """
+    field_names_by_model: dict[Any, set[str]] = {}
+    for model, field in fields:
+        if type(field) is models.ManyToManyField:
+            field_names_by_model.setdefault(model, set()).add(field.name)
+
+    for model, field_names in field_names_by_model.items():
+        sources = {}
+        for instance, related in zip(instances, related_by_instance, strict=True):
+            source_instance = related.get(model) if model in related else instance
+
+            # unsaved instances (eg. placeholder signup extras) have no relations to prefetch
+            if isinstance(source_instance, models.Model) and source_instance.pk is not None:
+                sources[id(source_instance)] = source_instance
 
-        get_m2m_choices.cache[cache_key] = choices.order_by("pk")
+        if sources:
+            models.prefetch_related_objects(list(sources.values()), *sorted(field_names))
 
-    return get_m2m_choices.cache[cache_key]
 
+def export_rows(
+    event,
+    model,
+    model_instances,
+    fields,
+    m2m_mode="separate_columns",
+    m2m_choices: M2MChoicesCache | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[list]:
+    """
+    Yields the CSV rows (without the header) of model_instances. Related objects and many-to-many
+    fields are loaded for a batch of instances at a time, so the number of queries depends on the
+    number of batches instead of the number of instances.
+    """
+    if m2m_choices is None:
+        m2m_choices = {}
 
-get_m2m_choices.cache = {}
+    for batch in iter_batches(model, model_instances, batch_size):
+        model.prefetch_csv_related(event, batch)
+
+        related_by_instance = [instance.get_csv_related() for instance in batch]
+        prefetch_m2m_fields(fields, batch, related_by_instance)
+
+        for instance, related in zip(batch, related_by_instance, strict=True):
+            yield instance.get_csv_row(event, fields, m2m_mode, m2m_choices, related)
 
 
 def write_row(event, writer, fields, model_instance, m2m_mode):
@@ -144,41 +258,95 @@ def make_writer(output_stream, dialect):
         return csv.writer(output_stream, encoding=ENCODING, dialect=dialect, errors="ignore")
 
 
-def export_csv(event, model, model_instances, output_file, m2m_mode="separate_columns", dialect="excel-tab"):
+def get_export_fields(event, model, model_instances):
     # XXX Horrible hack.
     try:
         # EventSurveys force us to get this from an instance instead of the model class because they may differ
-        fields = model_instances[0].get_csv_fields(event)
+        return model_instances[0].get_csv_fields(event)
     except IndexError:
         # empty set, use the old way
-        fields = model.get_csv_fields(event)
-    writer = make_writer(output_file, dialect)
-    writer.writerow(model.get_csv_header(event, fields, m2m_mode))
+        return model.get_csv_fields(event)
+
 
-    for model_instance in model_instances:
-        if isinstance(model_instance, str | int):
-            model_instance = model.objects.get(pk=int(model_instances))
+def iter_export(event, model, model_instances, m2m_mode="separate_columns") -> Iterator[list]:
+    """
+    Yields the header row and the rows of model_instances, for use with csv_streaming_response.
+    """
+    fields = get_export_fields(event, model, model_instances)
+
+    # per export so that choices added since the last export show up
+    m2m_choices: M2MChoicesCache = {}
+
+    yield model.get_csv_header(event, fields, m2m_mode, m2m_choices)
+    yield from export_rows(event, model, model_instances, fields, m2m_mode, m2m_choices)
+
+
+def export_csv(event, model, model_instances, output_file, m2m_mode="separate_columns", dialect="excel-tab"):
+    writer = make_writer(output_file, dialect)
 
-        write_row(event, writer, fields, model_instance, m2m_mode)
+    for row in iter_export(event, model, model_instances, m2m_mode):
+        writer.writerow(row)
 
     if getattr(writer, "must_close", False):
         writer.close()
 
 
-CONTENT_TYPES = dict(
-    xlsx="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-)
+class Echo:
+    """
+    A file-like object that returns whatever is written into it instead of storing it.
+    Makes csv.writer().writerow return the encoded row for use in streaming responses.
+    """
 
+    def write(self, value):
+        return value
 
-def csv_response(*args, **kwargs):
-    filename = kwargs.pop("filename")
-    dialect = kwargs.get("dialect", "excel")
 
-    response = HttpResponse(content_type=CONTENT_TYPES.get(dialect, "text/csv"))
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+def iter_csv_rows(rows: Iterable[Sequence[Any]], dialect: str, encoding: str = ENCODING) -> Iterator[bytes]:
+    writer = csv.writer(Echo(), encoding=encoding, dialect=dialect, errors="ignore")
+
+    for row in rows:
+        yield writer.writerow(row)
+
 
-    kwargs["output_file"] = response
+def csv_streaming_response(
+    rows: Iterable[Sequence[Any]],
+    filename: str,
+    dialect: str = "excel",
+    encoding: str = ENCODING,
+):
+    """
+    Takes an iterable of rows (including the header row) and sends them as they are produced.
+    Pass a generator that iterates the queryset in chunks (such as iter_export) to keep memory
+    use bounded. For XLSX, see core.excel_export.xlsx_file_response.
+    """
+    if dialect == "xlsx":
+        from .excel_export import xlsx_file_response
+
+        return xlsx_file_response(rows, filename)
 
-    export_csv(*args, **kwargs)
+    response = StreamingHttpResponse(
+        iter_csv_rows(rows, dialect, encoding),
+        content_type=f"text/csv; charset={encoding}",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
 
     return response
+
+
+def csv_response(
+    event,
+    model,
+    model_instances,
+    filename: str,
+    m2m_mode="separate_columns",
+    dialect="excel",
+):
+    """
+    Exports model_instances (a queryset, preferably) of a model using CsvExportMixin.
+    The rows are produced while the response is being sent (see csv_streaming_response).
+    """
+    return csv_streaming_response(
+        iter_export(event, model, model_instances, m2m_mode),
+        filename=filename,
+        dialect=dialect,
+    )
@@ -1,6 +1,12 @@
 import io
+import tempfile
+from collections.abc import Iterable, Sequence
+from typing import Any
 
 import xlsxwriter
+from django.http import FileResponse
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
 class XlsxWriter:
@@ -9,16 +15,26 @@ class XlsxWriter:
 
     Must .close() to get the data actually written. Use getattr(writer, 'must_close', False)
     to distinguish from an actual csv.writer.
+
+    With constant_memory=True, rows are flushed to disk as they are written (so they must be
+    written in order) and the workbook is written directly into output_stream, which must then
+    be a binary file object.
     """
 
-    def __init__(self, output_stream):
+    def __init__(self, output_stream, constant_memory: bool = False):
         self.row = 0
         self.output_stream = output_stream
-        self.buf = io.BytesIO()
-        self.workbook = xlsxwriter.Workbook(self.buf)
-        self.worksheet = self.workbook.add_worksheet()
         self.must_close = True
 
+        if constant_memory:
+            self.buf = None
+            self.workbook = xlsxwriter.Workbook(output_stream, {"constant_memory": True})
+        else:
+            self.buf = io.BytesIO()
+            self.workbook = xlsxwriter.Workbook(self.buf)
+
+        self.worksheet = self.workbook.add_worksheet()
+
     def writerow(self, row):
         for col, value in enumerate(row):
             if isinstance(value, str):
@@ -34,6 +50,31 @@ class XlsxWriter:
 
     def close(self):
         self.workbook.close()
-        self.buf.seek(0)
-        self.output_stream.write(self.buf.read())
-        self.buf.close()
+
+        if self.buf is not None:
+            self.buf.seek(0)
+            self.output_stream.write(self.buf.read())
+            self.buf.close()
+
+
+def xlsx_file_response(rows: Iterable[Sequence[Any]], filename: str) -> FileResponse:
+    """
+    Writes rows into a constant memory workbook backed by a temporary file and streams
+    the file as the response body. Memory use does not depend on the number of rows.
+    """
+    temp_file = tempfile.TemporaryFile()
+
+    writer = XlsxWriter(temp_file, constant_memory=True)
+    for row in rows:
+        writer.writerow(row)
+    writer.close()
+
+    temp_file.seek(0)
+
+    # FileResponse closes the temporary file (thus deleting it) when done
+    return FileResponse(
+        temp_file,
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE,
+    )
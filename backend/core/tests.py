@@ -6,6 +6,7 @@ from django.test import TestCase
 from django.utils.timezone import get_current_timezone
 
 from core.utils.time_utils import format_date_range
+from core.utils.transaction_utils import OnCommitBatch
 
 from .utils import format_interval, full_hours_between, slugify
 
@@ -122,3 +123,14 @@ class UtilsTestCase(TestCase):
         assert format_interval(d0, d1, locale=locale) == "ke 27.4. 21.00–23.00"
 
         assert format_interval(d0, d2, locale=locale) == "ke 27.4. 21.00 – to 28.4. 1.00"
+
+    def test_on_commit_batch(self):
+        flushed: list[set[int]] = []
+        batch = OnCommitBatch[int](flushed.append)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            batch.add(1)
+            batch.add(2, 1)
+            batch.add_many([3])
+
+        assert flushed == [{1, 2, 3}]
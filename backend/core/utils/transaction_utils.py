@@ -0,0 +1,56 @@
+import threading
+from collections.abc import Callable, Hashable, Iterable
+from typing import Generic, TypeVar
+
+from django.db import transaction
+
+T = TypeVar("T", bound=Hashable)
+
+
+class OnCommitBatch(Generic[T]):
+    """
+    Coalesces work requested during a transaction into a single call made when it commits.
+
+    Keys passed to `add` are collected and `flush` is called once with all of them after the
+    outermost transaction commits. Outside a transaction, `flush` is called immediately.
+
+        refresh_programs = OnCommitBatch(lambda program_ids: ...)
+        refresh_programs.add(program.id)
+
+    If a transaction is rolled back, the keys added within it are flushed along with those
+    of the next transaction that commits. This is fine for idempotent work such as refreshing
+    denormalized fields, which is what this is intended for.
+    """
+
+    def __init__(self, flush: Callable[[set[T]], None]):
+        self._flush = flush
+        self._local = threading.local()
+
+    @property
+    def pending(self) -> set[T]:
+        try:
+            return self._local.pending
+        except AttributeError:
+            self._local.pending = set()
+            return self._local.pending
+
+    def add(self, *keys: T):
+        self.add_many(keys)
+
+    def add_many(self, keys: Iterable[T]):
+        self.pending.update(keys)
+
+        # Registering a callback per add (instead of only the first) makes sure a callback
+        # is around even if an earlier one was discarded by a rollback. All but the first
+        # find nothing to do.
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        pending = self.pending
+        if not pending:
+            return
+
+        keys = set(pending)
+        pending.clear()
+
+        self._flush(keys)
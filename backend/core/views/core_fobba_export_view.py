@@ -1,11 +1,10 @@
 from django.contrib.auth.decorators import user_passes_test
-from django.http import HttpResponse
 from django.utils.timezone import now
 from django.views.decorators.http import require_safe
 from paikkala.models import Ticket
 
 from badges.models import Badge
-from core.excel_export import XlsxWriter
+from core.excel_export import xlsx_file_response
 from core.models import Event
 from event_log_v2.utils.emit import emit
 from tickets.models import Order
@@ -24,24 +23,25 @@ def core_fobba_export_view(request, event_slug, format="xlsx"):
         other_fields=dict(filename=filename),
     )
 
-    response = HttpResponse()
-    response["content-type"] = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    writer = XlsxWriter(response)
-    writer.writerow(
-        [
-            "surname",
-            "first_name",
-            "email",
-            "phone_number",
-            "role",
-            "role_extra",
-        ]
-    )
+    return xlsx_file_response(iter_rows(event), filename)
+
+
+def iter_rows(event):
+    yield [
+        "surname",
+        "first_name",
+        "email",
+        "phone_number",
+        "role",
+        "role_extra",
+    ]
 
     seen = set()
 
-    for badge in Badge.objects.filter(personnel_class__event=event, revoked_at__isnull=True):
+    for badge in Badge.objects.filter(personnel_class__event=event, revoked_at__isnull=True).select_related(
+        "person",
+        "personnel_class",
+    ):
         id_fields = (
             badge.surname,
             badge.first_name,
@@ -53,20 +53,18 @@ def core_fobba_export_view(request, event_slug, format="xlsx"):
             continue
 
         seen.add(id_fields)
-        writer.writerow(
-            [
-                *id_fields,
-                badge.personnel_class_name,
-                badge.job_title,
-            ]
-        )
+        yield [
+            *id_fields,
+            badge.personnel_class_name,
+            badge.job_title,
+        ]
 
     for order in Order.objects.filter(
         event=event,
         confirm_time__isnull=False,
         payment_date__isnull=False,
         cancellation_time__isnull=True,
-    ):
+    ).select_related("customer"):
         customer = order.customer
         if not customer:
             raise AssertionError("customer missing")
@@ -82,15 +80,15 @@ def core_fobba_export_view(request, event_slug, format="xlsx"):
             continue
 
         seen.add(id_fields)
-        writer.writerow(
-            [
-                *id_fields,
-                "Lipun ostaja",
-                order.formatted_order_products,
-            ]
-        )
+        yield [
+            *id_fields,
+            "Lipun ostaja",
+            order.formatted_order_products,
+        ]
 
-    for ticket in Ticket.objects.filter(program__kompassi_programme__category__event=event):
+    for ticket in Ticket.objects.filter(program__kompassi_programme__category__event=event).select_related(
+        "user__person",
+    ):
         person = ticket.user.person  # type: ignore
 
         id_fields = (
@@ -104,13 +102,8 @@ def core_fobba_export_view(request, event_slug, format="xlsx"):
             continue
 
         seen.add(id_fields)
-        writer.writerow(
-            [
-                *id_fields,
-                "Paikkalipun varaaja",
-                "",
-            ]
-        )
-
-    writer.close()
-    return response
+        yield [
+            *id_fields,
+            "Paikkalipun varaaja",
+            "",
+        ]
@@ -0,0 +1,21 @@
+from celery.signals import task_postrun, task_prerun
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Subscription
+from .utils.emit import invalidate_subscriptions, start_buffering, stop_buffering
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def subscription_post_save(sender, instance: Subscription, **kwargs):
+    invalidate_subscriptions()
+
+
+@task_prerun.connect
+def task_prerun_start_buffering(**kwargs):
+    start_buffering()
+
+
+@task_postrun.connect
+def task_postrun_stop_buffering(**kwargs):
+    stop_buffering()
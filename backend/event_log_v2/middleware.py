@@ -0,0 +1,14 @@
+from .utils.emit import buffered_emit
+
+
+class EventLogBufferMiddleware:
+    """
+    Saves event log entries emitted during a request in one go at the end of the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_emit():
+            return self.get_response(request)
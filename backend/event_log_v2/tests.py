@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.test import TestCase
+
+from .models import Entry
+from .utils.emit import emit, start_buffering, stop_buffering
+
+ENTRY_TYPE = "event_log_v2.entry.partition_created"
+
+
+class EmitTestCase(TestCase):
+    def setUp(self):
+        Entry.ensure_partitions()
+
+    def get_saved(self):
+        return set(
+            Entry.objects.filter(entry_type=ENTRY_TYPE).values_list("other_fields__partition_name", flat=True),
+        )
+
+    def test_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            emit(ENTRY_TYPE, partition_name="first")
+            emit(ENTRY_TYPE, partition_name="second")
+
+            # not saved until the transaction commits
+            assert not self.get_saved()
+
+        assert self.get_saved() == {"first", "second"}
+
+    def test_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            emit(ENTRY_TYPE, partition_name="committed")
+
+            try:
+                with transaction.atomic():
+                    emit(ENTRY_TYPE, partition_name="rolled back")
+                    raise ValueError("roll back")
+            except ValueError:
+                pass
+
+        assert self.get_saved() == {"committed"}
+
+        # the rolled back entry must not be saved by a later commit either
+        with self.captureOnCommitCallbacks(execute=True):
+            emit(ENTRY_TYPE, partition_name="later")
+
+        assert self.get_saved() == {"committed", "later"}
+
+    def test_buffered_flush(self):
+        start_buffering()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            emit(ENTRY_TYPE, partition_name="first")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            emit(ENTRY_TYPE, partition_name="second")
+
+        # committed, but saved only when the buffering scope ends
+        assert not self.get_saved()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stop_buffering()
+
+        assert self.get_saved() == {"first", "second"}
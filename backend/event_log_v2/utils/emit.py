@@ -1,13 +1,137 @@
-import logging
+from __future__ import annotations
 
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import partial
+from typing import TYPE_CHECKING
+
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.http import HttpRequest
 
 from core.utils import get_ip
 
+if TYPE_CHECKING:
+    from ..models import Entry, Subscription
+
 logger = logging.getLogger("kompassi")
 
+# Subscriptions change rarely. Changes made in this process invalidate the cache immediately,
+# those made in other processes are picked up within this many seconds.
+SUBSCRIPTION_CACHE_TTL_SECONDS = 60
+
+
+class _SubscriptionCache:
+    subscriptions_by_entry_type: dict[str, list[Subscription]] | None = None
+    loaded_at: float = 0.0
+    lock = threading.Lock()
+
+
+def get_subscriptions(entry_type: str) -> list[Subscription]:
+    """
+    Returns the subscriptions for the entry type from an in-process cache of all subscriptions.
+    """
+    from ..models import Subscription
+
+    with _SubscriptionCache.lock:
+        subscriptions_by_entry_type = _SubscriptionCache.subscriptions_by_entry_type
+        if (
+            subscriptions_by_entry_type is None
+            or time.monotonic() - _SubscriptionCache.loaded_at > SUBSCRIPTION_CACHE_TTL_SECONDS
+        ):
+            subscriptions_by_entry_type = defaultdict(list)
+            for subscription in Subscription.objects.all():
+                subscriptions_by_entry_type[subscription.entry_type].append(subscription)
+
+            _SubscriptionCache.subscriptions_by_entry_type = subscriptions_by_entry_type
+            _SubscriptionCache.loaded_at = time.monotonic()
+
+    return subscriptions_by_entry_type.get(entry_type, [])
+
+
+def invalidate_subscriptions():
+    with _SubscriptionCache.lock:
+        _SubscriptionCache.subscriptions_by_entry_type = None
+
+
+class _Buffer(threading.local):
+    depth = 0
+
+    def __init__(self):
+        # entries whose transaction has been committed (or that were emitted outside of one)
+        self.entries: list[Entry] = []
+
+
+_buffer = _Buffer()
+
+
+def _commit_entry(entry: Entry):
+    """
+    Registered as the on_commit callback of each entry emitted within a transaction.
+    If the transaction (or the savepoint the entry was emitted in) is rolled back,
+    Django discards the callback along with the entry.
+    """
+    _buffer.entries.append(entry)
+    if _buffer.depth == 0:
+        flush()
+
+
+def start_buffering():
+    _buffer.depth += 1
+
+
+def stop_buffering():
+    """
+    Flushes buffered entries when the outermost buffering scope ends.
+    """
+    _buffer.depth = max(_buffer.depth - 1, 0)
+    if _buffer.depth == 0:
+        # runs right away if not in a transaction
+        transaction.on_commit(flush)
+
+
+@contextmanager
+def buffered_emit() -> Iterator[None]:
+    """
+    Entries emitted within this context are saved in one go when it exits.
+
+        with buffered_emit():
+            for thing in things:
+                emit("app.thing.created", thing=thing.id)
+
+    Used per request by EventLogBufferMiddleware and per Celery task by the handlers
+    of this app.
+    """
+    start_buffering()
+    try:
+        yield
+    finally:
+        stop_buffering()
+
+
+def flush():
+    """
+    Saves buffered entries with a single INSERT and notifies their subscribers.
+    """
+    from ..models import Entry
+
+    if not _buffer.entries:
+        return
+
+    entries = _buffer.entries
+    _buffer.entries = []
+
+    Entry.objects.bulk_create(entries)
+
+    for entry in entries:
+        for subscription in get_subscriptions(entry.entry_type):
+            subscription.send_update_for_entry(entry)
+
 
 def log_creations(model, **extra_kwargs_for_emit):
     """
@@ -60,8 +184,12 @@ def emit(entry_type: str, **kwargs):
     `kwargs` are passed to the Entry constructor with the exception of the following special kwargs:
 
     * `request`: If present, sets fields that can be deduced from the request.
+
+    The entry is not saved right away if emitted within a transaction (it is saved when that
+    commits, or discarded if it is rolled back) or within `buffered_emit` (it is saved when that
+    exits, or when the transaction commits if that is later).
     """
-    from ..models import Entry, Subscription
+    from ..models import Entry
 
     if request := kwargs.pop("request", None):
         kwargs = dict(attrs_from_request(request), **kwargs)
@@ -71,7 +199,6 @@ def emit(entry_type: str, **kwargs):
     kwargs, other_fields = Entry.hoist(kwargs)
 
     entry = Entry(entry_type=entry_type, other_fields=other_fields, **kwargs)
-    entry.save()
 
-    for subscription in Subscription.objects.filter(entry_type=entry_type):
-        subscription.send_update_for_entry(entry)
+    # runs right away if not in a transaction
+    transaction.on_commit(partial(_commit_entry, entry))
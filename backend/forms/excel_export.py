@@ -1,4 +1,4 @@
-from collections.abc import Collection, Sequence
+from collections.abc import Collection, Iterator, Sequence
 from typing import Any, BinaryIO
 
 from django.db import models
@@ -9,6 +9,8 @@ from .models.dimension import Dimension
 from .models.field import Field, FieldType
 from .models.response import Response
 
+EXPORT_CHUNK_SIZE = 500
+
 
 def get_header_cells(field: Field) -> list[str]:
     header_cells: list[str] = []
@@ -52,25 +54,41 @@ def get_response_cells(field: Field, values: dict[str, Any]) -> list[Any]:
     return cells
 
 
-def write_responses_as_excel(
-    dimensions: Collection[Dimension],
-    fields: Sequence[Field],
-    responses: models.QuerySet[Response],
-    output_stream: BinaryIO | HttpResponse,
-):
-    from core.excel_export import XlsxWriter
-
+def get_export_fields(fields: Sequence[Field]) -> list[Field]:
     # No meaningful way to include FileUpload fields for now.
-    fields = [field for field in fields if field.type != FieldType.FILE_UPLOAD]
+    return [field for field in fields if field.type != FieldType.FILE_UPLOAD]
 
-    output = XlsxWriter(output_stream)
 
+def get_header_row(dimensions: Collection[Dimension], fields: Sequence[Field]) -> list[str]:
     header_row = ["created_at", "language"]
     header_row.extend(f"dimensions.{dimension.slug}" for dimension in dimensions)
     header_row.extend(cell for field in fields for cell in get_header_cells(field))
-    output.writerow(header_row)
+    return header_row
 
-    for response in responses:
+
+def iter_response_rows(
+    dimensions: Collection[Dimension],
+    fields: Sequence[Field],
+    responses: models.QuerySet[Response],
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[list[Any]]:
+    """
+    Yields the header row followed by one row per response. Responses are fetched in chunks
+    (using a server-side cursor on PostgreSQL) so the whole survey is never held in memory.
+    """
+    fields = get_export_fields(fields)
+    dimensions = list(dimensions)
+
+    yield get_header_row(dimensions, fields)
+
+    responses = responses.select_related("form").only(
+        "created_at",
+        "form_data",
+        "cached_dimensions",
+        "form__language",
+    )
+
+    for response in responses.iterator(chunk_size=chunk_size):
         values, _warnings = response.get_processed_form_data(fields)
 
         response_row = [
@@ -79,6 +97,20 @@ def write_responses_as_excel(
         ]
         response_row.extend(", ".join(response.cached_dimensions.get(dimension.slug, [])) for dimension in dimensions)
         response_row.extend(cell for field in fields for cell in get_response_cells(field, values))
-        output.writerow(response_row)
+        yield response_row
+
+
+def write_responses_as_excel(
+    dimensions: Collection[Dimension],
+    fields: Sequence[Field],
+    responses: models.QuerySet[Response],
+    output_stream: BinaryIO | HttpResponse,
+):
+    from core.excel_export import XlsxWriter
+
+    output = XlsxWriter(output_stream)
+
+    for row in iter_response_rows(dimensions, fields, responses):
+        output.writerow(row)
 
     output.close()
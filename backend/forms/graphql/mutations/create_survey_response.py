@@ -6,6 +6,7 @@ from core.utils import get_ip
 
 from ...models.response import Response
 from ...models.survey import Survey
+from ...models.survey_summary import SurveySummary
 from ..response import ProfileResponseType
 
 
@@ -65,6 +66,7 @@ class CreateSurveyResponse(graphene.Mutation):
             )
 
             response.lift_dimension_values()
+            SurveySummary.add_responses(survey, [response])
 
         response.notify_subscribers()
 
@@ -8,7 +8,7 @@ from core.utils import normalize_whitespace
 
 from ..models.form import Form
 from ..models.survey import Survey
-from ..utils.summarize_responses import summarize_responses
+from ..models.survey_summary import SurveySummary
 from .dimension import SurveyDimensionType
 from .form import FormType
 from .limited_survey import LimitedSurveyType
@@ -149,10 +149,7 @@ class SurveyType(LimitedSurveyType):
         that language is used as the base for the combined fields. Order of fields
         not present in the base language is not guaranteed. Authorization required.
         """
-        responses = DimensionFilterInput.filter(survey.responses.all(), filters)
-        fields = survey.get_combined_fields(lang)
-        valuesies = [response.get_processed_form_data(fields)[0] for response in responses.only("form_data")]
-        summary = summarize_responses(fields, valuesies)
+        summary = SurveySummary.get_summary(survey, lang, filters)
 
         return {slug: summary.model_dump(by_alias=True) for slug, summary in summary.items()}
 
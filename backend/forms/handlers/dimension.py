@@ -9,6 +9,7 @@ from core.utils.model_utils import slugify
 from ..models.dimension import Dimension, DimensionValue, ResponseDimensionValue
 from ..models.form import Form
 from ..models.response import Response
+from ..models.survey_summary import SurveySummary
 
 
 @receiver(pre_save, sender=ResponseDimensionValue)
@@ -24,6 +25,7 @@ def program_dimension_value_pre_save(sender, instance: ResponseDimensionValue, *
 def dimension_post_save(sender, instance: Dimension | DimensionValue, **kwargs):
     Response.refresh_cached_dimensions_qs(instance.survey.responses.all())
     Form.refresh_enriched_fields_qs(instance.survey.languages.all())
+    SurveySummary.invalidate_filtered(instance.survey)
 
 
 @receiver([post_save, post_delete], sender=ResponseDimensionValue)
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from core.utils.transaction_utils import OnCommitBatch
+
+from ..models.response import Response
+from ..models.survey_summary import SurveySummary
+
+# Deleting a form or a survey cascades to all of its responses, and post_delete is sent for each.
+# Subtracting them one at a time would rewrite the summaries once per response, so invalidate instead.
+invalidate_summaries_for_forms = OnCommitBatch[int](SurveySummary.invalidate_forms)
+
+
+@receiver(post_delete, sender=Response)
+def response_post_delete(sender, instance: Response, **kwargs):
+    if kwargs.get("origin") is instance:
+        SurveySummary.remove_response(instance)
+    else:
+        invalidate_summaries_for_forms.add(instance.form_id)
@@ -0,0 +1,92 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from tabulate import tabulate
+
+from ...models.field import Choice, Field, FieldType
+from ...utils.summarize_responses import accumulate_response, init_summary, summarize_responses
+
+MISSING_PROBABILITY = 0.1
+CHECKED_PROBABILITY = 0.5
+
+
+def make_fields(num_choices: int = 10, num_questions: int = 5) -> list[Field]:
+    choices = [Choice(slug=f"choice{i}", title=f"Choice {i}") for i in range(num_choices)]
+    questions = [Choice(slug=f"question{i}", title=f"Question {i}") for i in range(num_questions)]
+
+    return [
+        Field(type=FieldType.SINGLE_LINE_TEXT, slug="singleLineText"),
+        Field(type=FieldType.SINGLE_LINE_TEXT, slug="numberField", htmlType="number"),
+        Field(type=FieldType.MULTI_LINE_TEXT, slug="multiLineText"),
+        Field(type=FieldType.DIVIDER, slug="divider"),
+        Field(type=FieldType.SINGLE_CHECKBOX, slug="singleCheckbox"),
+        Field(type=FieldType.SINGLE_SELECT, slug="singleSelect", choices=choices),
+        Field(type=FieldType.MULTI_SELECT, slug="multiSelect", choices=choices),
+        Field(type=FieldType.RADIO_MATRIX, slug="radioMatrix", choices=choices, questions=questions),
+    ]
+
+
+def make_response(rng: random.Random, fields: list[Field]) -> dict:
+    values = {}
+
+    for field in fields:
+        if rng.random() < MISSING_PROBABILITY:
+            # did not answer
+            continue
+
+        choices = [choice.slug for choice in field.choices or []]
+
+        match field.type:
+            case FieldType.SINGLE_LINE_TEXT if field.html_type == "number":
+                values[field.slug] = rng.randint(0, 100)
+            case FieldType.SINGLE_LINE_TEXT | FieldType.MULTI_LINE_TEXT:
+                values[field.slug] = f"Lorem ipsum {rng.randint(0, 1000)}"
+            case FieldType.SINGLE_CHECKBOX:
+                values[field.slug] = rng.random() < CHECKED_PROBABILITY
+            case FieldType.SINGLE_SELECT:
+                values[field.slug] = rng.choice(choices)
+            case FieldType.MULTI_SELECT:
+                values[field.slug] = rng.sample(choices, rng.randint(0, len(choices)))
+            case FieldType.RADIO_MATRIX:
+                values[field.slug] = {question.slug: rng.choice(choices) for question in field.questions or []}
+
+    return values
+
+
+class Command(BaseCommand):
+    help = "Benchmark summarize_responses on a synthetic survey"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--responses", type=int, default=50_000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        fields = make_fields()
+        valuesies = [make_response(rng, fields) for _ in range(options["responses"])]
+
+        t0 = perf_counter()
+        row_wise_summary = init_summary(fields)
+        for values in valuesies:
+            accumulate_response(row_wise_summary, fields, values)
+        t1 = perf_counter()
+        columnar_summary = summarize_responses(fields, valuesies)
+        t2 = perf_counter()
+
+        if row_wise_summary != columnar_summary:
+            raise AssertionError("Row-wise and columnar summaries differ")
+
+        row_wise_time = t1 - t0
+        columnar_time = t2 - t1
+
+        print(
+            tabulate(
+                [
+                    ("row-wise (accumulate_response)", f"{row_wise_time:.3f}"),
+                    ("columnar (summarize_responses)", f"{columnar_time:.3f}"),
+                ],
+                headers=[f"{len(valuesies)} responses", "seconds"],
+            )
+        )
+        print(f"Speedup: {row_wise_time / columnar_time:.1f}x")
@@ -0,0 +1,52 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models.response import Response
+from ...models.survey import Survey
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports responses to a survey from a JSON file containing a list of form data objects "
+        "(in the same format the survey form submits them). Use - to read from stdin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_slug")
+        parser.add_argument("survey_slug")
+        parser.add_argument("input_file")
+        parser.add_argument(
+            "--language",
+            default="fi",
+            help="Language version of the survey the responses are imported to",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            survey = Survey.objects.get(event__slug=options["event_slug"], slug=options["survey_slug"])
+        except Survey.DoesNotExist as e:
+            raise CommandError("Survey not found") from e
+
+        form = survey.languages.filter(language=options["language"]).first()
+        if form is None:
+            raise CommandError(f"Survey has no language version {options['language']}")
+
+        if options["input_file"] == "-":
+            form_datas = json.load(sys.stdin)
+        else:
+            with open(options["input_file"], encoding="utf-8") as input_file:
+                form_datas = json.load(input_file)
+
+        if not isinstance(form_datas, list) or not all(isinstance(form_data, dict) for form_data in form_datas):
+            raise CommandError("Expected a JSON list of objects")
+
+        batch_size = options["batch_size"]
+
+        with transaction.atomic():
+            for i in range(0, len(form_datas), batch_size):
+                responses = Response.bulk_import(form, form_datas[i : i + batch_size])
+                self.stdout.write(f"Imported {i + len(responses)}/{len(form_datas)} responses")
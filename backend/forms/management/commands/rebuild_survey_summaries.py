@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models.survey_summary import SurveySummary
+
+
+class Command(BaseCommand):
+    help = "Rebuilds materialized survey summaries (eg. after fields have changed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event", help="Only rebuild summaries of surveys of this event (slug)")
+        parser.add_argument("--survey", help="Only rebuild summaries of this survey (slug)")
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            default=False,
+            help="Only rebuild summaries that are out of date (eg. after bulk operations on responses)",
+        )
+
+    def handle(self, *args, **options):
+        summaries = SurveySummary.objects.all().select_related("survey__event")
+
+        if options["event"]:
+            summaries = summaries.filter(survey__event__slug=options["event"])
+
+        if options["survey"]:
+            summaries = summaries.filter(survey__slug=options["survey"])
+
+        for survey_summary in summaries:
+            if options["stale"] and not survey_summary.is_stale():
+                continue
+
+            self.stdout.write(f"Rebuilding {survey_summary}")
+
+            with transaction.atomic():
+                SurveySummary.objects.select_for_update().get(id=survey_summary.id).rebuild()
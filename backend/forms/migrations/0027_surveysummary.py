@@ -0,0 +1,56 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("forms", "0026_survey_subscribers"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SurveySummary",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("language", models.CharField(max_length=2)),
+                (
+                    "filters_key",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Canonical JSON representation of filters. Empty if not filtered.",
+                    ),
+                ),
+                (
+                    "filters",
+                    models.JSONField(
+                        default=list,
+                        help_text="List of [dimension slug, list of value slugs] pairs. All must match.",
+                    ),
+                ),
+                (
+                    "fields_digest",
+                    models.CharField(
+                        help_text="SHA-256 of the combined fields this summary was built with.",
+                        max_length=64,
+                    ),
+                ),
+                ("count_responses", models.PositiveIntegerField(default=0)),
+                ("summary", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "survey",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="summaries",
+                        to="forms.survey",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("survey", "language", "filters_key")},
+            },
+        ),
+    ]
@@ -20,6 +20,8 @@ from graphql_api.utils import get_message_in_language
 from .form import Form
 
 if TYPE_CHECKING:
+    from django.contrib.auth.models import User
+
     from ..utils.process_form_data import FieldWarning
     from .dimension import Dimension, DimensionValue, ResponseDimensionValue
     from .field import Field
@@ -114,14 +116,36 @@ class Response(models.Model):
             raise ValueError("Cannot lift dimension values for a response that is not related to a survey")
 
         dimensions_by_slug, values_by_dimension_by_slug = survey.preload_dimensions()
-        bulk_create: list[ResponseDimensionValue] = []
+        dimension_fields = self.get_dimension_fields(self.form, dimensions_by_slug)
+        bulk_create, cached_dimensions = self._build_dimension_values(
+            dimensions_by_slug,
+            values_by_dimension_by_slug,
+            *dimension_fields,
+        )
+
+        # NOTE: if we allow dimensions having initial values to be presented as fields on the form,
+        # need to add ignore_conflicts=True here or rethink this somehow
+        ResponseDimensionValue.objects.bulk_create(bulk_create)
+
+        # mass delete and bulk create don't trigger signals (which is good)
+        self.cached_dimensions = cached_dimensions
+        self.save(update_fields=["cached_dimensions"])
 
+    @staticmethod
+    def get_dimension_fields(
+        form: Form,
+        dimensions_by_slug: dict[str, Dimension],
+    ) -> tuple[dict[str, dict[str, Any]], list[Field]]:
+        """
+        Returns the fields of the form that are used to set dimension values, both as
+        raw field dicts by slug and as enriched, validated fields.
+        """
         # only these fields have the potential of being dimension fields
         # TODO support single checkbox as dimension field?
         # TODO use pydantic versions of fields? Must not be enriched (it removes choicesFrom)
         fields = [
             field
-            for field in self.form.fields
+            for field in form.fields
             if field["slug"] in dimensions_by_slug
             and field["type"] in ("SingleSelect", "MultiSelect")
             and field.get("choicesFrom", {}).get("dimension", "") == field["slug"]
@@ -129,7 +153,24 @@ class Response(models.Model):
         fields_by_slug = {field["slug"]: field for field in fields}
 
         # get_processed_form_data expects enriched, validated form of fields
-        enriched_fields = [field for field in self.form.validated_fields if field.slug in fields_by_slug]
+        enriched_fields = [field for field in form.validated_fields if field.slug in fields_by_slug]
+
+        return fields_by_slug, enriched_fields
+
+    def _build_dimension_values(
+        self,
+        dimensions_by_slug: dict[str, Dimension],
+        values_by_dimension_by_slug: dict[str, dict[str, DimensionValue]],
+        fields_by_slug: dict[str, dict[str, Any]],
+        enriched_fields: list[Field],
+    ) -> tuple[list[ResponseDimensionValue], dict[str, list[str]]]:
+        """
+        Computes the dimension values to be lifted from form data without touching the database.
+        Returns unsaved ResponseDimensionValues and the corresponding cached_dimensions.
+        """
+        from .dimension import ResponseDimensionValue
+
+        bulk_create: list[ResponseDimensionValue] = []
         values, warnings = self.get_processed_form_data(enriched_fields)
 
         # we have all the dimensions and values preloaded, so it makes sense to build cached_dimensions here
@@ -191,13 +232,68 @@ class Response(models.Model):
 
                 set_dimension_value(dimension, value)
 
-        # NOTE: if we allow dimensions having initial values to be presented as fields on the form,
-        # need to add ignore_conflicts=True here or rethink this somehow
-        ResponseDimensionValue.objects.bulk_create(bulk_create)
+        return bulk_create, cached_dimensions
 
-        # mass delete and bulk create don't trigger signals (which is good)
-        self.cached_dimensions = cached_dimensions
-        self.save(update_fields=["cached_dimensions"])
+    @classmethod
+    @transaction.atomic
+    def bulk_import(
+        cls,
+        form: Form,
+        form_datas: Sequence[dict[str, Any]],
+        created_by: User | None = None,
+        ip_address: str = "",
+    ) -> list[Response]:
+        """
+        Creates many responses to a survey at once (eg. from a migrated survey or a batch of paper forms).
+        Equivalent to creating each response and calling lift_dimension_values on it, but uses
+        a constant number of queries regardless of the number of responses.
+
+        Subscribers are not notified of imported responses.
+        """
+        from .dimension import ResponseDimensionValue
+        from .survey_summary import SurveySummary
+
+        survey = form.survey
+        if survey is None:
+            raise ValueError("Cannot import responses to a form that is not related to a survey")
+
+        if survey.anonymity == "hard":
+            created_by = None
+            ip_address = ""
+
+        next_sequence_number = survey.get_next_sequence_number()
+
+        dimensions_by_slug, values_by_dimension_by_slug = survey.preload_dimensions()
+        dimension_fields = cls.get_dimension_fields(form, dimensions_by_slug)
+
+        responses: list[Response] = []
+        dimension_values: list[ResponseDimensionValue] = []
+
+        for sequence_number, form_data in enumerate(form_datas, start=next_sequence_number):
+            response = cls(
+                form=form,
+                form_data=form_data,
+                created_by=created_by,
+                ip_address=ip_address,
+                sequence_number=sequence_number,
+            )
+
+            response_dimension_values, response.cached_dimensions = response._build_dimension_values(
+                dimensions_by_slug,
+                values_by_dimension_by_slug,
+                *dimension_fields,
+            )
+
+            responses.append(response)
+            dimension_values.extend(response_dimension_values)
+
+        # bulk create doesn't trigger signals (which is good)
+        cls.objects.bulk_create(responses)
+        ResponseDimensionValue.objects.bulk_create(dimension_values)
+
+        SurveySummary.add_responses(survey, responses)
+
+        return responses
 
     @transaction.atomic
     def set_dimension_values(self, values_to_set: dict[str, list[str]]):
@@ -205,6 +301,7 @@ class Response(models.Model):
         Changes only those dimension values that are present in dimension_values.
         """
         from .dimension import ResponseDimensionValue
+        from .survey_summary import SurveySummary
 
         survey = self.survey
         if survey is None:
@@ -237,9 +334,12 @@ class Response(models.Model):
         ResponseDimensionValue.objects.bulk_create(bulk_create)
 
         # mass delete and bulk create don't trigger signals (which is good)
+        old_cached_dimensions = self.cached_dimensions
         self.cached_dimensions = dict(self.cached_dimensions, **values_to_set)
         self.save(update_fields=["cached_dimensions"])
 
+        SurveySummary.move_response(self, old_cached_dimensions)
+
     def get_processed_form_data(
         self,
         fields: Sequence[Field] | None = None,
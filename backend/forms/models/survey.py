@@ -176,6 +176,11 @@ class Survey(models.Model):
         return not self.languages.exists()
 
     def get_next_sequence_number(self):
+        """
+        Locks the survey until the end of the transaction so that concurrent responses
+        do not get the same sequence number. Must be called within a transaction.
+        """
+        Survey.objects.select_for_update().filter(id=self.id).values("id").get()
         return (self.responses.all().aggregate(models.Max("sequence_number"))["sequence_number__max"] or 0) + 1
 
     def preload_dimensions(self, dimension_values: Mapping[str, Collection[str]] | None = None):
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, Any
+
+import pydantic
+from django.db import models, transaction
+
+from graphql_api.language import SUPPORTED_LANGUAGES
+
+from ..utils.summarize_responses import FieldSummary, Summary, accumulate_response, summarize_responses
+from .dimension import ResponseDimensionValue
+from .field import Field, FieldType
+from .survey import Survey
+
+if TYPE_CHECKING:
+    from core.graphql.common import DimensionFilterInput
+
+    from .response import Response
+
+
+logger = logging.getLogger("kompassi")
+
+FIELD_SUMMARY_ADAPTER = pydantic.TypeAdapter(FieldSummary)
+
+# dimension slug, value slugs
+DimensionFilter = tuple[str, list[str]]
+
+
+class SurveySummary(models.Model):
+    """
+    A materialized summary of the responses to a survey for a given base language and set of
+    dimension filters. Summaries are created on demand by `get_summary` and then kept up to date
+    incrementally as responses are created, their dimensions change or they are deleted.
+
+    File upload fields are stored as raw S3 URLs and presigned only when the summary is read.
+    If the fields of the survey change, the summary is rebuilt on the next read.
+    Use `manage.py rebuild_survey_summaries` to rebuild them eagerly, and periodically with
+    `--stale` to catch changes to responses that bypassed signals.
+    """
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name="summaries")
+    language = models.CharField(max_length=2)
+    filters_key = models.TextField(
+        blank=True,
+        default="",
+        help_text="Canonical JSON representation of filters. Empty if not filtered.",
+    )
+    filters = models.JSONField(
+        default=list,
+        help_text="List of [dimension slug, list of value slugs] pairs. All must match.",
+    )
+    fields_digest = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the combined fields this summary was built with.",
+    )
+    count_responses = models.PositiveIntegerField(default=0)
+    summary = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [("survey", "language", "filters_key")]
+
+    def __str__(self):
+        return f"{self.survey} ({self.language}) {self.filters_key}"
+
+    @staticmethod
+    def normalize_filters(filters: Iterable[DimensionFilterInput] | None) -> list[DimensionFilter]:
+        return sorted((str(filter.dimension), sorted(set(filter.values or []))) for filter in filters or [])
+
+    @staticmethod
+    def get_filters_key(filters: Sequence[DimensionFilter]) -> str:
+        return json.dumps(filters, separators=(",", ":")) if filters else ""
+
+    @staticmethod
+    def get_fields_digest(fields: Sequence[Field]) -> str:
+        serialized = json.dumps([field.model_dump(mode="json") for field in fields], sort_keys=True)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def matches(self, cached_dimensions: dict[str, list[str]]) -> bool:
+        return filters_match(self.filters, cached_dimensions)
+
+    def get_responses(self) -> models.QuerySet[Response]:
+        """
+        Mirrors the semantics of DimensionFilterInput.filter, but uses subqueries instead of joins
+        so that a response matching several values of a filter is only counted once.
+        """
+        responses = self.survey.responses.all()
+        for dimension_slug, value_slugs in self.filters:
+            responses = responses.filter(
+                id__in=ResponseDimensionValue.objects.filter(
+                    dimension__slug=dimension_slug,
+                    value__slug__in=value_slugs,
+                ).values("response_id"),
+            )
+        return responses
+
+    def load_summary(self) -> Summary:
+        return {slug: FIELD_SUMMARY_ADAPTER.validate_python(data) for slug, data in self.summary.items()}
+
+    def store_summary(self, summary: Summary):
+        self.summary = {slug: field_summary.model_dump(mode="json") for slug, field_summary in summary.items()}
+
+    def rebuild(self, fields: list[Field] | None = None):
+        """
+        Recomputes the summary from scratch. This is the expensive operation that the rest
+        of this class tries to avoid.
+        """
+        if fields is None:
+            fields = self.survey.get_combined_fields(self.language)
+
+        valuesies = [
+            get_summary_values(response, fields)
+            for response in self.get_responses().only("id", "form_data").iterator(chunk_size=1000)
+        ]
+
+        self.store_summary(summarize_responses(fields, valuesies))
+        self.count_responses = len(valuesies)
+        self.fields_digest = self.get_fields_digest(fields)
+        self.save()
+
+    def is_stale(self, fields: list[Field] | None = None) -> bool:
+        """
+        Checks whether the summary needs to be rebuilt. Unlike the check made on read,
+        this also catches changes that bypassed signals (bulk operations etc.) by counting
+        the responses, so it is left to `manage.py rebuild_survey_summaries --stale`.
+        """
+        if fields is None:
+            fields = self.survey.get_combined_fields(self.language)
+
+        return (
+            self.fields_digest != self.get_fields_digest(fields) or self.count_responses != self.get_responses().count()
+        )
+
+    @classmethod
+    def get_summary(
+        cls,
+        survey: Survey,
+        language: str,
+        filters: Iterable[DimensionFilterInput] | None = None,
+    ) -> Summary:
+        """
+        Returns the summary of responses to the survey, building it if it does not exist
+        or the fields of the survey have changed. The returned summary has file upload URLs presigned.
+        """
+        if language not in [supported_language.code for supported_language in SUPPORTED_LANGUAGES]:
+            # all unsupported languages yield the same field order
+            language = ""
+
+        normalized_filters = cls.normalize_filters(filters)
+        fields = survey.get_combined_fields(language)
+        fields_digest = cls.get_fields_digest(fields)
+        lookup = dict(
+            survey=survey,
+            language=language,
+            filters_key=cls.get_filters_key(normalized_filters),
+        )
+
+        survey_summary = cls.objects.filter(**lookup).first()
+
+        if survey_summary is None or survey_summary.fields_digest != fields_digest:
+            with transaction.atomic():
+                survey_summary, created = cls.objects.select_for_update().get_or_create(
+                    **lookup,
+                    defaults=dict(filters=normalized_filters),
+                )
+
+                # someone else may have built it while we were waiting for the lock
+                if created or survey_summary.fields_digest != fields_digest:
+                    logger.info("Rebuilding survey summary %s", survey_summary)
+                    survey_summary.rebuild(fields)
+
+        return presign_summary(survey_summary.load_summary(), fields)
+
+    @classmethod
+    def add_responses(cls, survey: Survey, responses: Sequence[Response], weight: int = 1):
+        """
+        Accumulates the given responses (weight=1) or removes them (weight=-1) from all
+        existing summaries of the survey they match. Call after cached_dimensions are set.
+        """
+        cls._accumulate(survey, [(response, response.cached_dimensions, weight) for response in responses])
+
+    @classmethod
+    def remove_response(cls, response: Response):
+        if survey := response.survey:
+            cls.add_responses(survey, [response], weight=-1)
+
+    @classmethod
+    def move_response(cls, response: Response, old_cached_dimensions: dict[str, list[str]]):
+        """
+        Called after the dimensions of a response have changed. Only filtered summaries
+        whose filters match either the old or the new dimensions are affected.
+        """
+        if survey := response.survey:
+            cls._accumulate(
+                survey,
+                [
+                    (response, old_cached_dimensions, -1),
+                    (response, response.cached_dimensions, 1),
+                ],
+                filtered_only=True,
+            )
+
+    @classmethod
+    @transaction.atomic
+    def _accumulate(
+        cls,
+        survey: Survey,
+        changes: list[tuple[Response, dict[str, list[str]], int]],
+        filtered_only: bool = False,
+    ):
+        summaries = cls.objects.filter(survey=survey)
+        if filtered_only:
+            summaries = summaries.exclude(filters_key="")
+
+        # filters never change, so only the summaries affected by the changes need to be locked
+        summary_ids = [
+            summary_id
+            for summary_id, filters in summaries.values_list("id", "filters")
+            if any(filters_match(filters, cached_dimensions) for _, cached_dimensions, _ in changes)
+        ]
+        if not summary_ids:
+            return
+
+        summaries = cls.objects.filter(id__in=summary_ids).select_for_update().order_by("id")
+
+        fields_by_language: dict[str, list[Field]] = {}
+        values_by_language_by_response: dict[tuple[str, Any], dict[str, Any]] = {}
+
+        for survey_summary in summaries:
+            if survey_summary.language not in fields_by_language:
+                fields_by_language[survey_summary.language] = survey.get_combined_fields(survey_summary.language)
+            fields = fields_by_language[survey_summary.language]
+
+            if survey_summary.fields_digest != cls.get_fields_digest(fields):
+                # stale, will be rebuilt on next read
+                continue
+
+            summary = survey_summary.load_summary()
+            count_responses = survey_summary.count_responses
+            changed = False
+
+            for response, cached_dimensions, weight in changes:
+                if not survey_summary.matches(cached_dimensions):
+                    continue
+
+                cache_key = (survey_summary.language, response.pk)
+                if (values := values_by_language_by_response.get(cache_key)) is None:
+                    values = get_summary_values(response, fields)
+                    values_by_language_by_response[cache_key] = values
+
+                accumulate_response(summary, fields, values, weight)
+                count_responses += weight
+                changed = True
+
+            if changed:
+                survey_summary.store_summary(summary)
+                survey_summary.count_responses = count_responses
+                survey_summary.save(update_fields=["summary", "count_responses", "updated_at"])
+
+    @classmethod
+    def invalidate_filtered(cls, survey: Survey):
+        """
+        Called when dimensions or dimension values of a survey change. Such changes may
+        alter the membership of any number of responses in filtered summaries.
+        """
+        cls.objects.filter(survey=survey).exclude(filters_key="").delete()
+
+    @classmethod
+    def invalidate_forms(cls, form_ids: Iterable[int]):
+        """
+        Called when responses are deleted in bulk or along with their form or survey.
+        Rebuilding the summaries on the next read beats subtracting the responses one by one.
+        """
+        cls.objects.filter(survey__languages__id__in=form_ids).delete()
+
+
+def filters_match(filters: Sequence[DimensionFilter], cached_dimensions: dict[str, list[str]]) -> bool:
+    """
+    Mirrors the semantics of DimensionFilterInput.filter.
+    """
+    return all(
+        set(cached_dimensions.get(dimension_slug, [])).intersection(value_slugs)
+        for dimension_slug, value_slugs in filters
+    )
+
+
+def get_summary_values(response: Response, fields: Sequence[Field]) -> dict[str, Any]:
+    """
+    Like Response.get_processed_form_data, but file uploads are left as raw S3 URLs
+    because presigned URLs expire and differ from call to call.
+    """
+    from ..utils.s3_presign import is_valid_s3_url
+
+    file_upload_slugs = [field.slug for field in fields if field.type == FieldType.FILE_UPLOAD]
+    values, _warnings = response.get_processed_form_data(
+        [field for field in fields if field.type != FieldType.FILE_UPLOAD]
+    )
+
+    for slug in file_upload_slugs:
+        urls = response.form_data.get(slug)
+        if isinstance(urls, list) and all(isinstance(url, str) and is_valid_s3_url(url) for url in urls):
+            values[slug] = urls
+
+    return values
+
+
+def presign_summary(summary: Summary, fields: Sequence[Field]) -> Summary:
+    from ..utils.s3_presign import presign_get
+
+    for field in fields:
+        if field.type == FieldType.FILE_UPLOAD and (field_summary := summary.get(field.slug)):
+            field_summary.summary = [presign_get(url) for url in field_summary.summary]  # type: ignore
+
+    return summary
@@ -3,21 +3,33 @@ from unittest import mock
 
 import pytest
 import yaml
+from django.core.management import call_command
 
+from core.csv_export import csv_streaming_response
 from core.models import Event
 from graphql_api.schema import schema
 
-from .excel_export import get_header_cells, get_response_cells
+from .excel_export import get_header_cells, get_response_cells, iter_response_rows
 from .graphql.mutations.put_survey_dimension import PutSurveyDimension
 from .graphql.mutations.update_response_dimensions import UpdateResponseDimensions
 from .models.dimension import Dimension, DimensionValue
 from .models.field import Choice, Field, FieldType
 from .models.response import Response
 from .models.survey import Survey
+from .models.survey_summary import SurveySummary
 from .utils.merge_form_fields import _merge_choices, _merge_fields
 from .utils.process_form_data import FieldWarning, process_form_data
 from .utils.s3_presign import BUCKET_NAME, S3_ENDPOINT_URL
-from .utils.summarize_responses import MatrixFieldSummary, SelectFieldSummary, TextFieldSummary, summarize_responses
+from .utils.summarize_responses import (
+    FileUploadSummary,
+    MatrixFieldSummary,
+    SelectFieldSummary,
+    SingleCheckboxSummary,
+    TextFieldSummary,
+    accumulate_response,
+    init_summary,
+    summarize_responses,
+)
 
 # pass this as the info param to mutations to appease the graphql_check_access decorator
 # (remember to also mock.patch graphql_check_access)
@@ -592,6 +604,173 @@ def test_summarize_responses():
     assert summarize_responses(fields, responses) == expected_summary
 
 
+def test_summarize_responses_edge_cases():
+    """
+    The expected summary is what the original field-by-field implementation produced
+    before summarize_responses went columnar. Keep it that way.
+    """
+    choices = [
+        Choice(slug="choice1", title="Choice 1"),
+        Choice(slug="choice2", title="Choice 2"),
+    ]
+
+    fields = [
+        Field(type=FieldType.SINGLE_LINE_TEXT, slug="singleLineText"),
+        Field(type=FieldType.MULTI_LINE_TEXT, slug="multiLineText"),
+        Field(type=FieldType.DATE_FIELD, slug="dateField"),
+        Field(type=FieldType.SINGLE_LINE_TEXT, htmlType="number", slug="numberField"),
+        Field(type=FieldType.FILE_UPLOAD, slug="fileUpload"),
+        Field(type=FieldType.SINGLE_CHECKBOX, slug="singleCheckbox"),
+        Field(type=FieldType.SINGLE_SELECT, slug="singleSelect", choices=choices),
+        Field(type=FieldType.MULTI_SELECT, slug="multiSelect", choices=choices),
+        Field(
+            type=FieldType.RADIO_MATRIX,
+            slug="radioMatrix",
+            questions=[Choice(slug="foo", title="Foo"), Choice(slug="bar", title="Bar")],
+            choices=choices,
+        ),
+        Field(type=FieldType.STATIC_TEXT, slug="staticTextShouldNotBePresentInSummary"),
+    ]
+
+    responses = [
+        {
+            "singleLineText": "  Hello  ",
+            "multiLineText": "Line 1\nLine 2",
+            "dateField": "2026-10-17",
+            "numberField": 0,
+            "fileUpload": ["https://example.com/a.pdf", "https://example.com/b.pdf"],
+            "singleCheckbox": True,
+            "singleSelect": "choice1",
+            "multiSelect": ["choice1", "choice2"],
+            "radioMatrix": {"foo": "choice1", "bar": "choice2"},
+        },
+        # blank and falsy answers
+        {
+            "singleLineText": "   ",
+            "numberField": 1.5,
+            "fileUpload": [],
+            "singleCheckbox": False,
+            "singleSelect": "",
+            "multiSelect": [],
+            "radioMatrix": {},
+        },
+        {
+            "numberField": "0",
+            "singleSelect": "choice1",
+            "radioMatrix": {"bar": "choice2"},
+        },
+        {},
+    ]
+
+    expected_summary = {
+        "singleLineText": TextFieldSummary(
+            countResponses=1,
+            countMissingResponses=3,
+            summary=["Hello"],
+        ),
+        "multiLineText": TextFieldSummary(
+            countResponses=1,
+            countMissingResponses=3,
+            summary=["Line 1\nLine 2"],
+        ),
+        "dateField": TextFieldSummary(
+            countResponses=1,
+            countMissingResponses=3,
+            summary=["2026-10-17"],
+        ),
+        "numberField": SelectFieldSummary(
+            countResponses=3,
+            countMissingResponses=1,
+            summary={"0": 2, "1.5": 1},
+        ),
+        "fileUpload": FileUploadSummary(
+            countResponses=1,
+            countMissingResponses=3,
+            summary=["https://example.com/a.pdf", "https://example.com/b.pdf"],
+        ),
+        "singleCheckbox": SingleCheckboxSummary(
+            countResponses=1,
+            countMissingResponses=3,
+        ),
+        "singleSelect": SelectFieldSummary(
+            countResponses=2,
+            countMissingResponses=2,
+            summary={"choice1": 2, "choice2": 0},
+        ),
+        "multiSelect": SelectFieldSummary(
+            countResponses=1,
+            countMissingResponses=3,
+            summary={"choice1": 1, "choice2": 1},
+        ),
+        "radioMatrix": MatrixFieldSummary(
+            countResponses=2,
+            countMissingResponses=2,
+            summary={
+                "foo": {"choice1": 1, "choice2": 0},
+                "bar": {"choice1": 0, "choice2": 2},
+            },
+        ),
+    }
+
+    assert summarize_responses(fields, responses) == expected_summary
+
+    summary = init_summary(fields)
+    for response in responses:
+        accumulate_response(summary, fields, response)
+
+    assert summary == expected_summary
+
+
+def test_accumulate_response():
+    choices = [
+        Choice(slug="choice1", title="Choice 1"),
+        Choice(slug="choice2", title="Choice 2"),
+    ]
+
+    fields = [
+        Field(type=FieldType.SINGLE_LINE_TEXT, slug="singleLineText"),
+        Field(type=FieldType.SINGLE_LINE_TEXT, htmlType="number", slug="numberField"),
+        Field(type=FieldType.SINGLE_CHECKBOX, slug="singleCheckbox"),
+        Field(type=FieldType.SINGLE_SELECT, slug="singleSelect", choices=choices),
+        Field(type=FieldType.MULTI_SELECT, slug="multiSelect", choices=choices),
+        Field(
+            type=FieldType.RADIO_MATRIX,
+            slug="radioMatrix",
+            questions=[Choice(slug="foo", title="Foo")],
+            choices=choices,
+        ),
+    ]
+
+    responses = [
+        {
+            "singleLineText": "Hello world",
+            "numberField": 5,
+            "singleCheckbox": True,
+            "singleSelect": "choice1",
+            "multiSelect": ["choice1", "choice2"],
+            "radioMatrix": {"foo": "choice1"},
+        },
+        {
+            "singleLineText": "Goodbye world",
+            "singleSelect": "choice666",
+            "multiSelect": ["choice666"],
+            "radioMatrix": {"foo": "choice666"},
+        },
+        {},
+    ]
+
+    summary = init_summary(fields)
+    for response in responses:
+        accumulate_response(summary, fields, response)
+
+    assert summary == summarize_responses(fields, responses)
+
+    # removing a response undoes its effect, including choices no longer present on the form
+    accumulate_response(summary, fields, responses[1], weight=-1)
+
+    assert summary == summarize_responses(fields, [responses[0], responses[2]])
+
+
 @pytest.mark.django_db
 @mock.patch("forms.graphql.mutations.update_response_dimensions.graphql_check_instance", autospec=True)
 def test_lift_and_set_dimensions(_patched_graphql_check_instance):
@@ -763,3 +942,217 @@ def test_survey_without_forms(_patched_graphql_check_instance):
     )
 
     assert not result.errors
+
+
+@pytest.mark.django_db
+def test_survey_summary(django_capture_on_commit_callbacks):
+    event, _created = Event.get_or_create_dummy()
+
+    survey = Survey.objects.create(
+        event=event,
+        slug="test-survey",
+    )
+
+    dimension = Dimension.objects.create(
+        survey=survey,
+        slug="test-dimension",
+        title="Test dimension",
+    )
+
+    DimensionValue.objects.bulk_create(
+        [
+            DimensionValue(
+                dimension=dimension,
+                slug="test-dimension-value-1",
+                title=dict(en="Test dimension value 1"),
+            ),
+            DimensionValue(
+                dimension=dimension,
+                slug="test-dimension-value-2",
+                title=dict(en="Test dimension value 2"),
+            ),
+        ]
+    )
+
+    form = survey.languages.create(
+        event=event,
+        slug="test-survey-en",
+        language="en",
+        fields=[
+            dict(
+                slug="test-dimension",
+                type="SingleSelect",
+                choicesFrom=dict(dimension="test-dimension"),
+            ),
+        ],
+    )
+
+    def create_response(value_slug: str) -> Response:
+        response = Response.objects.create(
+            form=form,
+            form_data={"test-dimension": value_slug},
+        )
+        response.lift_dimension_values()
+        SurveySummary.add_responses(survey, [response])
+        return response
+
+    value1_filter = [SimpleNamespace(dimension="test-dimension", values=["test-dimension-value-1"])]
+    value1_filter_key = SurveySummary.get_filters_key(SurveySummary.normalize_filters(value1_filter))  # type: ignore
+
+    response1 = create_response("test-dimension-value-1")
+
+    # builds the summaries from scratch
+    summary = SurveySummary.get_summary(survey, "en")
+    assert summary["test-dimension"].countResponses == 1
+    summary = SurveySummary.get_summary(survey, "en", value1_filter)  # type: ignore
+    assert summary["test-dimension"].countResponses == 1
+
+    # updated incrementally
+    create_response("test-dimension-value-2")
+    assert SurveySummary.objects.get(survey=survey, filters_key="").count_responses == 2
+    summary = SurveySummary.get_summary(survey, "en")
+    assert summary["test-dimension"].summary == {"test-dimension-value-1": 1, "test-dimension-value-2": 1}
+    summary = SurveySummary.get_summary(survey, "en", value1_filter)  # type: ignore
+    assert summary["test-dimension"].countResponses == 1
+
+    # changing dimensions moves the response out of the filtered summary
+    response1.set_dimension_values({"test-dimension": ["test-dimension-value-2"]})
+    summary = SurveySummary.get_summary(survey, "en", value1_filter)  # type: ignore
+    assert summary["test-dimension"].countResponses == 0
+
+    response1.delete()
+    summary = SurveySummary.get_summary(survey, "en")
+    assert summary["test-dimension"].countResponses == 1
+    assert summary["test-dimension"].summary == {"test-dimension-value-1": 0, "test-dimension-value-2": 1}
+
+    # drift from changes that bypass signals is not checked on read but by rebuild_survey_summaries --stale
+    SurveySummary.objects.filter(survey=survey, filters_key="").update(count_responses=42)
+    survey_summary = SurveySummary.objects.get(survey=survey, filters_key="")
+    assert survey_summary.is_stale()
+    assert not SurveySummary.objects.get(survey=survey, filters_key=value1_filter_key).is_stale()
+
+    call_command("rebuild_survey_summaries", "--stale", survey=survey.slug)
+    survey_summary.refresh_from_db()
+    assert not survey_summary.is_stale()
+    assert survey_summary.count_responses == 1
+
+    # a response with several values matching the same filter is counted once
+    response3 = create_response("test-dimension-value-1")
+    response3.set_dimension_values({"test-dimension": ["test-dimension-value-1", "test-dimension-value-2"]})
+    both_filter = [
+        SimpleNamespace(dimension="test-dimension", values=["test-dimension-value-1", "test-dimension-value-2"]),
+    ]
+    summary = SurveySummary.get_summary(survey, "en", both_filter)  # type: ignore
+    assert summary["test-dimension"].countResponses == 2
+    both_filter_key = SurveySummary.get_filters_key(SurveySummary.normalize_filters(both_filter))  # type: ignore
+    assert not SurveySummary.objects.get(survey=survey, filters_key=both_filter_key).is_stale()
+
+    # bulk and cascading deletes invalidate the summaries instead of updating them response by response
+    with django_capture_on_commit_callbacks(execute=True):
+        survey.responses.all().delete()
+    assert not SurveySummary.objects.filter(survey=survey).exists()
+    summary = SurveySummary.get_summary(survey, "en")
+    assert summary["test-dimension"].countResponses == 0
+
+
+@pytest.mark.django_db
+def test_streaming_export():
+    event, _created = Event.get_or_create_dummy()
+
+    survey = Survey.objects.create(
+        event=event,
+        slug="test-survey",
+    )
+
+    form = survey.languages.create(
+        event=event,
+        slug="test-survey-en",
+        language="en",
+        fields=[
+            dict(slug="name", type="SingleLineText"),
+            dict(slug="upload", type="FileUpload"),
+        ],
+    )
+
+    Response.objects.create(form=form, form_data={"name": "Ülla"})
+    Response.objects.create(form=form, form_data={"name": "Åke"})
+
+    rows = list(iter_response_rows([], survey.combined_fields, survey.responses.all(), chunk_size=1))
+
+    assert rows[0] == ["created_at", "language", "name"]
+    assert [row[1:] for row in rows[1:]] == [["en", "Ülla"], ["en", "Åke"]]
+
+    response = csv_streaming_response(iter(rows), "responses.tsv", dialect="excel-tab", encoding="utf-8")
+    content = b"".join(response.streaming_content).decode("utf-8")  # type: ignore
+
+    assert content.splitlines()[0] == "created_at\tlanguage\tname"
+    assert "Ülla" in content
+
+
+@pytest.mark.django_db
+def test_bulk_import():
+    event, _created = Event.get_or_create_dummy()
+
+    survey = Survey.objects.create(
+        event=event,
+        slug="test-survey",
+    )
+
+    dimension = Dimension.objects.create(
+        survey=survey,
+        slug="test-dimension",
+        title="Test dimension",
+    )
+
+    DimensionValue.objects.bulk_create(
+        [
+            DimensionValue(
+                dimension=dimension,
+                slug="test-dimension-value-1",
+                title=dict(en="Test dimension value 1"),
+            ),
+            DimensionValue(
+                dimension=dimension,
+                slug="test-dimension-value-2",
+                title=dict(en="Test dimension value 2"),
+                is_initial=True,
+            ),
+        ]
+    )
+
+    form = survey.languages.create(
+        event=event,
+        slug="test-survey-en",
+        language="en",
+        fields=[
+            dict(
+                slug="test-dimension",
+                type="SingleSelect",
+                choicesFrom=dict(dimension="test-dimension"),
+            ),
+        ],
+    )
+
+    existing_response = Response.objects.create(
+        form=form,
+        form_data={},
+        sequence_number=survey.get_next_sequence_number(),
+    )
+    existing_response.lift_dimension_values()
+
+    responses = Response.bulk_import(
+        form,
+        [
+            {"test-dimension": "test-dimension-value-1"},
+            {},
+        ],
+    )
+
+    assert [response.sequence_number for response in responses] == [2, 3]
+
+    responses = list(survey.responses.filter(sequence_number__gt=1).order_by("sequence_number"))
+    assert [response.cached_dimensions for response in responses] == [
+        {"test-dimension": ["test-dimension-value-2", "test-dimension-value-1"]},
+        {"test-dimension": ["test-dimension-value-2"]},
+    ]
+    assert responses[0].dimensions.count() == 2
@@ -9,4 +9,16 @@ urlpatterns = [
         forms_survey_excel_export_view,
         name="forms_survey_excel_export_view",
     ),
+    path(
+        "events/<slug:event_slug>/surveys/<slug:survey_slug>/responses.csv",
+        forms_survey_excel_export_view,
+        dict(format="csv"),
+        name="forms_survey_csv_export_view",
+    ),
+    path(
+        "events/<slug:event_slug>/surveys/<slug:survey_slug>/responses.tsv",
+        forms_survey_excel_export_view,
+        dict(format="tsv"),
+        name="forms_survey_tsv_export_view",
+    ),
 ]
@@ -4,12 +4,14 @@ See ../tests.py:test_summarize_responses for examples.
 """
 
 from collections import Counter
+from collections.abc import Collection
 from enum import Enum
+from itertools import chain
 from typing import Any, Literal
 
 import pydantic
 
-from ..models.field import Field, FieldType
+from ..models.field import Choice, Field, FieldType
 
 # NOTE: Keep in sync with frontend/src/components/SchemaForm/models.ts
 
@@ -62,36 +64,61 @@ FieldSummary = TextFieldSummary | SingleCheckboxSummary | SelectFieldSummary | M
 Summary = dict[str, FieldSummary]
 
 
+NON_VALUE_FIELD_TYPES = (FieldType.STATIC_TEXT, FieldType.SPACER, FieldType.DIVIDER)
+
+
+def _pivot_responses(fields: list[Field], valuesies: list[dict[str, Any]]) -> dict[str, list[Any]]:
+    """
+    Turns a list of responses (field slug -> value) into columns (field slug -> list of values)
+    in a single pass over the responses. Missing and None values are left out of the columns.
+    """
+    columns: dict[str, list[Any]] = {field.slug: [] for field in fields if field.type not in NON_VALUE_FIELD_TYPES}
+
+    for values in valuesies:
+        for slug, value in values.items():
+            if value is not None and (column := columns.get(slug)) is not None:
+                column.append(value)
+
+    return columns
+
+
+def _count_with_choices(choices: list[Choice] | None, counts: Counter[str]) -> dict[str, int]:
+    field_summary = {choice.slug: 0 for choice in choices or []}
+
+    # account for the possibility of a choice being removed
+    for value, count in counts.items():
+        field_summary[value] = field_summary.get(value, 0) + count
+
+    return field_summary
+
+
 def summarize_responses(fields: list[Field], valuesies: list[dict[str, Any]]) -> Summary:
+    """
+    The responses are first pivoted into per-field columns in one pass, after which each field
+    is summarized by counting over its own column only. This keeps the cost of large surveys
+    proportional to the amount of data actually present rather than fields × responses.
+    """
     summary: Summary = {}
 
     total_responses = len(valuesies)
+    columns = _pivot_responses(fields, valuesies)
 
     for field in fields:
-        match field.type:
-            case FieldType.STATIC_TEXT | FieldType.SPACER | FieldType.DIVIDER:
-                pass
+        if field.type in NON_VALUE_FIELD_TYPES:
+            continue
+
+        column = columns[field.slug]
 
+        match field.type:
             # TODO: handle htmlType="number" for high cardinality fields
             case FieldType.SINGLE_LINE_TEXT if field.html_type == "number":
-                field_summary = Counter()
-
-                for value in valuesies:
-                    value = value.get(field.slug)
-                    if value is None:
-                        continue
-
-                    # javascript object keys are always strings
-                    value = str(value)
-
-                    field_summary[value] += 1
-
-                count_responses = sum(field_summary.values())
-                count_missing_responses = total_responses - count_responses
+                # javascript object keys are always strings
+                field_summary = Counter(map(str, column))
+                count_responses = len(column)
 
                 summary[field.slug] = SelectFieldSummary(
                     countResponses=count_responses,
-                    countMissingResponses=count_missing_responses,
+                    countMissingResponses=total_responses - count_responses,
                     summary=dict(field_summary),
                 )
 
@@ -103,136 +130,167 @@ def summarize_responses(fields: list[Field], valuesies: list[dict[str, Any]]) ->
                 | FieldType.TIME_FIELD
                 | FieldType.DATE_TIME_FIELD
             ):
-                field_summary = []
-
-                for values in valuesies:
-                    value = values.get(field.slug)
-                    if value is None:
-                        continue
-
-                    value = str(value).strip()
-                    if not value:
-                        continue
-
-                    field_summary.append(value)
-
-                count_responses = len(field_summary)
-                count_missing_responses = total_responses - count_responses
+                texts = [text for text in (str(value).strip() for value in column) if text]
+                count_responses = len(texts)
 
                 summary[field.slug] = TextFieldSummary(
                     countResponses=count_responses,
-                    countMissingResponses=count_missing_responses,
-                    summary=field_summary,
+                    countMissingResponses=total_responses - count_responses,
+                    summary=texts,
                 )
 
             case FieldType.FILE_UPLOAD:
-                field_summary = []
-                count_responses = 0
-
-                for values in valuesies:
-                    value = values.get(field.slug, [])
-
-                    if not value:
-                        continue
-
-                    count_responses += 1
-
-                    field_summary.extend(value)
-
-                count_missing_responses = total_responses - count_responses
+                uploads = list(filter(None, column))
+                count_responses = len(uploads)
 
                 summary[field.slug] = FileUploadSummary(
                     countResponses=count_responses,
-                    countMissingResponses=count_missing_responses,
-                    summary=field_summary,
+                    countMissingResponses=total_responses - count_responses,
+                    summary=list(chain.from_iterable(uploads)),
                 )
 
             case FieldType.SINGLE_CHECKBOX:
-                count_responses = sum(1 for values in valuesies if values.get(field.slug))
-                count_missing_responses = total_responses - count_responses
+                count_responses = sum(map(bool, column))
 
                 summary[field.slug] = SingleCheckboxSummary(
                     countResponses=count_responses,
-                    countMissingResponses=count_missing_responses,
+                    countMissingResponses=total_responses - count_responses,
                 )
 
             case FieldType.SINGLE_SELECT:
-                field_summary = {choice.slug: 0 for choice in field.choices or []}
-
-                for values in valuesies:
-                    value = values.get(field.slug)
-                    if value:
-                        if field.type == FieldType.SINGLE_CHECKBOX:
-                            value = "true"
-                        else:
-                            value = str(value)
-
-                        # account for the possibility of a choice being removed
-                        field_summary.setdefault(value, 0)
-                        field_summary[value] += 1
-
+                field_summary = _count_with_choices(field.choices, Counter(map(str, filter(None, column))))
                 count_responses = sum(field_summary.values())
-                count_missing_responses = total_responses - count_responses
 
                 summary[field.slug] = SelectFieldSummary(
-                    summary=dict(field_summary),
+                    summary=field_summary,
                     countResponses=count_responses,
-                    countMissingResponses=count_missing_responses,
+                    countMissingResponses=total_responses - count_responses,
                 )
 
             case FieldType.MULTI_SELECT:
-                field_summary = {choice.slug: 0 for choice in field.choices or []}
-                count_responses = 0
-
-                for values in valuesies:
-                    values = values.get(field.slug, [])
-
-                    if not values:
-                        continue
-
-                    count_responses += 1
-
-                    for value in values:
-                        # account for the possibility of a choice being removed
-                        field_summary.setdefault(value, 0)
-                        field_summary[value] += 1
-
-                count_missing_responses = total_responses - count_responses
+                selections = list(filter(None, column))
+                count_responses = len(selections)
 
                 summary[field.slug] = SelectFieldSummary(
                     countResponses=count_responses,
-                    countMissingResponses=count_missing_responses,
-                    summary=dict(field_summary),
+                    countMissingResponses=total_responses - count_responses,
+                    summary=_count_with_choices(field.choices, Counter(chain.from_iterable(selections))),
                 )
 
             case FieldType.RADIO_MATRIX:
-                field_summary = {}
-                questions = field.questions or []
-                choices = field.choices or []
-
-                for question in questions:
-                    # note: removed questions will not be included in the summary
-                    question_summary = {choice.slug: 0 for choice in choices}
-
-                    for values in valuesies:
-                        value = values.get(field.slug, {}).get(question.slug)
-                        if value is not None:
-                            # account for the possibility of a choice being removed
-                            question_summary.setdefault(value, 0)
-                            question_summary[value] += 1
-
-                    field_summary[question.slug] = dict(question_summary)
+                # (question slug, choice slug) -> count
+                answer_counts = Counter(chain.from_iterable(map(dict.items, column)))
+
+                # note: removed questions will not be included in the summary
+                question_slugs = [question.slug for question in field.questions or []]
+                question_counts: dict[str, Counter[str]] = {
+                    question_slug: Counter() for question_slug in question_slugs
+                }
+                for (question_slug, value), count in answer_counts.items():
+                    if value is not None and (counts := question_counts.get(question_slug)) is not None:
+                        counts[value] += count
 
                 # these are more meaningful on a per-question basis but provided for completeness
-                count_responses = sum(
-                    1 for values in valuesies if any(answer for answer in values.get(field.slug, {}).values())
-                )
-                count_missing_responses = total_responses - count_responses
+                count_responses = sum(map(any, map(dict.values, column)))
 
                 summary[field.slug] = MatrixFieldSummary(
                     countResponses=count_responses,
-                    countMissingResponses=count_missing_responses,
-                    summary=field_summary,
+                    countMissingResponses=total_responses - count_responses,
+                    summary={
+                        question_slug: _count_with_choices(field.choices, counts)
+                        for question_slug, counts in question_counts.items()
+                    },
                 )
 
     return summary
+
+
+def init_summary(fields: list[Field]) -> Summary:
+    """
+    Returns an empty summary for the given fields. Together with `accumulate_response`
+    this can be used to maintain a summary incrementally.
+    """
+    return summarize_responses(fields, [])
+
+
+def _count_response(field_summary: BaseFieldSummary, is_answered: bool, weight: int):
+    if is_answered:
+        field_summary.countResponses += weight
+    else:
+        field_summary.countMissingResponses += weight
+
+
+def _count_value(counts: dict[str, int], value: str, weight: int, known_values: Collection[str] = ()):
+    count = counts.get(value, 0) + weight
+
+    # values that are not known choices only appear in the summary while they have responses
+    if count or value in known_values:
+        counts[value] = count
+    else:
+        counts.pop(value, None)
+
+
+def accumulate_response(summary: Summary, fields: list[Field], values: dict[str, Any], weight: int = 1):
+    """
+    Adds (weight=1) or removes (weight=-1) a single response to or from a summary in place.
+
+    Accumulating a list of responses onto `init_summary(fields)` yields the same result
+    as `summarize_responses(fields, responses)`, and removing a previously added response
+    undoes its effect.
+    """
+    for field in fields:
+        field_summary = summary.get(field.slug)
+        if field_summary is None:
+            continue
+
+        match field_summary:
+            case SelectFieldSummary() if field.type == FieldType.SINGLE_LINE_TEXT:
+                value = values.get(field.slug)
+                _count_response(field_summary, value is not None, weight)
+                if value is not None:
+                    _count_value(field_summary.summary, str(value), weight)
+
+            case TextFieldSummary():
+                value = values.get(field.slug)
+                value = str(value).strip() if value is not None else ""
+                _count_response(field_summary, bool(value), weight)
+                if value:
+                    if weight > 0:
+                        field_summary.summary.append(value)
+                    elif value in field_summary.summary:
+                        field_summary.summary.remove(value)
+
+            case FileUploadSummary():
+                value = values.get(field.slug, [])
+                _count_response(field_summary, bool(value), weight)
+                for url in value or []:
+                    if weight > 0:
+                        field_summary.summary.append(url)
+                    elif url in field_summary.summary:
+                        field_summary.summary.remove(url)
+
+            case SingleCheckboxSummary():
+                _count_response(field_summary, bool(values.get(field.slug)), weight)
+
+            case SelectFieldSummary() if field.type == FieldType.SINGLE_SELECT:
+                value = values.get(field.slug)
+                _count_response(field_summary, bool(value), weight)
+                if value:
+                    choices = [choice.slug for choice in field.choices or []]
+                    _count_value(field_summary.summary, str(value), weight, choices)
+
+            case SelectFieldSummary():
+                value = values.get(field.slug, [])
+                _count_response(field_summary, bool(value), weight)
+                choices = [choice.slug for choice in field.choices or []]
+                for choice_slug in value or []:
+                    _count_value(field_summary.summary, choice_slug, weight, choices)
+
+            case MatrixFieldSummary():
+                answers = values.get(field.slug, {})
+                _count_response(field_summary, any(answer for answer in answers.values()), weight)
+                choices = [choice.slug for choice in field.choices or []]
+                for question_slug, question_summary in field_summary.summary.items():
+                    value = answers.get(question_slug)
+                    if value is not None:
+                        _count_value(question_summary, value, weight, choices)
@@ -1,11 +1,12 @@
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest
 from django.shortcuts import get_object_or_404
 from django.utils.timezone import now
 
 from access.cbac import graphql_check_instance
+from core.csv_export import CSV_EXPORT_FORMATS, csv_streaming_response
 from core.models import Event
 
-from ..excel_export import write_responses_as_excel
+from ..excel_export import iter_response_rows
 from ..models.survey import Survey
 
 
@@ -13,28 +14,33 @@ def forms_survey_excel_export_view(
     request: HttpRequest,
     event_slug: str | None,
     survey_slug: str,
+    format: str = "xlsx",
 ):
+    """
+    Exports survey responses as XLSX, CSV or TSV. CSV and TSV are streamed to the client
+    as they are produced; XLSX is built in constant memory before sending.
+    """
+    if format not in CSV_EXPORT_FORMATS:
+        raise Http404(f"Unsupported export format: {format}")
+
     timestamp = now().strftime("%Y%m%d%H%M%S")
 
     if event_slug:
         event = get_object_or_404(Event, slug=event_slug)
         survey = get_object_or_404(Survey, event=event, slug=survey_slug)
-        filename = f"{event.slug}_{survey.slug}_responses_{timestamp}.xlsx"
+        filename = f"{event.slug}_{survey.slug}_responses_{timestamp}.{format}"
     else:
         survey = get_object_or_404(Survey, event__isnull=True, slug=survey_slug)
-        filename = f"{survey.slug}_responses_{timestamp}.xlsx"
+        filename = f"{survey.slug}_responses_{timestamp}.{format}"
 
     # TODO(#324): Failed check causes 500 now, turn it to 403 (middleware?)
     graphql_check_instance(survey, request, "responses", "query")
 
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    write_responses_as_excel(
+    rows = iter_response_rows(
         survey.dimensions.order_by("order"),
         survey.combined_fields,
-        survey.responses.order_by("created_at").only("form_data"),
-        response,
+        survey.responses.order_by("created_at"),
     )
 
-    return response
+    # survey responses may contain anything, so use UTF-8 instead of the legacy default encoding
+    return csv_streaming_response(rows, filename, dialect=CSV_EXPORT_FORMATS[format], encoding="utf-8")
@@ -114,6 +114,7 @@ MIDDLEWARE = (
     "core.middleware.PageWizardMiddleware",
     "core.middleware.EventOrganizationMiddleware",
     "django.middleware.locale.LocaleMiddleware",
+    "event_log_v2.middleware.EventLogBufferMiddleware",
 )
 
 ROOT_URLCONF = "kompassi.urls"
@@ -338,6 +339,12 @@ AWS_S3_ENDPOINT_URL = env("MINIO_ENDPOINT_URL", default="http://localhost:9000")
 
 KOMPASSI_V2_BASE_URL = env("KOMPASSI_V2_BASE_URL", default="http://localhost:3000")
 
+# Point these to the stand-in gateway (manage.py payments_fake_checkout_server) for offline load testing
+CHECKOUT_API_BASE_URL = env("CHECKOUT_API_BASE_URL", default="https://api.checkout.fi")
+CHECKOUT_PAYMENT_WALL_ORIGIN = env("CHECKOUT_PAYMENT_WALL_ORIGIN", default="pay.checkout.fi")
+# Create Checkout payments in a background task instead of holding the request while the API responds
+CHECKOUT_ASYNC_CREATE_PAYMENT = env.bool("CHECKOUT_ASYNC_CREATE_PAYMENT", default=False)
+
 # TODO script-src unsafe-inline needed at least by feedback.js. unsafe-eval needed by Knockout (roster.js).
 # XXX style-src unsafe-inline is just basic plebbery and should be eradicated.
 CSP_DEFAULT_SRC = "'none'"
@@ -0,0 +1,116 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from tabulate import tabulate
+
+from ...roster_planner import RosterPlanner, Worker
+
+MAX_HOURS_CHOICES = [10, 12, 14, 16]
+UNAVAILABLE_PROBABILITY = 0.1
+DAY_HOURS = range(8, 23)
+
+
+def make_shortfall(
+    rng: random.Random,
+    num_job_categories: int,
+    num_jobs_per_category: int,
+    num_hours: int,
+) -> tuple[dict[int, list[int]], dict[int, int]]:
+    """
+    Jobs need 0-3 workers for each hour of the day and nobody at night.
+    """
+    shortfall = {}
+    job_category_ids = {}
+
+    for job_category_id in range(num_job_categories):
+        for i in range(num_jobs_per_category):
+            job_id = job_category_id * num_jobs_per_category + i
+            job_category_ids[job_id] = job_category_id
+            shortfall[job_id] = [rng.randint(0, 3) if hour % 24 in DAY_HOURS else 0 for hour in range(num_hours)]
+
+    return shortfall, job_category_ids
+
+
+def make_workers(rng: random.Random, num_workers: int, num_job_categories: int, num_hours: int) -> list[Worker]:
+    workers = []
+
+    for worker_id in range(num_workers):
+        unavailable = 0
+        for hour in range(num_hours):
+            if rng.random() < UNAVAILABLE_PROBABILITY:
+                unavailable |= 1 << hour
+
+        workers.append(
+            Worker(
+                id=worker_id,
+                job_category_ids=frozenset(rng.sample(range(num_job_categories), rng.randint(1, 2))),
+                remaining_hours=rng.choice(MAX_HOURS_CHOICES),
+                unavailable=unavailable,
+            )
+        )
+
+    return workers
+
+
+class Command(BaseCommand):
+    help = "Benchmark the roster planner on a synthetic event"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1000)
+        parser.add_argument("--job-categories", type=int, default=10)
+        parser.add_argument("--jobs-per-category", type=int, default=5)
+        parser.add_argument("--hours", type=int, default=72)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        num_hours = options["hours"]
+
+        shortfall, job_category_ids = make_shortfall(
+            rng,
+            options["job_categories"],
+            options["jobs_per_category"],
+            num_hours,
+        )
+        workers = make_workers(rng, options["workers"], options["job_categories"], num_hours)
+        max_hours_by_worker_id = {worker.id: worker.remaining_hours for worker in workers}
+        unavailable_by_worker_id = {worker.id: worker.unavailable for worker in workers}
+
+        t0 = perf_counter()
+        plan = RosterPlanner(num_hours, workers).solve(shortfall, job_category_ids)
+        t1 = perf_counter()
+
+        # check the plan against the constraints
+        busy_by_worker_id: dict[int, int] = {}
+        hours_by_worker_id: dict[int, int] = {}
+        for shift in plan.shifts:
+            mask = ((1 << shift.hours) - 1) << shift.start
+            busy = busy_by_worker_id.get(shift.worker_id, 0)
+            if busy & mask or unavailable_by_worker_id[shift.worker_id] & mask:
+                raise AssertionError(f"Worker {shift.worker_id} planned on overlapping or unavailable hours")
+            busy_by_worker_id[shift.worker_id] = busy | mask
+            hours_by_worker_id[shift.worker_id] = hours_by_worker_id.get(shift.worker_id, 0) + shift.hours
+
+        for worker_id, hours in hours_by_worker_id.items():
+            if hours > max_hours_by_worker_id[worker_id]:
+                raise AssertionError(f"Worker {worker_id} planned over their maximum hours")
+
+        num_required_hours = sum(sum(row) for row in shortfall.values())
+        if plan.num_planned_hours + plan.num_unfilled_hours != num_required_hours:
+            raise AssertionError("Planned and unfilled hours do not add up to the requirements")
+
+        print(
+            tabulate(
+                [
+                    ("workers", len(workers)),
+                    ("jobs", len(shortfall)),
+                    ("work hours", num_hours),
+                    ("required hours", num_required_hours),
+                    ("planned shifts", len(plan.shifts)),
+                    ("planned hours", plan.num_planned_hours),
+                    ("unfilled hours", plan.num_unfilled_hours),
+                    ("seconds", f"{t1 - t0:.3f}"),
+                ],
+            )
+        )
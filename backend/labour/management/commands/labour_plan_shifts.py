@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Event
+
+from ...models import JobCategory
+from ...roster_planner import DEFAULT_MAX_HOURS, DEFAULT_MAX_SHIFT_HOURS, DEFAULT_MIN_SHIFT_HOURS, plan_shifts
+
+
+class Command(BaseCommand):
+    help = "Plan shifts to cover the unallocated job requirements of an event"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_slug", metavar="EVENT_SLUG")
+        parser.add_argument(
+            "--job-category",
+            dest="job_category_slugs",
+            action="append",
+            metavar="JOB_CATEGORY_SLUG",
+            help="Only plan these job categories (default: all)",
+        )
+        parser.add_argument("--max-hours", type=int, default=DEFAULT_MAX_HOURS)
+        parser.add_argument("--max-shift-hours", type=int, default=DEFAULT_MAX_SHIFT_HOURS)
+        parser.add_argument("--min-shift-hours", type=int, default=DEFAULT_MIN_SHIFT_HOURS)
+        parser.add_argument(
+            "--really",
+            action="store_true",
+            default=False,
+            help="Actually create the shifts (default: only report what would be done)",
+        )
+
+    def handle(self, *args, **options):
+        event = Event.objects.get(slug=options["event_slug"])
+
+        job_categories = None
+        if options["job_category_slugs"]:
+            job_categories = list(JobCategory.objects.filter(event=event, slug__in=options["job_category_slugs"]))
+
+        plan, shifts = plan_shifts(
+            event,
+            job_categories,
+            commit=options["really"],
+            default_max_hours=options["max_hours"],
+            max_shift_hours=options["max_shift_hours"],
+            min_shift_hours=options["min_shift_hours"],
+        )
+
+        self.stdout.write(
+            f"{'Created' if options['really'] else 'Would create'} {len(shifts)} shifts "
+            f"({plan.num_planned_hours} hours), {plan.num_unfilled_hours} hours left unfilled"
+        )
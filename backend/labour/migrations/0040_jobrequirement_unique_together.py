@@ -0,0 +1,38 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+def remove_duplicate_requirements(apps, schema_editor):
+    """
+    The roster API has kept one requirement per job and hour (using get_or_create), but that
+    was never enforced. Keep the latest one should there be duplicates.
+    """
+    JobRequirement = apps.get_model("labour", "JobRequirement")
+
+    duplicates = (
+        JobRequirement.objects.values("job", "start_time")
+        .annotate(max_id=models.Max("id"), num_requirements=models.Count("id"))
+        .filter(num_requirements__gt=1)
+    )
+
+    for duplicate in duplicates:
+        JobRequirement.objects.filter(
+            job=duplicate["job"],
+            start_time=duplicate["start_time"],
+            id__lt=duplicate["max_id"],
+        ).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("labour", "0039_remove_personnelclass_perks_markdown_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_requirements, migrations.RunPython.noop, elidable=True),
+        migrations.AlterUniqueTogether(
+            name="jobrequirement",
+            unique_together={("job", "start_time")},
+        ),
+    ]
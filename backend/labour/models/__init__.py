@@ -11,6 +11,8 @@ from .roster import (
     Job,
     JobRequirement,
     SetJobRequirementsRequest,
+    SetRequirementsItem,
+    SetRequirementsRequest,
     Shift,
     WorkPeriod,
 )
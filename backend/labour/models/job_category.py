@@ -8,6 +8,7 @@ from django.utils.translation import gettext_lazy as _
 from core.models import Event
 from core.utils import NONUNIQUE_SLUG_FIELD_PARAMS, omit_keys, pick_attrs, slugify
 
+from ..roster_matrix import RosterMatrix
 from .personnel_class import PersonnelClass
 from .qualifications import Qualification
 
@@ -204,7 +205,18 @@ class JobCategory(models.Model):
 
         return super().save(*args, **kwargs)
 
-    def as_dict(self, include_jobs=False, include_requirements=False, include_people=False, include_shifts=False):
+    def as_dict(
+        self,
+        include_jobs=False,
+        include_requirements=False,
+        include_people=False,
+        include_shifts=False,
+        roster_matrix: RosterMatrix | None = None,
+    ):
+        """
+        Pass roster_matrix (see labour.roster_matrix) when serializing many job categories of the
+        same event so that their requirements need not be queried one job category at a time.
+        """
         if include_shifts and not include_jobs:
             raise AssertionError("If include_shifts is specified, must specify also include_jobs")
 
@@ -215,11 +227,20 @@ class JobCategory(models.Model):
         )
 
         if include_jobs:
-            doc["jobs"] = [job.as_dict(include_shifts=include_shifts) for job in self.jobs.all()]
+            if roster_matrix is None:
+                roster_matrix = RosterMatrix.for_event(self.event, job_category=self)
+
+            doc["jobs"] = [
+                job.as_dict(include_shifts=include_shifts, roster_matrix=roster_matrix) for job in self.jobs.all()
+            ]
 
         if include_requirements:
-            doc["requirements"] = self._make_requirements()
-            doc["allocated"] = self._make_allocated()
+            if roster_matrix is not None:
+                doc["requirements"] = roster_matrix.get_job_category_requirements(self.id)
+                doc["allocated"] = roster_matrix.get_job_category_allocated(self.id)
+            else:
+                doc["requirements"] = self._make_requirements()
+                doc["allocated"] = self._make_allocated()
 
         if include_people:
             doc["people"] = self._make_people()
@@ -228,3 +249,24 @@ class JobCategory(models.Model):
 
     def as_roster_api_dict(self):
         return self.as_dict(include_jobs=True, include_people=True, include_shifts=True)
+
+    def as_roster_api_delta_dict(self, job_ids: set[int]):
+        """
+        Like as_roster_api_dict, but only the requirements and allocations of the job category
+        and of the given jobs. Used to respond to requests that only change requirements.
+        """
+        roster_matrix = RosterMatrix.for_event(self.event, job_category=self)
+
+        return dict(
+            slug=self.slug,
+            requirements=roster_matrix.get_job_category_requirements(self.id),
+            allocated=roster_matrix.get_job_category_allocated(self.id),
+            jobs=[
+                dict(
+                    slug=job.slug,
+                    requirements=roster_matrix.get_job_requirements(job.id),
+                    allocated=roster_matrix.get_job_allocated(job.id),
+                )
+                for job in self.jobs.filter(id__in=job_ids).order_by("id")
+            ],
+        )
@@ -1,17 +1,30 @@
 from __future__ import annotations
 
 from collections import defaultdict, namedtuple
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
 
 from dateutil.parser import parse as parse_date
 from dateutil.tz import tzlocal
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.http import Http404
 from django.utils.translation import gettext_lazy as _
 
 from api.utils import JSONSchemaObject
 from core.csv_export import CsvExportMixin
-from core.utils import NONUNIQUE_SLUG_FIELD_PARAMS, ONE_HOUR, format_interval, pick_attrs, slugify
+from core.utils import (
+    NONUNIQUE_SLUG_FIELD_PARAMS,
+    ONE_HOUR,
+    format_interval,
+    full_hours_between,
+    pick_attrs,
+    slugify,
+)
+
+if TYPE_CHECKING:
+    from ..roster_matrix import RosterMatrix
+    from .job_category import JobCategory
 
 
 class WorkPeriod(models.Model):
@@ -85,7 +98,7 @@ class Job(models.Model):
     def _make_shifts(self):
         return [shift.as_dict() for shift in self.shifts.all()]
 
-    def as_dict(self, include_requirements=True, include_shifts=False):
+    def as_dict(self, include_requirements=True, include_shifts=False, roster_matrix: RosterMatrix | None = None):
         doc = pick_attrs(
             self,
             "slug",
@@ -93,8 +106,12 @@ class Job(models.Model):
         )
 
         if include_requirements:
-            doc["requirements"] = self._make_requirements()
-            doc["allocated"] = self._make_allocated()
+            if roster_matrix is not None:
+                doc["requirements"] = roster_matrix.get_job_requirements(self.id)
+                doc["allocated"] = roster_matrix.get_job_allocated(self.id)
+            else:
+                doc["requirements"] = self._make_requirements()
+                doc["allocated"] = self._make_allocated()
 
         if include_shifts:
             doc["shifts"] = self._make_shifts()
@@ -131,6 +148,51 @@ class JobRequirement(models.Model):
 
         return [allocated_by_start_time[t] for t in work_hours]
 
+    @classmethod
+    def set_requirements(cls, job_category: JobCategory, items: list[SetRequirementsItem]) -> set[int]:
+        """
+        Sets the required number of workers for each hour in the spans of the items in one
+        upsert. Hours outside the work hours of the event are ignored. Later items override
+        earlier ones for the same job and hour. Returns the ids of the jobs that were touched.
+
+        :raises Http404: if an item refers to a job not in the job category
+        """
+        meta = job_category.event.labour_event_meta
+
+        jobs_by_slug = {job.slug: job for job in job_category.jobs.filter(slug__in={item.job for item in items})}
+
+        requirements_by_key: dict[tuple[int, datetime], JobRequirement] = {}
+        for item in items:
+            job = jobs_by_slug.get(item.job)
+            if job is None:
+                raise Http404(f"Job not found: {item.job}")
+
+            start_time = parse_date(item.startTime)
+            end_time = start_time + timedelta(hours=item.hours - 1)  # -1 due to end parameter being inclusive
+
+            start_time = max(start_time, meta.work_begins)
+            end_time = min(end_time, meta.work_ends)
+
+            if start_time > end_time:
+                continue
+
+            for hour in full_hours_between(start_time, end_time):  # start/end inclusive
+                requirements_by_key[job.id, hour] = cls(
+                    job=job,
+                    start_time=hour,
+                    end_time=hour + ONE_HOUR,
+                    count=item.required,
+                )
+
+        cls.objects.bulk_create(
+            requirements_by_key.values(),
+            update_conflicts=True,
+            unique_fields=["job", "start_time"],
+            update_fields=["count", "end_time"],
+        )
+
+        return {job_id for job_id, _hour in requirements_by_key}
+
     def save(self, *args, **kwargs):
         if self.start_time and not self.end_time:
             self.end_time = self.start_time + ONE_HOUR
@@ -140,6 +202,7 @@ class JobRequirement(models.Model):
     class Meta:
         verbose_name = _("job requirement")
         verbose_name_plural = _("job requirements")
+        unique_together = [("job", "start_time")]
 
 
 class Shift(models.Model, CsvExportMixin):
@@ -206,6 +269,8 @@ class Shift(models.Model, CsvExportMixin):
     admin_get_person.short_description = _("person")
     admin_get_person.admin_order_field = "signup__person"
 
+    csv_prefetch_related = ("job__job_category", "signup__person")
+
     @classmethod
     def get_csv_fields(cls, event):
         from core.models import Person
@@ -265,6 +330,42 @@ class SetJobRequirementsRequest(SetJobRequirementsRequestBase, JSONSchemaObject)
     )
 
 
+SetRequirementsItemBase = namedtuple("SetRequirementsItem", "job startTime hours required")
+
+
+class SetRequirementsItem(SetRequirementsItemBase, JSONSchemaObject):
+    schema = dict(
+        type="object",
+        properties=dict(
+            job=dict(type="string", minLength=1),
+            **SetJobRequirementsRequest.schema["properties"],
+        ),
+        required=list(SetRequirementsItemBase._fields),
+    )
+
+
+SetRequirementsRequestBase = namedtuple("SetRequirementsRequest", "requirements")
+
+
+class SetRequirementsRequest(SetRequirementsRequestBase, JSONSchemaObject):
+    """
+    Sets requirements of many jobs of a job category for many spans of hours at once.
+    """
+
+    schema = dict(
+        type="object",
+        properties=dict(
+            requirements=dict(type="array", items=SetRequirementsItem.schema, maxItems=1000),
+        ),
+        required=["requirements"],
+    )
+
+    @classmethod
+    def from_dict(cls, d):
+        request = super().from_dict(d)
+        return cls(requirements=[SetRequirementsItem.from_dict(item) for item in request.requirements])
+
+
 EditJobRequestBase = namedtuple("EditJobRequest", "title")
 
 
@@ -0,0 +1,132 @@
+"""
+Jobs × work hours matrices of required and allocated workers for the Roster API.
+
+The columns of each row correspond to LabourEventMeta.work_hours of the event. A matrix is
+built from two queries (job requirements and shifts) regardless of the number of jobs and
+job categories, and the per-job and per-job-category arrays of the Roster API are read
+from it.
+
+The work hours of an event are consecutive full hours, so the column of a point in time is
+its offset in hours from the first work hour. Requirements and shifts outside the work hours
+of the event are not counted.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from core.utils import ONE_HOUR
+
+if TYPE_CHECKING:
+    from core.models import Event
+
+    from .models import JobCategory
+
+
+@dataclass
+class RosterMatrix:
+    work_hours: list[datetime]
+    # job id -> number of required or allocated workers for each work hour
+    requirements: dict[int, list[int]]
+    allocated: dict[int, list[int]]
+    # job id -> job category id, for the jobs that have rows in either matrix
+    job_category_ids: dict[int, int]
+
+    @classmethod
+    def for_event(cls, event: Event, job_category: JobCategory | None = None) -> RosterMatrix:
+        """
+        Builds the matrices of all jobs of the event, or only those of job_category if given.
+        """
+        from .models import JobRequirement, Shift
+
+        requirements = JobRequirement.objects.filter(job__job_category__event=event)
+        shifts = Shift.objects.filter(job__job_category__event=event)
+
+        if job_category is not None:
+            requirements = requirements.filter(job__job_category=job_category)
+            shifts = shifts.filter(job__job_category=job_category)
+
+        matrix = cls(
+            work_hours=event.labour_event_meta.work_hours,
+            requirements={},
+            allocated={},
+            job_category_ids={},
+        )
+
+        for job_id, job_category_id, start_time, count in requirements.values_list(
+            "job_id",
+            "job__job_category_id",
+            "start_time",
+            "count",
+        ):
+            matrix.job_category_ids[job_id] = job_category_id
+            matrix._add(matrix.requirements, job_id, start_time, 1, count)
+
+        for job_id, job_category_id, start_time, hours in shifts.values_list(
+            "job_id",
+            "job__job_category_id",
+            "start_time",
+            "hours",
+        ):
+            matrix.job_category_ids[job_id] = job_category_id
+            matrix._add(matrix.allocated, job_id, start_time, hours, 1)
+
+        return matrix
+
+    @property
+    def num_hours(self) -> int:
+        return len(self.work_hours)
+
+    def get_column(self, t: datetime) -> int | None:
+        """
+        Returns the offset of t in hours from the first work hour (which may be out of bounds),
+        or None if t is not a full hour.
+        """
+        if not self.work_hours:
+            return None
+
+        offset = t - self.work_hours[0]
+        if offset % ONE_HOUR:
+            return None
+
+        return offset // ONE_HOUR
+
+    def _add(self, rows: dict[int, list[int]], job_id: int, start_time: datetime, hours: int, count: int):
+        start = self.get_column(start_time)
+        if start is None:
+            return
+
+        row = rows.get(job_id)
+        if row is None:
+            row = rows[job_id] = [0] * self.num_hours
+
+        for column in range(max(start, 0), min(start + hours, self.num_hours)):
+            row[column] += count
+
+    def _get_row(self, rows: dict[int, list[int]], job_id: int) -> list[int]:
+        row = rows.get(job_id)
+        return list(row) if row is not None else [0] * self.num_hours
+
+    def _sum_rows(self, rows: dict[int, list[int]], job_category_id: int) -> list[int]:
+        result = [0] * self.num_hours
+
+        for job_id, row in rows.items():
+            if self.job_category_ids[job_id] == job_category_id:
+                for column, value in enumerate(row):
+                    result[column] += value
+
+        return result
+
+    def get_job_requirements(self, job_id: int) -> list[int]:
+        return self._get_row(self.requirements, job_id)
+
+    def get_job_allocated(self, job_id: int) -> list[int]:
+        return self._get_row(self.allocated, job_id)
+
+    def get_job_category_requirements(self, job_category_id: int) -> list[int]:
+        return self._sum_rows(self.requirements, job_category_id)
+
+    def get_job_category_allocated(self, job_category_id: int) -> list[int]:
+        return self._sum_rows(self.allocated, job_category_id)
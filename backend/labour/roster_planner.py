@@ -0,0 +1,351 @@
+"""
+Automatic shift planning for labour rosters.
+
+The planner covers the shortfall (requirements minus already allocated workers, see
+labour.roster_matrix) of each job with shifts of accepted signups. Workers are only
+assigned to job categories they are accepted to and qualified for
+(JobCategory.is_person_qualified), never on two shifts at the same time, and not beyond
+their maximum hours, which are taken from the total_work field of the signup extra
+("10h", "12h" etc.) if the event has one.
+
+Existing shifts are kept as they are, so the planner can be re-run after manual changes
+and it only fills in what is still missing.
+
+The solver is greedy: for each job it walks the hours and fills each run of shortfall
+with shifts of at most max_shift_hours, taking workers of the job category in turns so
+that work is spread out evenly. Hours of workers are kept as bitmasks over the work hours,
+which makes checking for conflicts a single operation. Hours that cannot be covered are
+reported as unfilled.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Callable, Collection, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from django.db import transaction
+
+from .roster_matrix import RosterMatrix
+
+if TYPE_CHECKING:
+    from core.models import Event
+
+    from .models import JobCategory, Shift, Signup
+
+logger = logging.getLogger("kompassi")
+
+DEFAULT_MAX_HOURS = 12
+DEFAULT_MAX_SHIFT_HOURS = 4
+DEFAULT_MIN_SHIFT_HOURS = 2
+
+TOTAL_WORK_HOURS_RE = re.compile(r"^\s*(\d+)")
+
+
+@dataclass
+class Worker:
+    id: int
+    job_category_ids: frozenset[int]
+    remaining_hours: int
+    # bitmasks over the columns of work hours
+    busy: int = 0
+    unavailable: int = 0
+
+    def can_work(self, start: int, hours: int) -> bool:
+        mask = ((1 << hours) - 1) << start
+        return self.remaining_hours >= hours and not (self.busy | self.unavailable) & mask
+
+    def assign(self, start: int, hours: int):
+        self.busy |= ((1 << hours) - 1) << start
+        self.remaining_hours -= hours
+
+
+@dataclass(frozen=True)
+class PlannedShift:
+    worker_id: int
+    job_id: int
+    start: int
+    hours: int
+
+
+@dataclass
+class RosterPlan:
+    shifts: list[PlannedShift] = field(default_factory=list)
+    # job id -> number of workers still missing for each work hour
+    unfilled: dict[int, list[int]] = field(default_factory=dict)
+
+    @property
+    def num_planned_hours(self) -> int:
+        return sum(shift.hours for shift in self.shifts)
+
+    @property
+    def num_unfilled_hours(self) -> int:
+        return sum(sum(row) for row in self.unfilled.values())
+
+
+class RosterPlanner:
+    def __init__(
+        self,
+        num_hours: int,
+        workers: Iterable[Worker],
+        max_shift_hours: int = DEFAULT_MAX_SHIFT_HOURS,
+        min_shift_hours: int = DEFAULT_MIN_SHIFT_HOURS,
+    ):
+        self.num_hours = num_hours
+        self.max_shift_hours = max_shift_hours
+        self.min_shift_hours = min_shift_hours
+
+        self.workers_by_job_category: dict[int, list[Worker]] = {}
+        for worker in workers:
+            for job_category_id in worker.job_category_ids:
+                self.workers_by_job_category.setdefault(job_category_id, []).append(worker)
+
+        # job category id -> index of the worker whose turn it is
+        self.turns: dict[int, int] = {}
+
+    def find_worker(self, job_category_id: int, start: int, hours: int) -> tuple[Worker, int] | None:
+        """
+        Finds a worker for the longest shift of hours down to min_shift_hours starting at start.
+        Returns the worker and the length of the shift, or None if nobody can take it.
+        """
+        workers = self.workers_by_job_category.get(job_category_id)
+        if not workers:
+            return None
+
+        num_workers = len(workers)
+        turn = self.turns.get(job_category_id, 0)
+
+        for length in range(hours, min(hours, self.min_shift_hours) - 1, -1):
+            for i in range(num_workers):
+                index = (turn + i) % num_workers
+                worker = workers[index]
+                if worker.can_work(start, length):
+                    self.turns[job_category_id] = (index + 1) % num_workers
+                    return worker, length
+
+        return None
+
+    def solve(self, shortfall: dict[int, list[int]], job_category_ids: dict[int, int]) -> RosterPlan:
+        """
+        :param shortfall: job id -> number of workers missing for each work hour
+        :param job_category_ids: job id -> job category id
+        """
+        plan = RosterPlan()
+
+        for job_id, row in sorted(shortfall.items()):
+            job_category_id = job_category_ids[job_id]
+            missing = list(row)
+            hour = 0
+
+            while hour < self.num_hours:
+                if missing[hour] <= 0:
+                    hour += 1
+                    continue
+
+                end = hour
+                while end < self.num_hours and missing[end] > 0 and end - hour < self.max_shift_hours:
+                    end += 1
+
+                found = self.find_worker(job_category_id, hour, end - hour)
+                if found is None:
+                    # nobody can start at this hour, give up on it and move on
+                    plan.unfilled.setdefault(job_id, [0] * self.num_hours)[hour] += missing[hour]
+                    missing[hour] = 0
+                    continue
+
+                worker, length = found
+                worker.assign(hour, length)
+                plan.shifts.append(PlannedShift(worker_id=worker.id, job_id=job_id, start=hour, hours=length))
+
+                for column in range(hour, hour + length):
+                    missing[column] -= 1
+
+        return plan
+
+
+def get_max_hours(total_work: str | None, default: int = DEFAULT_MAX_HOURS) -> int:
+    if total_work and (match := TOTAL_WORK_HOURS_RE.match(total_work)):
+        return int(match.group(1))
+
+    return default
+
+
+def get_total_work_by_signup_id(event: Event, signups: list[Signup]) -> dict[int, str]:
+    SignupExtra = event.labour_event_meta.signup_extra_model
+    if SignupExtra is None or SignupExtra.get_field("total_work") is None:
+        return {}
+
+    if SignupExtra.schema_version >= 2:  # noqa: PLR2004
+        signup_ids_by_person_id = {signup.person_id: signup.id for signup in signups}
+        return {
+            signup_ids_by_person_id[person_id]: total_work
+            for person_id, total_work in SignupExtra.objects.filter(
+                event=event,
+                person__in=signup_ids_by_person_id.keys(),
+            ).values_list("person_id", "total_work")
+        }
+    else:
+        return dict(SignupExtra.objects.filter(signup__in=signups).values_list("signup_id", "total_work"))
+
+
+def load_workers(
+    event: Event,
+    job_categories: Collection[JobCategory],
+    roster_matrix: RosterMatrix,
+    default_max_hours: int = DEFAULT_MAX_HOURS,
+    get_unavailable_hours: Callable[[Signup], Iterable[datetime]] | None = None,
+) -> list[Worker]:
+    """
+    Loads the active signups accepted to any of job_categories as workers. Their existing shifts
+    in all jobs of the event count towards their maximum hours and keep them busy.
+
+    :param get_unavailable_hours: optionally returns the work hours a signup cannot work
+    """
+    from .models import Shift, Signup
+
+    job_categories_by_id = {job_category.id: job_category for job_category in job_categories}
+
+    signups = list(
+        Signup.objects.filter(
+            event=event,
+            is_active=True,
+            job_categories_accepted__in=job_categories_by_id.keys(),
+        )
+        .distinct()
+        .select_related("person")
+        .prefetch_related("job_categories_accepted", "person__qualifications__qualification")
+    )
+
+    total_work_by_signup_id = get_total_work_by_signup_id(event, signups)
+
+    busy_by_signup_id: dict[int, int] = {}
+    assigned_hours_by_signup_id: dict[int, int] = {}
+    for signup_id, start_time, hours in Shift.objects.filter(signup__in=signups).values_list(
+        "signup_id",
+        "start_time",
+        "hours",
+    ):
+        assigned_hours_by_signup_id[signup_id] = assigned_hours_by_signup_id.get(signup_id, 0) + hours
+
+        # only the part of the shift within the work hours can collide with anything we plan
+        if (start := roster_matrix.get_column(start_time)) is not None:
+            first, last = max(start, 0), min(start + hours, roster_matrix.num_hours)
+            if first < last:
+                mask = ((1 << (last - first)) - 1) << first
+                busy_by_signup_id[signup_id] = busy_by_signup_id.get(signup_id, 0) | mask
+
+    workers = []
+    for signup in signups:
+        # job categories and person qualifications are prefetched, so this does not query
+        qualified_job_category_ids = frozenset(
+            job_category.id
+            for job_category in signup.job_categories_accepted.all()
+            if job_category.id in job_categories_by_id
+            and job_categories_by_id[job_category.id].is_person_qualified(signup.person)
+        )
+        if not qualified_job_category_ids:
+            continue
+
+        unavailable = 0
+        if get_unavailable_hours is not None:
+            for t in get_unavailable_hours(signup):
+                column = roster_matrix.get_column(t)
+                if column is not None and 0 <= column < roster_matrix.num_hours:
+                    unavailable |= 1 << column
+
+        max_hours = get_max_hours(total_work_by_signup_id.get(signup.id), default_max_hours)
+
+        workers.append(
+            Worker(
+                id=signup.id,
+                job_category_ids=qualified_job_category_ids,
+                remaining_hours=max_hours - assigned_hours_by_signup_id.get(signup.id, 0),
+                busy=busy_by_signup_id.get(signup.id, 0),
+                unavailable=unavailable,
+            )
+        )
+
+    return workers
+
+
+def plan_shifts(
+    event: Event,
+    job_categories: Collection[JobCategory] | None = None,
+    commit: bool = False,
+    default_max_hours: int = DEFAULT_MAX_HOURS,
+    max_shift_hours: int = DEFAULT_MAX_SHIFT_HOURS,
+    min_shift_hours: int = DEFAULT_MIN_SHIFT_HOURS,
+    get_unavailable_hours: Callable[[Signup], Iterable[datetime]] | None = None,
+) -> tuple[RosterPlan, list[Shift]]:
+    """
+    Plans shifts to cover the unallocated requirements of the jobs in job_categories (default:
+    all labour job categories of the event). If commit is set, the planned shifts are created
+    in one transaction. Returns the plan and the (unsaved unless commit) shifts.
+    """
+    from .models import JobCategory, Shift
+
+    with transaction.atomic():
+        # planners working on the same job categories wait for each other
+        job_category_queryset = JobCategory.objects.filter(event=event, app_label="labour")
+        if job_categories is not None:
+            job_category_queryset = job_category_queryset.filter(id__in=[jc.id for jc in job_categories])
+        job_categories = list(
+            job_category_queryset.select_for_update(of=("self",)).prefetch_related("required_qualifications")
+        )
+
+        roster_matrix = RosterMatrix.for_event(event)
+        job_category_ids = {job_category.id for job_category in job_categories}
+
+        shortfall = {}
+        for job_id, requirements in roster_matrix.requirements.items():
+            if roster_matrix.job_category_ids[job_id] not in job_category_ids:
+                continue
+
+            allocated = roster_matrix.get_job_allocated(job_id)
+            shortfall[job_id] = [
+                max(required - num_allocated, 0)
+                for required, num_allocated in zip(requirements, allocated, strict=True)
+            ]
+
+        workers = load_workers(
+            event,
+            job_categories,
+            roster_matrix,
+            default_max_hours=default_max_hours,
+            get_unavailable_hours=get_unavailable_hours,
+        )
+
+        planner = RosterPlanner(
+            num_hours=roster_matrix.num_hours,
+            workers=workers,
+            max_shift_hours=max_shift_hours,
+            min_shift_hours=min_shift_hours,
+        )
+        plan = planner.solve(shortfall, roster_matrix.job_category_ids)
+
+        shifts = [
+            Shift(
+                job_id=planned_shift.job_id,
+                signup_id=planned_shift.worker_id,
+                start_time=roster_matrix.work_hours[planned_shift.start],
+                hours=planned_shift.hours,
+            )
+            for planned_shift in plan.shifts
+        ]
+
+        if commit:
+            shifts = Shift.objects.bulk_create(shifts)
+
+        logger.info(
+            "Planned %d shifts (%d hours) for %d workers in %s, %d hours left unfilled",
+            len(plan.shifts),
+            plan.num_planned_hours,
+            len(workers),
+            event.slug,
+            plan.num_unfilled_hours,
+        )
+
+    return plan, shifts
@@ -57,6 +57,28 @@ export function setRequirement(job, doc) {
 }
 
 
+// Sets requirements of many jobs at once. The response only contains the changed jobs,
+// so they are merged into the job category we already have.
+export function setRequirements(jobCategory, requirements) {
+  return postJSON(`${config.urls.jobCategoryApi}/${jobCategory.slug}/requirements`, {requirements})
+  .then(delta => {
+    const jobsBySlug = _.keyBy(jobCategory.jobs, 'slug');
+    delta.jobs.forEach(jobDelta => {
+      const job = jobsBySlug[jobDelta.slug];
+      if (job) {
+        job.requirements = jobDelta.requirements;
+        job.allocated = jobDelta.allocated;
+      }
+    });
+
+    jobCategory.requirements = delta.requirements;
+    jobCategory.allocated = delta.allocated;
+
+    return jobCategory;
+  });
+}
+
+
 export function createJob(jobCategory, newJob) {
   return postJSON(`${config.urls.jobCategoryApi}/${jobCategory.slug}/jobs`, newJob)
   .then(enrichJobCategory);
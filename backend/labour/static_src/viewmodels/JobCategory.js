@@ -6,7 +6,7 @@ import {
   createJob,
   deleteJob,
   getJobCategory,
-  setRequirement,
+  setRequirements,
   updateJob,
 } from '../services/RosterService';
 
@@ -45,7 +45,8 @@ export default class JobCategory {
     this.requirementModal.prompt(requirementCell)
     .then(result => {
       if (result.result === 'ok') {
-        setRequirement(requirementCell.job, result.request)
+        const request = Object.assign({job: requirementCell.job.slug}, result.request);
+        setRequirements(this.jobCategory(), [request])
         .then(jobCategory => this.loadJobCategory(jobCategory));
       }
     });
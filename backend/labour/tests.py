@@ -3,11 +3,23 @@ from io import BytesIO
 import pytest
 
 from access.models import CBACEntry
-from core.csv_export import export_csv
+from core.csv_export import ENCODING, csv_response, export_csv, export_rows
 from core.models import Person
+from core.utils import ONE_HOUR
 from event_log_v2.models.entry import Entry
 
-from .models import JobCategory, LabourEventMeta, Qualification, Signup
+from .models import (
+    Job,
+    JobCategory,
+    JobRequirement,
+    LabourEventMeta,
+    Qualification,
+    SetRequirementsItem,
+    Shift,
+    Signup,
+)
+from .roster_matrix import RosterMatrix
+from .roster_planner import PlannedShift, RosterPlanner, Worker, plan_shifts
 
 
 @pytest.mark.django_db
@@ -104,3 +116,149 @@ def test_labour_excel_export():
             m2m_mode="separate_columns",
             dialect="xlsx",
         )
+
+
+@pytest.mark.django_db
+def test_labour_csv_export_rows():
+    signup, _ = Signup.get_or_create_dummy(accepted=True)
+    event = signup.event
+    job_category = signup.job_categories.get()
+
+    fields = Signup.get_csv_fields(event)
+    m2m_choices = {}
+    header = Signup.get_csv_header(event, fields, "separate_columns", m2m_choices)
+    (row,) = export_rows(event, Signup, Signup.objects.filter(id=signup.id), fields, "separate_columns", m2m_choices)
+
+    assert len(row) == len(header)
+    values = dict(zip(header, row, strict=True))
+    assert values[f"job_categories: {job_category}"] is True
+    assert values[f"job_categories_accepted: {job_category}"] is True
+    assert values["surname"] == signup.person.surname
+
+
+@pytest.mark.django_db
+def test_labour_csv_streaming_export():
+    signup, _ = Signup.get_or_create_dummy()
+    signups = Signup.objects.filter(id=signup.id)
+
+    response = csv_response(signup.event, Signup, signups, filename="signups.csv", dialect="excel")
+    assert response.streaming
+
+    lines = b"".join(response.streaming_content).decode(ENCODING).splitlines()
+    assert len(lines) == 2
+    assert "surname" in lines[0].split(",")
+    assert signup.person.surname in lines[1]
+
+
+def round_work_hours(labour_event_meta):
+    """
+    Work hours must be full hours, which those of the dummy event are not.
+    """
+    labour_event_meta.work_begins = labour_event_meta.work_begins.replace(minute=0, second=0, microsecond=0)
+    labour_event_meta.work_ends = labour_event_meta.work_ends.replace(minute=0, second=0, microsecond=0)
+    labour_event_meta.save()
+
+    return labour_event_meta.work_begins
+
+
+@pytest.mark.django_db
+def test_roster_matrix():
+    signup, _ = Signup.get_or_create_dummy()
+    event = signup.event
+    job_category = signup.job_categories.get()
+    work_begins = round_work_hours(event.labour_event_meta)
+
+    job = Job.objects.create(job_category=job_category, title="Test job")
+    JobRequirement.objects.create(job=job, start_time=work_begins + ONE_HOUR, count=2)
+    Shift.objects.create(job=job, signup=signup, start_time=work_begins, hours=3)
+
+    roster_matrix = RosterMatrix.for_event(event)
+
+    assert roster_matrix.get_job_requirements(job.id) == job._make_requirements()
+    assert roster_matrix.get_job_allocated(job.id) == job._make_allocated()
+    assert roster_matrix.get_job_requirements(job.id)[:3] == [0, 2, 0]
+    assert roster_matrix.get_job_allocated(job.id)[:4] == [1, 1, 1, 0]
+
+    assert job_category.as_dict(include_requirements=True, roster_matrix=roster_matrix) == job_category.as_dict(
+        include_requirements=True
+    )
+
+
+@pytest.mark.django_db
+def test_set_requirements():
+    signup, _ = Signup.get_or_create_dummy()
+    event = signup.event
+    job_category = signup.job_categories.get()
+    work_begins = round_work_hours(event.labour_event_meta)
+
+    job = Job.objects.create(job_category=job_category, title="Test job")
+    JobRequirement.objects.create(job=job, start_time=work_begins, count=5)
+
+    job_ids = JobRequirement.set_requirements(
+        job_category,
+        [
+            SetRequirementsItem(job.slug, work_begins.isoformat(), 3, 2),
+            SetRequirementsItem(job.slug, (work_begins + ONE_HOUR).isoformat(), 1, 4),
+        ],
+    )
+
+    assert job_ids == {job.id}
+    assert list(JobRequirement.objects.filter(job=job).order_by("start_time").values_list("count", flat=True)) == [
+        2,
+        4,
+        2,
+    ]
+
+    delta = job_category.as_roster_api_delta_dict(job_ids)
+    assert delta["requirements"][:4] == [2, 4, 2, 0]
+    assert delta["jobs"] == [
+        dict(
+            slug=job.slug,
+            requirements=job._make_requirements(),
+            allocated=job._make_allocated(),
+        )
+    ]
+
+
+def test_roster_planner():
+    busy_worker = Worker(id=1, job_category_ids=frozenset([1]), remaining_hours=12, busy=0b0011)
+    tired_worker = Worker(id=2, job_category_ids=frozenset([1]), remaining_hours=2)
+    other_worker = Worker(id=3, job_category_ids=frozenset([2]), remaining_hours=12)
+
+    planner = RosterPlanner(num_hours=6, workers=[busy_worker, tired_worker, other_worker], max_shift_hours=4)
+    plan = planner.solve({10: [1, 1, 1, 1, 2, 0]}, {10: 1})
+
+    # the busy worker cannot start before hour 2 and the tired one only has 2 hours in them
+    assert plan.shifts == [
+        PlannedShift(worker_id=2, job_id=10, start=0, hours=2),
+        PlannedShift(worker_id=1, job_id=10, start=2, hours=3),
+    ]
+    assert plan.unfilled == {10: [0, 0, 0, 0, 1, 0]}
+    assert busy_worker.remaining_hours == 9
+    assert tired_worker.remaining_hours == 0
+
+
+@pytest.mark.django_db
+def test_plan_shifts():
+    signup, _ = Signup.get_or_create_dummy(accepted=True)
+    event = signup.event
+    job_category = signup.job_categories.get()
+    work_begins = round_work_hours(event.labour_event_meta)
+
+    job = Job.objects.create(job_category=job_category, title="Test job")
+    JobRequirement.objects.create(job=job, start_time=work_begins, count=1)
+    JobRequirement.objects.create(job=job, start_time=work_begins + ONE_HOUR, count=1)
+    JobRequirement.objects.create(job=job, start_time=work_begins + 2 * ONE_HOUR, count=2)
+
+    plan, shifts = plan_shifts(event, commit=True)
+
+    assert [(shift.signup_id, shift.start_time, shift.hours) for shift in Shift.objects.filter(job=job)] == [
+        (signup.id, work_begins, 3),
+    ]
+    assert len(shifts) == 1
+    assert plan.num_unfilled_hours == 1
+
+    # already planned shifts are not planned again
+    plan, shifts = plan_shifts(event, commit=True)
+    assert shifts == []
+    assert plan.num_unfilled_hours == 1
@@ -17,7 +17,9 @@ from .views import (
     api_job_categories_view,
     api_job_category_view,
     api_job_view,
+    api_plan_shifts_view,
     api_set_job_requirements_view,
+    api_set_requirements_view,
     api_shift_view,
     confirm_view,
     person_disqualify_view,
@@ -165,6 +167,16 @@ urlpatterns = [
         api_set_job_requirements_view,
         name="api_set_job_requirements_view",
     ),
+    re_path(
+        r"^api/v1/events/(?P<event_slug>[a-z0-9-]+)/jobcategories/(?P<job_category_slug>[a-z0-9-]+)/requirements/?$",
+        api_set_requirements_view,
+        name="api_set_requirements_view",
+    ),
+    re_path(
+        r"^api/v1/events/(?P<event_slug>[a-z0-9-]+)/jobcategories/(?P<job_category_slug>[a-z0-9-]+)/shifts/plan/?$",
+        api_plan_shifts_view,
+        name="api_plan_shifts_view",
+    ),
     re_path(
         r"^api/v1/events/(?P<event_slug>[a-z0-9-]+)/jobcategories/(?P<job_category_slug>[a-z0-9-]+)/shifts/?$",
         api_shift_view,
@@ -17,7 +17,9 @@ from .api_views import (
     api_job_categories_view,
     api_job_category_view,
     api_job_view,
+    api_plan_shifts_view,
     api_set_job_requirements_view,
+    api_set_requirements_view,
     api_shift_view,
 )
 from .public_views import (
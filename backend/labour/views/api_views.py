@@ -1,12 +1,9 @@
 import logging
-from datetime import timedelta
 
-from dateutil.parser import parse as parse_datetime
 from django.shortcuts import get_object_or_404
 from django.views.decorators.http import require_POST, require_safe
 
 from api.utils import MethodNotAllowed, api_view
-from core.utils import full_hours_between
 
 from ..helpers import labour_admin_required
 from ..models import (
@@ -16,8 +13,12 @@ from ..models import (
     JobCategory,
     JobRequirement,
     SetJobRequirementsRequest,
+    SetRequirementsItem,
+    SetRequirementsRequest,
     Shift,
 )
+from ..roster_matrix import RosterMatrix
+from ..roster_planner import plan_shifts
 
 logger = logging.getLogger("kompassi")
 
@@ -26,7 +27,12 @@ logger = logging.getLogger("kompassi")
 @require_safe
 @api_view
 def api_job_categories_view(request, vars, event):
-    return [jc.as_dict(include_requirements=True) for jc in JobCategory.objects.filter(event=event, app_label="labour")]
+    roster_matrix = RosterMatrix.for_event(event)
+
+    return [
+        jc.as_dict(include_requirements=True, roster_matrix=roster_matrix)
+        for jc in JobCategory.objects.filter(event=event, app_label="labour")
+    ]
 
 
 @labour_admin_required
@@ -97,24 +103,38 @@ def api_set_job_requirements_view(request, vars, event, job_category_slug, job_s
 
     body = SetJobRequirementsRequest.from_json(request.body)
 
-    start_time = parse_datetime(body.startTime)
-    end_time = start_time + timedelta(hours=body.hours - 1)  # -1 due to end parameter being inclusive
+    JobRequirement.set_requirements(job_category, [SetRequirementsItem(job.slug, *body)])
 
-    start_time = max(start_time, event.labour_event_meta.work_begins)
-    end_time = min(end_time, event.labour_event_meta.work_ends)
+    # Successful result emulates that of /api/v1/events/tracon11/jobcategories/conitea
+    return job_category.as_roster_api_dict()
 
-    for hour in full_hours_between(start_time, end_time):  # start/end inclusive
-        requirement, created = JobRequirement.objects.get_or_create(
-            job=job,
-            start_time=hour,
-            defaults=dict(
-                count=body.required,
-            ),
-        )
 
-        if not created:
-            requirement.count = body.required
-            requirement.save()
+@labour_admin_required
+@require_POST
+@api_view
+def api_set_requirements_view(request, vars, event, job_category_slug):
+    """
+    Sets requirements of many jobs for many spans of hours at once. Only responds with the
+    requirements and allocations of the job category and the jobs that were changed.
+    """
+    job_category = get_object_or_404(JobCategory, event=event, slug=job_category_slug)
+
+    body = SetRequirementsRequest.from_json(request.body)
+
+    job_ids = JobRequirement.set_requirements(job_category, body.requirements)
+
+    return job_category.as_roster_api_delta_dict(job_ids)
+
+
+@labour_admin_required
+@require_POST
+@api_view
+def api_plan_shifts_view(request, vars, event, job_category_slug):
+    """
+    Fills in the unallocated requirements of the job category with automatically planned shifts.
+    """
+    job_category = get_object_or_404(JobCategory, event=event, slug=job_category_slug)
+
+    plan_shifts(event, [job_category], commit=True)
 
-    # Successful result emulates that of /api/v1/events/tracon11/jobcategories/conitea
     return job_category.as_roster_api_dict()
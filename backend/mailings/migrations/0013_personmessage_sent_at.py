@@ -0,0 +1,23 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+def mark_existing_person_messages_sent(apps, schema_editor):
+    PersonMessage = apps.get_model("mailings", "PersonMessage")
+    PersonMessage.objects.filter(sent_at__isnull=True).update(sent_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailings", "0012_recipientgroup_override_reply_to_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="personmessage",
+            name="sent_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_person_messages_sent, migrations.RunPython.noop, elidable=True),
+    ]
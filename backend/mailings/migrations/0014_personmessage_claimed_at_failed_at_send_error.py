@@ -0,0 +1,27 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailings", "0013_personmessage_sent_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="personmessage",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="personmessage",
+            name="failed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="personmessage",
+            name="send_error",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
@@ -1,9 +1,15 @@
 import logging
-from datetime import datetime
+import smtplib
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import datetime, timedelta
 from hashlib import sha1
+from threading import Lock
+from typing import Any
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.template import Context, Template
@@ -13,6 +19,16 @@ from django.utils.translation import gettext_lazy as _
 from labour.models import JobCategory, PersonnelClass
 
 logger = logging.getLogger("kompassi")
+
+# number of messages claimed and sent at a time
+SEND_BATCH_SIZE = 100
+# keep well below the rate limits of the SMTP relay
+SEND_MAX_PER_SECOND = 20
+# a send that has not finished its batch in this time is assumed dead and its batch up for grabs
+SEND_CLAIM_TIMEOUT = timedelta(minutes=15)
+# the mail server refused this particular message; other messages may still get through
+PERSON_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
 APP_LABEL_CHOICES = [
     ("labour", "Työvoima"),
     ("programme", "Ohjelma"),
@@ -151,23 +167,133 @@ class Message(models.Model):
         message_send.delay(self.pk, [person.pk for person in recipients] if recipients is not None else None, resend)
 
     def _send(self, recipients, resend):
+        """
+        Creates the person messages of the recipients that do not have one yet and sends
+        all unsent person messages of the recipients (or all of them if resend is set).
+
+        Progress is recorded per person message (PersonMessage.sent_at), so if sending is
+        interrupted, calling this again continues where it left off.
+        """
+        from core.models import Person
+
         if recipients is None:
-            recipients = [user.person for user in self.recipient.group.user_set.all()]
+            recipients = Person.objects.filter(user__groups=self.recipient.group)
+
+        recipients = list(recipients)
+        person_messages = PersonMessage.objects.filter(message=self, person__in=recipients)
+
+        if resend:
+            person_messages.update(sent_at=None, failed_at=None, send_error="")
+
+        self.create_person_messages(recipients)
+        self.send_person_messages(person_messages)
+
+    def get_message_vars(self, person, signup=None):
+        return dict(
+            event=self.event,
+            person=person,
+            signup=signup,
+        )
+
+    def get_signups_by_person_id(self, persons) -> dict:
+        # TODO need a way to make app-specific vars in the apps themselves
+        if "labour" not in settings.INSTALLED_APPS:
+            return {}
+
+        from labour.models import Signup
+
+        return {
+            signup.person_id: signup
+            for signup in Signup.objects.filter(event=self.event, person__in=persons).select_related("event", "person")
+        }
+
+    def create_person_messages(self, persons):
+        """
+        Renders and bulk creates the person messages of those persons that do not have one yet.
+        Templates are compiled once and signups are fetched in one query.
+        """
+        existing_person_ids = set(
+            PersonMessage.objects.filter(message=self, person__in=persons).values_list("person_id", flat=True)
+        )
+        persons = [person for person in persons if person.id not in existing_person_ids]
+        if not persons:
+            return
+
+        subject_template = Template(self.subject_template)
+        body_template = Template(self.body_template)
+        signups_by_person_id = self.get_signups_by_person_id(persons)
+
+        rendered = []
+        for person in persons:
+            context = Context(self.get_message_vars(person, signups_by_person_id.get(person.id)))
+            rendered.append((person, subject_template.render(context), body_template.render(context)))
+
+        # most recipients get the exact same text, so this usually resolves to a single row each
+        subjects = PersonMessageSubject.get_or_create_many(subject for _person, subject, _body in rendered)
+        bodies = PersonMessageBody.get_or_create_many(body for _person, _subject, body in rendered)
+
+        person_messages = [
+            PersonMessage(
+                message=self,
+                person=person,
+                subject=subjects[subject],
+                body=bodies[body],
+            )
+            for person, subject, body in rendered
+        ]
 
-        for person in recipients:
-            try:
-                person_message, created = PersonMessage.objects.get_or_create(
-                    person=person,
-                    message=self,
-                )
-            except PersonMessage.MultipleObjectsReturned:
-                # This actually happens sometimes.
-                logger.warning("A Person doth multiple PersonMessages for a single Message have!")
-                person_message = PersonMessage.objects.filter(person=person, message=self).first()
-                created = False
+        PersonMessage.objects.bulk_create(person_messages, batch_size=SEND_BATCH_SIZE)
+
+    def send_person_messages(self, person_messages: models.QuerySet["PersonMessage"]):
+        """
+        Sends unsent person messages in batches over a single SMTP connection, at most
+        SEND_MAX_PER_SECOND messages per second.
+
+        Each batch is claimed in a short transaction before it is sent, so concurrent sends
+        of the same message skip each other's batches instead of sending them twice. Claims
+        of a send that died expire after SEND_CLAIM_TIMEOUT.
+
+        Messages the mail server refuses (eg. a bad recipient address) are marked failed and
+        sending carries on. If the connection to the mail server fails, the messages sent
+        before that are marked sent, the rest of the batch is released for the next attempt
+        and the error is raised.
+        """
+        from django.core.mail import get_connection
+
+        meta = self.app_event_meta
+        reply_to = self.reply_to
+
+        with get_connection(fail_silently=False) as connection:
+            while True:
+                batch_started = time.monotonic()
 
-            if created or resend:
-                person_message.actually_send()
+                batch = PersonMessage.claim_unsent(person_messages, SEND_BATCH_SIZE)
+                if not batch:
+                    break
+
+                sent_ids = []
+                try:
+                    for person_message in batch:
+                        try:
+                            connection.send_messages([person_message.make_email_message(meta, reply_to)])
+                        except PERSON_MESSAGE_ERRORS as e:
+                            logger.warning("Failed to send person message %s: %s", person_message.id, e)
+                            person_message.mark_failed(e)
+                        else:
+                            sent_ids.append(person_message.id)
+                finally:
+                    PersonMessage.objects.filter(id__in=sent_ids).update(sent_at=timezone.now(), claimed_at=None)
+                    # on connection failure, let the next attempt have the rest of the batch
+                    PersonMessage.objects.filter(
+                        id__in=[pm.id for pm in batch],
+                        sent_at__isnull=True,
+                        failed_at__isnull=True,
+                    ).update(claimed_at=None)
+
+                # rate limit
+                min_duration = len(batch) / SEND_MAX_PER_SECOND
+                if (elapsed := time.monotonic() - batch_started) < min_duration:
+                    time.sleep(min_duration - elapsed)
 
     def expire(self):
         if self.expired_at is not None:
@@ -225,12 +351,57 @@ class Message(models.Model):
 
 
 class DedupMixin:
+    """
+    Subjects and bodies are stored once per distinct text and looked up by the SHA-1 digest
+    of the text. As the rows are never changed, looked up rows are also kept in a per-process
+    LRU cache (one per model) so that repeated texts cost no queries.
+    """
+
+    dedup_cache_size = 1024
+    _dedup_caches: dict[type, OrderedDict[str, Any]] = {}
+    _dedup_cache_lock = Lock()
+
+    @staticmethod
+    def get_digest(text: str) -> str:
+        return sha1(text.encode("UTF-8")).hexdigest()
+
+    @classmethod
+    def _get_cached(cls, digest: str, text: str):
+        with cls._dedup_cache_lock:
+            cache = cls._dedup_caches.setdefault(cls, OrderedDict())
+            instance = cache.get(digest)
+            if instance is None or instance.text != text:
+                return None
+            cache.move_to_end(digest)
+            return instance
+
+    @classmethod
+    def _cache_on_commit(cls, instances):
+        """
+        Rows are only cached once committed so that a rollback cannot leave the cache
+        pointing to rows that do not exist.
+        """
+
+        def _cache():
+            with cls._dedup_cache_lock:
+                cache = cls._dedup_caches.setdefault(cls, OrderedDict())
+                for instance in instances:
+                    cache[instance.digest] = instance
+                    cache.move_to_end(instance.digest)
+                while len(cache) > cls.dedup_cache_size:
+                    cache.popitem(last=False)
+
+        transaction.on_commit(_cache)
+
     @classmethod
     def get_or_create(cls, text):
-        the_hash = sha1(text.encode("UTF-8")).hexdigest()
+        the_hash = cls.get_digest(text)
+
+        if (instance := cls._get_cached(the_hash, text)) is not None:
+            return instance, False
 
         try:
-            return cls.objects.get_or_create(
+            instance, created = cls.objects.get_or_create(
                 digest=the_hash,
                 defaults=dict(
                     text=text,
@@ -238,7 +409,48 @@ class DedupMixin:
             )
         except cls.MultipleObjectsReturned:
             logger.warning("Multiple %s returned for hash %s", cls.__name__, the_hash)
-            return cls.objects.filter(digest=the_hash, text=text).first(), False
+            instance, created = cls.objects.filter(digest=the_hash, text=text).first(), False
+
+        if instance is not None:
+            cls._cache_on_commit([instance])
+
+        return instance, created
+
+    @classmethod
+    def get_or_create_many(cls, texts: Iterable[str]) -> dict[str, Any]:
+        """
+        Bulk version of get_or_create. Returns a mapping of text to instance.
+        Uncached texts are looked up in one query and missing ones created with bulk_create.
+        """
+        result = {}
+        missing: dict[str, str] = {}  # digest -> text
+
+        for text in set(texts):
+            digest = cls.get_digest(text)
+            if (instance := cls._get_cached(digest, text)) is not None:
+                result[text] = instance
+            else:
+                missing[digest] = text
+
+        if not missing:
+            return result
+
+        found = []
+        for instance in cls.objects.filter(digest__in=missing.keys()).order_by("id"):
+            # in case of duplicates (see get_or_create) the first one wins
+            if instance.text == missing.get(instance.digest) and instance.text not in result:
+                result[instance.text] = instance
+                found.append(instance)
+
+        created = cls.objects.bulk_create(
+            [cls(digest=digest, text=text) for digest, text in missing.items() if text not in result],
+        )
+        for instance in created:
+            result[instance.text] = instance
+
+        cls._cache_on_commit(found + created)
+
+        return result
 
 
 class PersonMessageSubject(models.Model, DedupMixin):
@@ -260,6 +472,14 @@ class PersonMessage(models.Model):
     body = models.ForeignKey(PersonMessageBody, on_delete=models.CASCADE)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    # set while a send is working on this message (see Message.send_person_messages)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    # set if the mail server refused the message, which is then not retried unless resent
+    failed_at = models.DateTimeField(null=True, blank=True)
+    send_error = models.TextField(blank=True, default="")
 
     def save(self, *args, **kwargs):
         self.subject, unused = PersonMessageSubject.get_or_create(self.render_message(self.message.subject_template))
@@ -270,32 +490,18 @@ class PersonMessage(models.Model):
     @property
     def message_vars(self):
         if not hasattr(self, "_message_vars"):
-            self._message_vars = dict(
-                event=self.message.event,
-                person=self.person,
-            )
-
-            # TODO need a way to make app-specific vars in the apps themselves
-            if "labour" in settings.INSTALLED_APPS:
-                from labour.models import Signup
-
-                try:
-                    signup = Signup.objects.get(event=self.message.event, person=self.person)
-                except Signup.DoesNotExist:
-                    signup = None
-
-                self._message_vars.update(signup=signup)
+            signups_by_person_id = self.message.get_signups_by_person_id([self.person])
+            self._message_vars = self.message.get_message_vars(self.person, signups_by_person_id.get(self.person.id))
 
         return self._message_vars
 
     def render_message(self, template):
         return Template(template).render(Context(self.message_vars))
 
-    def actually_send(self):
+    def make_email_message(self, meta, reply_to=None):
         from django.core.mail import EmailMessage
 
         msgbcc = []
-        meta = self.message.app_event_meta
 
         if meta.monitor_email:
             msgbcc.append(meta.monitor_email)
@@ -303,13 +509,51 @@ class PersonMessage(models.Model):
         if settings.DEBUG:
             print(self.body.text)
 
-        reply_to_tup = (reply_to_str,) if (reply_to_str := self.message.reply_to) else None
+        reply_to_tup = (reply_to,) if reply_to else None
 
-        EmailMessage(
+        return EmailMessage(
             subject=self.subject.text,
             body=self.body.text,
             from_email=meta.cloaked_contact_email,
             to=(self.person.name_and_email,),
             bcc=msgbcc,
             reply_to=reply_to_tup,
-        ).send(fail_silently=True)
+        )
+
+    @classmethod
+    def claim_unsent(cls, person_messages: models.QuerySet["PersonMessage"], limit: int) -> list["PersonMessage"]:
+        """
+        Claims at most `limit` of the person messages that are neither sent, failed nor claimed by
+        a send in progress, and returns them. The claim is committed before returning.
+        """
+        claim_expired = timezone.now() - SEND_CLAIM_TIMEOUT
+
+        with transaction.atomic():
+            batch = list(
+                person_messages.filter(
+                    models.Q(claimed_at__isnull=True) | models.Q(claimed_at__lt=claim_expired),
+                    sent_at__isnull=True,
+                    failed_at__isnull=True,
+                )
+                .select_for_update(skip_locked=True, of=("self",))
+                .select_related("person", "subject", "body")
+                .order_by("id")[:limit]
+            )
+            cls.objects.filter(id__in=[pm.id for pm in batch]).update(claimed_at=timezone.now())
+
+        return batch
+
+    def mark_failed(self, error: Exception):
+        self.failed_at = timezone.now()
+        self.send_error = str(error)
+        PersonMessage.objects.filter(id=self.id).update(
+            failed_at=self.failed_at,
+            send_error=self.send_error,
+            claimed_at=None,
+        )
+
+    def actually_send(self):
+        self.make_email_message(self.message.app_event_meta, self.message.reply_to).send(fail_silently=True)
+
+        self.sent_at = timezone.now()
+        PersonMessage.objects.filter(id=self.id).update(sent_at=self.sent_at)
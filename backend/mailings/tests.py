@@ -0,0 +1,95 @@
+import smtplib
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.test import TestCase, override_settings
+
+from core.models import Person
+from labour.models import LabourEventMeta
+
+from .models import Message, PersonMessage, RecipientGroup
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class SendPersonMessagesTestCase(TestCase):
+    def setUp(self):
+        meta, unused = LabourEventMeta.get_or_create_dummy()
+        recipient_group = RecipientGroup.objects.create(
+            event=meta.event,
+            app_label="labour",
+            group=meta.get_group("admins"),
+        )
+        self.message = Message.objects.create(
+            recipient=recipient_group,
+            subject_template="Hello {{ person.first_name }}",
+            body_template="Hello world",
+        )
+        self.persons = [
+            Person.objects.create(first_name=f"Test{i}", surname="Person", email=f"test{i}@example.com")
+            for i in range(3)
+        ]
+
+    def patch_send_messages(self, fail_for_email: str, error: Exception):
+        send_messages = locmem.EmailBackend.send_messages
+
+        def patched_send_messages(backend, messages):
+            if any(fail_for_email in message.to[0] for message in messages):
+                raise error
+            return send_messages(backend, messages)
+
+        return mock.patch.object(locmem.EmailBackend, "send_messages", patched_send_messages)
+
+    def get_person_message(self, person: Person) -> PersonMessage:
+        return PersonMessage.objects.get(message=self.message, person=person)
+
+    def test_send(self):
+        self.message._send(self.persons, resend=False)
+
+        assert len(mail.outbox) == 3
+        assert all(self.get_person_message(person).sent_at for person in self.persons)
+
+        # already sent, so nothing more is sent
+        self.message._send(self.persons, resend=False)
+        assert len(mail.outbox) == 3
+
+        self.message._send(self.persons, resend=True)
+        assert len(mail.outbox) == 6
+
+    def test_refused_recipient(self):
+        bad_person = self.persons[0]
+        error = smtplib.SMTPRecipientsRefused({bad_person.email: (550, b"No such user")})
+
+        with self.patch_send_messages(bad_person.email, error):
+            self.message._send(self.persons, resend=False)
+
+        # the others still get the message
+        assert len(mail.outbox) == 2
+
+        person_message = self.get_person_message(bad_person)
+        assert person_message.sent_at is None
+        assert person_message.failed_at is not None
+        assert "No such user" in person_message.send_error
+
+        # failed messages are not retried
+        self.message._send(self.persons, resend=False)
+        assert len(mail.outbox) == 2
+
+    def test_connection_failure(self):
+        error = smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+        with self.patch_send_messages(self.persons[1].email, error), self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.message._send(self.persons, resend=False)
+
+        assert len(mail.outbox) == 1
+        assert self.get_person_message(self.persons[0]).sent_at is not None
+
+        # the rest of the batch is released for the next attempt, which picks up where this left off
+        for person in self.persons[1:]:
+            person_message = self.get_person_message(person)
+            assert person_message.sent_at is None
+            assert person_message.failed_at is None
+            assert person_message.claimed_at is None
+
+        self.message._send(self.persons, resend=False)
+        assert len(mail.outbox) == 3
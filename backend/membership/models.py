@@ -133,6 +133,8 @@ class Membership(models.Model, CsvExportMixin):
     def __str__(self):
         return f"{self.organization.name if self.organization else None}/{self.person.official_name if self.person else None}"
 
+    csv_prefetch_related = ("person",)
+
     @classmethod
     def get_csv_fields(cls, unused_organization):
         return [
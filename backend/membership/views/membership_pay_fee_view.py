@@ -2,6 +2,7 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.views.decorators.http import require_http_methods
 
+from payments.helpers import redirect_to_checkout
 from payments.models.checkout_payment import CheckoutPayment
 
 from ..helpers import membership_required
@@ -19,6 +20,4 @@ def membership_pay_fee_view(request, membership):
     checkout_payment = CheckoutPayment.from_membership_fee_payment(current_term_payment)
     checkout_payment.save()
 
-    result = checkout_payment.perform_create_payment_request(request)
-
-    return redirect(result["href"])
+    return redirect_to_checkout(request, checkout_payment)
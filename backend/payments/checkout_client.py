@@ -0,0 +1,78 @@
+"""
+HTTP client for the Checkout (Paytrail) API.
+
+Connections are pooled per worker thread so that creating a payment does not pay for a new TLS
+handshake every time, and every request has a timeout so that a slow gateway cannot hold
+our workers indefinitely.
+
+Requests are only retried when we know the gateway did not process them (connection
+failures, 429 and 503 responses). A Create Payment request that timed out while waiting
+for the response (or got a 502/504 from a proxy) may have succeeded, and retrying it would
+fail with a duplicate stamp.
+"""
+
+import json
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from .utils import calculate_hmac
+
+CONNECT_TIMEOUT_SECONDS = 3.05
+READ_TIMEOUT_SECONDS = 15
+POOL_MAXSIZE = 20
+
+RETRY = Retry(
+    total=3,
+    connect=3,
+    read=0,
+    status=3,
+    status_forcelist=(429, 503),
+    allowed_methods=None,  # see above, only retried when not processed
+    backoff_factor=0.5,
+    raise_on_status=False,
+)
+
+_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """
+    Sessions are not guaranteed to be thread safe, so there is one per thread.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        adapter = HTTPAdapter(max_retries=RETRY, pool_maxsize=POOL_MAXSIZE)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+def create_payment(meta, body: dict) -> dict:
+    """
+    Performs a Create Payment request and returns the response body.
+
+    :param meta: PaymentsOrganizationMeta of the merchant
+    :param body: Create Payment request body
+    """
+    serialized_body = json.dumps(body)
+
+    headers = meta.get_checkout_params()
+    headers["signature"] = calculate_hmac(meta.checkout_password, headers, serialized_body)
+    headers["content-type"] = "application/json"
+
+    response = get_session().post(
+        f"{settings.CHECKOUT_API_BASE_URL}/payments",
+        headers=headers,
+        data=serialized_body,
+        timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS),
+    )
+    result = response.json()
+    response.raise_for_status()
+
+    return result
@@ -0,0 +1,121 @@
+"""
+Stand-in for the Checkout (Paytrail) API for load testing the checkout flow offline.
+
+Implements just enough of the API for Kompassi: Create Payment (POST /payments) and a
+payment wall (GET /pay/<transaction id>) that immediately "pays" and redirects back to the
+success URL with signed parameters, like the real payment wall does.
+
+Run with manage.py payments_fake_checkout_server and point CHECKOUT_API_BASE_URL and
+CHECKOUT_PAYMENT_WALL_ORIGIN to it. Never use in production.
+"""
+
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from .models.payments_organization_meta import META_DEFAULTS
+from .utils import calculate_hmac
+
+logger = logging.getLogger("kompassi")
+
+
+class FakeCheckoutServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        secret: str = META_DEFAULTS["checkout_password"],
+        latency_seconds: float = 0.0,
+    ):
+        super().__init__(server_address, FakeCheckoutRequestHandler)
+        self.secret = secret
+        self.latency_seconds = latency_seconds
+        self.payments: dict[str, tuple[dict[str, str], dict]] = {}  # transaction id -> (headers, body)
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FakeCheckoutRequestHandler(BaseHTTPRequestHandler):
+    server: FakeCheckoutServer
+
+    def log_message(self, format, *args):
+        logger.debug("Fake Checkout: " + format, *args)
+
+    def send_json(self, status: HTTPStatus, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/payments":
+            self.send_json(HTTPStatus.NOT_FOUND, dict(status="error", message="Not found"))
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        headers = {key.lower(): value for key, value in self.headers.items()}
+
+        if calculate_hmac(self.server.secret, headers, body) != headers.get("signature"):
+            self.send_json(HTTPStatus.UNAUTHORIZED, dict(status="error", message="Invalid signature"))
+            return
+
+        # simulates the time the real API takes to respond
+        if self.server.latency_seconds:
+            time.sleep(self.server.latency_seconds)
+
+        payment = json.loads(body)
+        transaction_id = str(uuid4())
+
+        with self.server.lock:
+            self.server.payments[transaction_id] = (headers, payment)
+
+        self.send_json(
+            HTTPStatus.CREATED,
+            dict(
+                transactionId=transaction_id,
+                href=f"{self.server.base_url}/pay/{transaction_id}",
+                reference=payment["reference"],
+                terms="",
+                groups=[],
+                providers=[],
+            ),
+        )
+
+    def do_GET(self):
+        transaction_id = self.path.removeprefix("/pay/")
+
+        with self.server.lock:
+            headers, payment = self.server.payments.get(transaction_id, (None, None))
+
+        if payment is None or headers is None:
+            self.send_json(HTTPStatus.NOT_FOUND, dict(status="error", message="Not found"))
+            return
+
+        params = {
+            "checkout-account": headers["checkout-account"],
+            "checkout-algorithm": "sha256",
+            "checkout-amount": str(payment["amount"]),
+            "checkout-stamp": payment["stamp"],
+            "checkout-reference": payment["reference"],
+            "checkout-transaction-id": transaction_id,
+            "checkout-status": "ok",
+            "checkout-provider": "fake",
+        }
+        params["signature"] = calculate_hmac(self.server.secret, params)
+
+        self.send_response(HTTPStatus.FOUND)
+        self.send_header("Location", f"{payment['redirectUrls']['success']}?{urlencode(params)}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
@@ -1,8 +1,9 @@
 import logging
 from functools import wraps
 
+from django.conf import settings
 from django.http import HttpResponseBadRequest
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, redirect
 
 from .models import CheckoutPayment
 from .utils import calculate_hmac
@@ -30,3 +31,18 @@ def valid_signature_required(view_func):
         return view_func(request, payment, *args, **kwargs)
 
     return wrapper
+
+
+def redirect_to_checkout(request, payment: CheckoutPayment):
+    """
+    Creates the payment at Checkout and redirects the customer to the payment wall.
+
+    In async mode, the Create Payment request is performed in the background and the
+    customer is shown a page that waits for it instead of holding this worker meanwhile.
+    """
+    if settings.CHECKOUT_ASYNC_CREATE_PAYMENT and "background_tasks" in settings.INSTALLED_APPS:
+        payment.perform_create_payment_request_async(request)
+        return redirect("payments_checkout_redirect_view", payment.stamp)
+
+    result = payment.perform_create_payment_request(request)
+    return redirect(result["href"])
@@ -0,0 +1,42 @@
+from django.core.management import BaseCommand
+
+from ...fake_checkout import FakeCheckoutServer
+from ...models.payments_organization_meta import META_DEFAULTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a stand-in for the Checkout API for load testing the checkout flow offline. "
+        "Set CHECKOUT_API_BASE_URL and CHECKOUT_PAYMENT_WALL_ORIGIN to point to it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument(
+            "--secret",
+            default=META_DEFAULTS["checkout_password"],
+            help="Merchant secret (default: the Checkout test merchant)",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds to wait before responding to Create Payment requests",
+        )
+
+    def handle(self, *args, **options):
+        server = FakeCheckoutServer(
+            (options["host"], options["port"]),
+            secret=options["secret"],
+            latency_seconds=options["latency"],
+        )
+
+        self.stdout.write(f"Fake Checkout API listening on {server.base_url}")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
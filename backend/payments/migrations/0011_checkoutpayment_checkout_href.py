@@ -0,0 +1,17 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0010_alter_checkoutpayment_customer_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="checkoutpayment",
+            name="checkout_href",
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
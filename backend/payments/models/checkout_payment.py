@@ -1,13 +1,11 @@
-import json
 import logging
 from dataclasses import dataclass
 from datetime import date
 from functools import cached_property
 from uuid import uuid4
 
-import requests
 from django.conf import settings
-from django.db import connection, models
+from django.db import connection, models, transaction
 from django.db.models import JSONField
 from django.shortcuts import redirect
 from django.urls import reverse
@@ -15,16 +13,16 @@ from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 from pkg_resources import resource_string
 
+from tickets.exceptions import OrderCancelled
 from tickets.utils import format_price
 
-from ..utils import calculate_hmac
+from .. import checkout_client
 from .payments_organization_meta import META_DEFAULTS
 
 logger = logging.getLogger("kompassi")
 
 
-CHECKOUT_API_BASE_URL = "https://api.checkout.fi"
-CHECKOUT_PAYMENT_WALL_ORIGIN = "pay.checkout.fi"
+CHECKOUT_PAYMENT_WALL_ORIGIN = settings.CHECKOUT_PAYMENT_WALL_ORIGIN
 CHECKOUT_STATUSES = [
     ("new", _("New")),
     ("ok", _("OK")),
@@ -99,6 +97,7 @@ class CheckoutPayment(models.Model):
     # Fields extracted from Create Payment response
     checkout_reference = models.TextField(editable=False, blank=True)
     checkout_transaction_id = models.TextField(editable=False, blank=True)
+    checkout_href = models.TextField(editable=False, blank=True)
 
     # Fields extracted from redirect or callback
     provider = models.TextField(editable=False, blank=True)
@@ -219,7 +218,7 @@ class CheckoutPayment(models.Model):
 
         return self._membership_fee_payment
 
-    def perform_create_payment_request(self, request):
+    def get_create_payment_request_body(self, request) -> dict:
         if not settings.DEBUG and self.meta.checkout_merchant == META_DEFAULTS["checkout_merchant"]:
             raise ValueError(f"Event {self.event} has testing merchant in production, please change this in admin")
 
@@ -246,24 +245,31 @@ class CheckoutPayment(models.Model):
         if "localhost" not in callback_urls["success"]:
             body["callbackUrls"] = callback_urls
 
-        body = json.dumps(body)
-
-        headers = self.meta.get_checkout_params()
-        headers["signature"] = calculate_hmac(self.meta.checkout_password, headers, body)
-        headers["content-type"] = "application/json"
-
-        url = f"{CHECKOUT_API_BASE_URL}/payments"
+        return body
 
-        response = requests.post(url, headers=headers, data=body)
-        result = response.json()
-        response.raise_for_status()
+    def create_payment(self, body: dict) -> dict:
+        result = checkout_client.create_payment(self.meta, body)
 
         self.checkout_reference = result["reference"]
         self.checkout_transaction_id = result["transactionId"]
+        self.checkout_href = result["href"]
         self.save()
 
         return result
 
+    def perform_create_payment_request(self, request):
+        return self.create_payment(self.get_create_payment_request_body(request))
+
+    def perform_create_payment_request_async(self, request):
+        """
+        Creates the payment in a background task once the current transaction has been committed.
+        Poll checkout_href (see payments_checkout_status_view) for the URL of the payment wall.
+        """
+        from ..tasks import checkout_payment_create_payment
+
+        body = self.get_create_payment_request_body(request)
+        transaction.on_commit(lambda: checkout_payment_create_payment.delay(str(self.stamp), body))  # type: ignore
+
     def process_checkout_response(self, response):
         """
         :param response: Query string params from Checkout
@@ -294,7 +300,14 @@ class CheckoutPayment(models.Model):
 
         if self.tickets_order:
             if self.status == "ok" and not self.tickets_order.is_paid:
-                self.tickets_order.confirm_payment()
+                try:
+                    self.tickets_order.confirm_payment()
+                except OrderCancelled:
+                    logger.error(
+                        "Payment of stamp %s is for cancelled order %s whose products are sold out, REFUND NEEDED",
+                        self.stamp,
+                        self.tickets_order.formatted_order_number,
+                    )
         elif self.membership_fee_payment and self.status == "ok" and not self.membership_fee_payment.is_paid:
             self.membership_fee_payment.confirm_payment(payment_method="checkout")
 
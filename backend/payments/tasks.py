@@ -0,0 +1,21 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger("kompassi")
+
+
+@shared_task(ignore_result=True)
+def checkout_payment_create_payment(stamp: str, body: dict):
+    from .models import CheckoutPayment
+
+    payment = CheckoutPayment.objects.get(stamp=stamp)
+
+    try:
+        payment.create_payment(body)
+    except Exception:
+        # lets the customer waiting on the redirect page know that it is not going to happen
+        logger.exception("Checkout: failed to create payment %s", stamp)
+        payment.status = "fail"
+        payment.save()
+        raise
@@ -1,7 +1,13 @@
 import json
+import threading
+from urllib.parse import parse_qsl, urlparse
 
-from django.test import TestCase
+import requests
+from django.test import TestCase, override_settings
 
+from .checkout_client import create_payment
+from .fake_checkout import FakeCheckoutServer
+from .models.payments_organization_meta import META_DEFAULTS, PaymentsOrganizationMeta
 from .utils import calculate_hmac
 
 
@@ -47,3 +53,40 @@ class HMACTestCase(TestCase):
         assert (
             calculate_hmac(secret, headers, body) == "3708f6497ae7cc55a2e6009fc90aa10c3ad0ef125260ee91b19168750f6d74f6"
         )
+
+
+class FakeCheckoutTestCase(TestCase):
+    def test_create_payment(self):
+        server = FakeCheckoutServer(("127.0.0.1", 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        meta = PaymentsOrganizationMeta(**META_DEFAULTS)
+        body = {
+            "stamp": "unique-identifier-for-merchant",
+            "reference": "3759170",
+            "amount": 1525,
+            "currency": "EUR",
+            "language": "FI",
+            "items": [],
+            "customer": {"email": "test.customer@example.com"},
+            "redirectUrls": {
+                "success": "https://ecom.example.com/cart/success",
+                "cancel": "https://ecom.example.com/cart/cancel",
+            },
+        }
+
+        with override_settings(CHECKOUT_API_BASE_URL=server.base_url):
+            result = create_payment(meta, body)
+
+        assert result["reference"] == "3759170"
+
+        response = requests.get(result["href"], allow_redirects=False, timeout=5)
+        redirect_url = urlparse(response.headers["Location"])
+        params = dict(parse_qsl(redirect_url.query))
+
+        assert redirect_url.path == "/cart/success"
+        assert params["checkout-status"] == "ok"
+        assert params["checkout-transaction-id"] == result["transactionId"]
+        assert params["signature"] == calculate_hmac(meta.checkout_password, params)
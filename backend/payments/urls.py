@@ -3,6 +3,8 @@ from django.urls import re_path
 from payments.views import (
     payments_checkout_cancel_callback,
     payments_checkout_cancel_view,
+    payments_checkout_redirect_view,
+    payments_checkout_status_view,
     payments_checkout_success_callback,
     payments_checkout_success_view,
 )
@@ -18,6 +20,16 @@ urlpatterns = [
         payments_checkout_cancel_view,
         name="payments_checkout_cancel_view",
     ),
+    re_path(
+        r"payments/checkout/(?P<stamp>[0-9a-f-]+)/redirect/?$",
+        payments_checkout_redirect_view,
+        name="payments_checkout_redirect_view",
+    ),
+    re_path(
+        r"payments/checkout/(?P<stamp>[0-9a-f-]+)/status/?$",
+        payments_checkout_status_view,
+        name="payments_checkout_status_view",
+    ),
     re_path(
         r"payments/checkout/callbacks/success/?$",
         payments_checkout_success_callback,
@@ -1,10 +1,14 @@
 import logging
 
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
 
 from .helpers import valid_signature_required
+from .models import CheckoutPayment
 
 logger = logging.getLogger("kompassi")
 
@@ -53,3 +57,26 @@ def payments_checkout_success_callback(request, payment):
 def payments_checkout_cancel_callback(request, payment):
     payment.process_checkout_response(request.GET)
     return HttpResponse("")
+
+
+@never_cache
+@require_safe
+def payments_checkout_redirect_view(request, stamp):
+    """
+    Shown while the payment is being created in the background (CHECKOUT_ASYNC_CREATE_PAYMENT).
+    Polls payments_checkout_status_view and redirects to the payment wall once it is ready.
+    """
+    payment = get_object_or_404(CheckoutPayment, stamp=stamp)
+    return render(request, "payments_checkout_redirect_view.pug", dict(payment=payment))
+
+
+@never_cache
+@require_safe
+def payments_checkout_status_view(request, stamp):
+    payment = get_object_or_404(CheckoutPayment, stamp=stamp)
+
+    if payment.status == "fail":
+        messages.error(request, _("The payment was not completed. Please try again."))
+        return JsonResponse(dict(ready=True, href=payment.get_redirect().url))
+
+    return JsonResponse(dict(ready=bool(payment.checkout_href), href=payment.checkout_href))
@@ -1,14 +1,125 @@
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
 from typing import TextIO
 
-from django.http import HttpResponse
-from ics import Calendar
-from ics import Event as CalendarEvent
+from django.conf import settings
+from django.db import models
+from django.http import HttpResponse, StreamingHttpResponse
 
 from core.utils.locale_utils import get_message_in_language
 from graphql_api.language import DEFAULT_LANGUAGE
 
 from .models.program import Program
+from .models.schedule import ScheduleItem
+
+PRODID = "-//Kompassi//Program V2//EN"
+CALENDAR_CONTENT_TYPE = "text/calendar; charset=utf-8"
+
+# RFC 5545 section 3.1: lines SHOULD NOT be longer than 75 octets, excluding the line break
+MAX_LINE_OCTETS = 75
+
+
+def escape_text(value: str) -> str:
+    """
+    Escapes a TEXT property value (RFC 5545 section 3.3.11).
+    """
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\r", "")
+        .replace("\n", "\\n")
+    )
+
+
+def format_datetime(t: datetime) -> str:
+    return t.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+
+
+def fold_line(line: str) -> str:
+    """
+    Splits a content line into lines of at most 75 octets, continuation lines starting
+    with a space (RFC 5545 section 3.1). Does not split multi-octet UTF-8 characters.
+    """
+    if len(line.encode("utf-8")) <= MAX_LINE_OCTETS:
+        return line + "\r\n"
+
+    parts = []
+    current = ""
+    current_octets = 0
+    # continuation lines lose one octet to the leading space
+    limit = MAX_LINE_OCTETS
+
+    for char in line:
+        char_octets = len(char.encode("utf-8"))
+        if current_octets + char_octets > limit:
+            parts.append(current)
+            current = ""
+            current_octets = 0
+            limit = MAX_LINE_OCTETS - 1
+        current += char
+        current_octets += char_octets
+
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def get_schedule_items(programs: Iterable[Program]) -> models.QuerySet[ScheduleItem]:
+    """
+    Fetches the schedule items of the programs in one query, joined with their programs and events.
+    """
+    return (
+        ScheduleItem.objects.filter(program__in=[program.id for program in programs])
+        .select_related("program", "cached_event")
+        .order_by("start_time", "id")
+    )
+
+
+def get_uid(schedule_item: ScheduleItem) -> str:
+    """
+    Schedule item slugs are unique within an event, so this stays the same across exports
+    and lets calendar clients update existing events instead of duplicating them.
+    """
+    return f"{schedule_item.slug}.{schedule_item.cached_event.slug}@{settings.KOMPASSI_INSTALLATION_SLUG}"
+
+
+def iter_vevent(schedule_item: ScheduleItem, language: str = DEFAULT_LANGUAGE) -> Iterator[str]:
+    program = schedule_item.program
+
+    # derived from the data instead of the current time so that unchanged events serialize identically
+    last_modified = max(program.updated_at, schedule_item.updated_at)
+
+    yield "BEGIN:VEVENT"
+    yield f"UID:{get_uid(schedule_item)}"
+    yield f"DTSTAMP:{format_datetime(last_modified)}"
+    yield f"LAST-MODIFIED:{format_datetime(last_modified)}"
+    yield f"DTSTART:{format_datetime(schedule_item.start_time)}"
+    yield f"DTEND:{format_datetime(schedule_item.cached_end_time)}"
+    yield f"SUMMARY:{escape_text(schedule_item.title)}"
+
+    if program.description:
+        yield f"DESCRIPTION:{escape_text(program.description)}"
+
+    if location := get_message_in_language(schedule_item.cached_location, language):
+        yield f"LOCATION:{escape_text(location)}"
+
+    yield "END:VEVENT"
+
+
+def iter_calendar(
+    schedule_items: Iterable[ScheduleItem],
+    language: str = DEFAULT_LANGUAGE,
+) -> Iterator[str]:
+    """
+    Yields the iCalendar serialization of the schedule items one VEVENT at a time.
+    """
+    yield "".join(fold_line(line) for line in ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}"])
+
+    for schedule_item in schedule_items:
+        yield "".join(fold_line(line) for line in iter_vevent(schedule_item, language))
+
+    yield fold_line("END:VCALENDAR")
 
 
 def export_programs(
@@ -16,25 +127,19 @@ def export_programs(
     output_stream: TextIO | HttpResponse,
     language=DEFAULT_LANGUAGE,
 ):
-    calendar = Calendar()
-    for program in programs:
-        for schedule_item in program.schedule_items.all():
-            event = CalendarEvent()
-            event.name = schedule_item.title
-            event.begin = schedule_item.start_time
-            event.end = schedule_item.cached_end_time
-            event.description = program.description.replace("\r", "")
-            event.location = get_message_in_language(program.cached_location, language)
-            calendar.events.add(event)
-
-    output_stream.writelines(calendar.serialize_iter())
+    schedule_items = get_schedule_items(programs).iterator()
+    output_stream.writelines(iter_calendar(schedule_items, language=language))
 
 
 def export_program_response(
     programs: Iterable[Program],
     language=DEFAULT_LANGUAGE,
 ):
-    response = HttpResponse(content_type="text/calendar")
+    schedule_items = get_schedule_items(programs).iterator()
+    return calendar_streaming_response(iter_calendar(schedule_items, language=language))
+
+
+def calendar_streaming_response(chunks: Iterable[str]):
+    response = StreamingHttpResponse(chunks, content_type=CALENDAR_CONTENT_TYPE)
     response["Content-Disposition"] = "attachment; filename=program.ics"
-    export_programs(programs, response, language=language)
     return response
@@ -60,6 +60,21 @@ class ProgramFilters:
             hide_past=hide_past,
         )
 
+    def get_cache_key(self, hide_past: bool | None = None) -> list:
+        """
+        Returns a JSON serializable representation of the filters that is the same for
+        filters that select the same programs.
+        """
+        return [
+            sorted(set(self.slugs or [])),
+            sorted(
+                (dimension_slug, sorted({slug for slugs in value_slugs for slug in slugs.split(",")}))
+                for dimension_slug, value_slugs in self.dimensions.items()
+            ),
+            self.favorites_only,
+            self.hide_past if hide_past is None else hide_past,
+        ]
+
     def filter_program(
         self,
         programs: models.QuerySet[Program],
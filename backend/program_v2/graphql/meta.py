@@ -19,6 +19,7 @@ from ..models import (
 )
 from ..models.annotations import ANNOTATIONS
 from ..models.meta import ProgramV2ProfileMeta
+from ..program_cache import get_cached_programs
 from .annotations import AnnotationSchemoidType
 from .dimension import DimensionType
 from .offer_form import OfferFormType
@@ -39,12 +40,15 @@ class ProgramV2EventMetaType(DjangoObjectType):
         hide_past: bool = False,
     ):
         request: HttpRequest = info.context
-        programs = Program.objects.filter(event=meta.event)
-        return ProgramFilters.from_graphql(
-            filters,
-            favorites_only=favorites_only,
-            hide_past=hide_past,
-        ).filter_program(programs, user=request.user)
+        return get_cached_programs(
+            meta.event_id,
+            ProgramFilters.from_graphql(
+                filters,
+                favorites_only=favorites_only,
+                hide_past=hide_past,
+            ),
+            user=request.user,
+        )
 
     programs = graphene.NonNull(
         graphene.List(graphene.NonNull(ProgramType)),
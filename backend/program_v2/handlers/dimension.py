@@ -5,10 +5,20 @@ from django.forms import ValidationError
 
 from core.utils import slugify
 from core.utils.locale_utils import get_message_in_language
+from core.utils.transaction_utils import OnCommitBatch
 from graphql_api.language import DEFAULT_LANGUAGE
 
 from ..models import Dimension, DimensionValue, Program, ProgramDimensionValue
 
+# Importers and admin edits change lots of dimensions, values and program dimension values in one go.
+# Collect what needs to be refreshed and do it once when the transaction commits.
+refresh_cached_dimensions_for_events = OnCommitBatch[int](
+    lambda event_ids: Program.refresh_cached_dimensions_async(
+        Program.objects.filter(event_id__in=event_ids).values_list("id", flat=True)
+    )
+)
+refresh_cached_dimensions_for_programs = OnCommitBatch[int](Program.refresh_cached_dimensions_async)
+
 
 @receiver(pre_save, sender=ProgramDimensionValue)
 def program_dimension_value_pre_save(sender, instance: ProgramDimensionValue, **kwargs):
@@ -21,30 +31,28 @@ def program_dimension_value_pre_save(sender, instance: ProgramDimensionValue, **
 @receiver([post_save, post_delete], sender=Dimension)
 @receiver([post_save, post_delete], sender=DimensionValue)
 def dimension_post_save(sender, instance: Dimension | DimensionValue, **kwargs):
-    if isinstance(kwargs["origin"], QuerySet):
+    if isinstance(kwargs.get("origin"), QuerySet):
         # should not run on bulk delete :)
         return
 
     if kwargs.get("update_fields", {}):
         return
 
-    Program.refresh_cached_dimensions_qs(instance.event.programs.all())
+    event_id = instance.event_id if isinstance(instance, Dimension) else instance.dimension.event_id
+    refresh_cached_dimensions_for_events.add(event_id)
 
 
 @receiver([post_save, post_delete], sender=ProgramDimensionValue)
 def program_dimension_value_post_save(sender, instance: ProgramDimensionValue, **kwargs):
-    if isinstance(kwargs["origin"], QuerySet):
+    if isinstance(kwargs.get("origin"), QuerySet):
         # should not run on bulk delete :)
         return
 
     if kwargs.get("update_fields", {}):
         return
 
-    program = instance.program
-    program.refresh_cached_dimensions()
-
-    for schedule_item in program.schedule_items.all():
-        schedule_item.refresh_cached_fields()
+    # also refreshes cached_location of schedule items
+    refresh_cached_dimensions_for_programs.add(instance.program_id)
 
 
 @receiver(pre_save, sender=(Dimension, DimensionValue))
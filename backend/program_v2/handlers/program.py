@@ -1,12 +1,19 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from core.utils import slugify
 
 from ..models import Program
+from ..program_cache import invalidate_program_cache
 
 
 @receiver(pre_save, sender=Program)
 def program_pre_save(sender, instance, **kwargs):
     if instance.event is not None and instance.slug is None:
         instance.slug = slugify(instance.title)
+
+
+@receiver([post_save, post_delete], sender=Program)
+def program_post_save(sender, instance: Program, **kwargs):
+    # changes to schedule items and dimensions are covered by refresh_cached_*
+    invalidate_program_cache.add(instance.event_id)
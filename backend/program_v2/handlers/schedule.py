@@ -1,17 +1,26 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from core.utils.transaction_utils import OnCommitBatch
+
+from ..models.program import Program
 from ..models.schedule import ScheduleItem
 
+# When many schedule items change within one transaction (eg. importers, admin inlines),
+# cached times are refreshed once per transaction instead of once per schedule item.
+refresh_cached_times = OnCommitBatch[int](
+    lambda program_ids: Program.refresh_cached_times_qs(Program.objects.filter(id__in=program_ids))
+)
+
 
 @receiver(pre_save, sender=ScheduleItem)
 def program_pre_save(sender, instance: ScheduleItem, **kwargs):
     instance.with_generated_fields()
 
 
-@receiver(post_save, sender=ScheduleItem)
+@receiver([post_save, post_delete], sender=ScheduleItem)
 def program_post_save(sender, instance: ScheduleItem, **kwargs):
     if kwargs.get("update_fields", {}):
         return
 
-    instance.program.refresh_cached_times()
+    refresh_cached_times.add(instance.program_id)
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("program_v2", "0020_alter_scheduleitem_options_scheduleitem_cached_event_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scheduleitem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,17 +1,20 @@
 from __future__ import annotations
 
 import logging
-from itertools import batched
+from collections.abc import Iterable
 from typing import TYPE_CHECKING, Self
 
 from django.conf import settings
 from django.db import models, transaction
 from django.http import HttpRequest
 from django.urls import reverse
+from django.utils.timezone import now
 
 from core.models import Event
 from core.utils import validate_slug
 
+from ..program_cache import invalidate_program_cache
+
 if TYPE_CHECKING:
     from programme.models.programme import Programme
 
@@ -82,138 +85,188 @@ class Program(models.Model):
         cls.refresh_cached_dimensions_qs(queryset)
         cls.refresh_cached_times_qs(queryset)
 
-    def _build_dimensions(self):
-        """
-        Used to populate cached_dimensions
+    @classmethod
+    def _build_cached_dimensions_qs(
+        cls,
+        queryset: models.QuerySet[Self],
+    ) -> dict[int, tuple[dict[str, list[str]], dict[str, str], str]]:
         """
-        # TODO should all event dimensions always be present, or only those with values?
-        # TODO when dimensions are changed for an event, refresh all cached_dimensions
-        dimensions = {dimension.slug: [] for dimension in self.event.program_dimensions.all()}
-        for pdv in self.dimensions.all():
-            dimensions[pdv.dimension.slug].append(pdv.value.slug)
-        return dimensions
+        Computes cached_dimensions, cached_location and cached_color for all programs in the
+        queryset using a constant number of queries regardless of the number of programs.
 
-    def _build_location(self):
-        localized_locations: dict[str, set[str]] = {}
+        Returns program id -> (cached_dimensions, cached_location, cached_color).
+        """
+        from .dimension import Dimension, ProgramDimensionValue
+        from .meta import ProgramV2EventMeta
 
-        if location_dimension := self.meta.location_dimension:
-            for pdv in self.dimensions.filter(dimension=location_dimension):
-                for lang, title in pdv.value.title.items():
-                    if not title:
-                        # placate typechecker
-                        continue
+        event_id_by_program_id: dict[int, int] = dict(queryset.order_by().values_list("id", "event_id"))
+        event_ids = set(event_id_by_program_id.values())
 
-                    localized_locations.setdefault(lang, set()).add(title)
+        # TODO should all event dimensions always be present, or only those with values?
+        dimension_slugs_by_event_id: dict[int, list[str]] = {}
+        for event_id, dimension_slug in Dimension.objects.filter(event_id__in=event_ids).values_list(
+            "event_id",
+            "slug",
+        ):
+            dimension_slugs_by_event_id.setdefault(event_id, []).append(dimension_slug)
+
+        location_dimension_id_by_event_id: dict[int, int | None] = dict(
+            ProgramV2EventMeta.objects.filter(event_id__in=event_ids).values_list("event_id", "location_dimension_id")
+        )
 
-        return {lang: ", ".join(locations) for lang, locations in localized_locations.items() if locations}
+        dimensions_by_program_id = {
+            program_id: {dimension_slug: [] for dimension_slug in dimension_slugs_by_event_id.get(event_id, [])}
+            for program_id, event_id in event_id_by_program_id.items()
+        }
+        # lang -> titles (dict used as an ordered set)
+        locations_by_program_id: dict[int, dict[str, dict[str, None]]] = {}
+        color_by_program_id: dict[int, str] = {}
+
+        # NOTE: PDV default ordering (dimension__order, value__order) determines the order of values
+        # in cached_dimensions as well as which color wins if multiple values have one
+        for (
+            program_id,
+            dimension_id,
+            dimension_slug,
+            value_slug,
+            value_title,
+            value_color,
+        ) in ProgramDimensionValue.objects.filter(program_id__in=event_id_by_program_id.keys()).values_list(
+            "program_id",
+            "dimension_id",
+            "dimension__slug",
+            "value__slug",
+            "value__title",
+            "value__color",
+        ):
+            dimensions_by_program_id[program_id].setdefault(dimension_slug, []).append(value_slug)
+
+            event_id = event_id_by_program_id[program_id]
+            if dimension_id == location_dimension_id_by_event_id.get(event_id):
+                localized_locations = locations_by_program_id.setdefault(program_id, {})
+                for lang, title in value_title.items():
+                    if title:
+                        localized_locations.setdefault(lang, {})[title] = None
+
+            if value_color and program_id not in color_by_program_id:
+                color_by_program_id[program_id] = value_color
+
+        return {
+            program_id: (
+                dimensions,
+                {
+                    lang: ", ".join(locations)
+                    for lang, locations in locations_by_program_id.get(program_id, {}).items()
+                    if locations
+                },
+                color_by_program_id.get(program_id, ""),
+            )
+            for program_id, dimensions in dimensions_by_program_id.items()
+        }
 
-    def _get_color(self):
+    def refresh_cached_dimensions(self):
         """
-        Gets a color for the program from its dimension values.
-        TODO deterministic behaviour when multiple colors are present (ordering for dimensions/values?)
+        Refresh cached_dimensions, cached_location and cached_color for this program
+        and cached_location for its schedule items.
+        NOTE: Use refresh_cached_dimensions_qs for bulk updates.
         """
-        first_pdv_with_color = self.dimensions.exclude(value__color="").first()
-        return first_pdv_with_color.value.color if first_pdv_with_color else ""
-
-    def refresh_cached_dimensions(self):
-        from .schedule import ScheduleItem
-
-        self.cached_dimensions = self._build_dimensions()
-        self.cached_location = self._build_location()
-        self.cached_color = self._get_color()
-        self.save(update_fields=["cached_dimensions", "cached_location", "cached_color"])
-        self.schedule_items.update(cached_location=self.cached_location)
-
-        bulk_update_schedule_items = []
-        for schedule_item in self.schedule_items.filter(program=self).select_for_update(of=("self",)):
-            schedule_item.cached_location = self.cached_location
-            bulk_update_schedule_items.append(schedule_item)
-        ScheduleItem.objects.bulk_update(bulk_update_schedule_items, ["cached_location"])
+        self.refresh_cached_dimensions_qs(Program.objects.filter(id=self.id))
+        self.refresh_from_db(fields=["cached_dimensions", "cached_location", "cached_color"])
 
     program_batch_size = 100
-    schedule_item_batch_size = 100
 
     @classmethod
     def refresh_cached_dimensions_qs(cls, queryset: models.QuerySet[Self]):
         from .schedule import ScheduleItem
 
         with transaction.atomic():
-            for page, program_batch in enumerate(
-                batched(
-                    queryset.select_for_update(of=("self",)).only(
-                        "id",
-                        "cached_dimensions",
-                        "cached_location",
-                        "cached_color",
-                    ),
-                    cls.program_batch_size,
-                )
-            ):
-                logger.info("Refreshing cached dimensions for programs, page %d", page)
-                bulk_update_programs = []
-                for program in program_batch:
-                    program.cached_dimensions = program._build_dimensions()
-                    program.cached_location = program._build_location()
-                    program.cached_color = program._get_color()
-                    bulk_update_programs.append(program)
-                cls.objects.bulk_update(bulk_update_programs, ["cached_dimensions", "cached_location", "cached_color"])
-
-            for page, schedule_item_batch in enumerate(
-                batched(
-                    ScheduleItem.objects.filter(program__in=queryset)
-                    .select_for_update(of=("self",))
-                    .select_related("program")
-                    .only("program__cached_location"),
-                    cls.schedule_item_batch_size,
-                )
-            ):
-                logger.info("Refreshing cached locations for schedule items, page %d", page)
-                bulk_update_schedule_items = []
-                for schedule_item in schedule_item_batch:
-                    schedule_item.cached_location = schedule_item.program.cached_location
-                    bulk_update_schedule_items.append(schedule_item)
-                ScheduleItem.objects.bulk_update(bulk_update_schedule_items, ["cached_location"])
+            programs = list(queryset.select_for_update(of=("self",)).only("id"))
+            cached_dimensions_by_program_id = cls._build_cached_dimensions_qs(
+                cls.objects.filter(id__in=[program.id for program in programs])
+            )
+
+            for program in programs:
+                (
+                    program.cached_dimensions,
+                    program.cached_location,
+                    program.cached_color,
+                ) = cached_dimensions_by_program_id[program.id]
+
+            logger.info("Refreshing cached dimensions for %d programs", len(programs))
+            cls.objects.bulk_update(
+                programs,
+                ["cached_dimensions", "cached_location", "cached_color"],
+                batch_size=cls.program_batch_size,
+            )
+
+            logger.info("Refreshing cached locations for schedule items")
+            ScheduleItem.objects.filter(program__in=programs).update(
+                cached_location=models.Subquery(
+                    cls.objects.filter(id=models.OuterRef("program_id")).values("cached_location")[:1]
+                ),
+                # calendar exports use this as LAST-MODIFIED
+                updated_at=now(),
+            )
+
+            invalidate_program_cache.add_many(queryset.order_by().values_list("event_id", flat=True).distinct())
 
         logger.info("Finished refreshing cached dimensions for programs")
 
+    @classmethod
+    def refresh_cached_dimensions_async(cls, program_ids: Iterable[int]):
+        """
+        Refreshes cached dimensions of the given programs in the background if possible.
+        """
+        program_ids = list(program_ids)
+        if not program_ids:
+            return
+
+        if "background_tasks" in settings.INSTALLED_APPS:
+            from ..tasks import program_refresh_cached_dimensions
+
+            program_refresh_cached_dimensions.delay(program_ids)  # type: ignore
+        else:
+            cls.refresh_cached_dimensions_qs(cls.objects.filter(id__in=program_ids))
+
     def refresh_cached_times(self):
         """
         Used to populate cached_earliest_start_time and cached_latest_end_time
         """
-        earliest_start_time = self.schedule_items.order_by("start_time").first()
-        latest_end_time = self.schedule_items.order_by("cached_end_time").last()
+        times = self.schedule_items.aggregate(
+            earliest_start_time=models.Min("start_time"),
+            latest_end_time=models.Max("cached_end_time"),
+        )
 
-        self.cached_earliest_start_time = earliest_start_time.start_time if earliest_start_time else None
-        self.cached_latest_end_time = latest_end_time.cached_end_time if latest_end_time else None
+        self.cached_earliest_start_time = times["earliest_start_time"]
+        self.cached_latest_end_time = times["latest_end_time"]
 
         self.save(update_fields=["cached_earliest_start_time", "cached_latest_end_time"])
+        invalidate_program_cache.add(self.event_id)
 
     @classmethod
     def refresh_cached_times_qs(cls, queryset: models.QuerySet[Self]):
-        with transaction.atomic():
-            for page, batch in enumerate(
-                batched(
-                    queryset.select_for_update(of=("self",)).only(
-                        "id",
-                        "cached_earliest_start_time",
-                        "cached_latest_end_time",
-                    ),
-                    cls.program_batch_size,
-                )
-            ):
-                logger.info("Refreshing cached times for programs, page %d", page)
-                bulk_update = []
-                for program in batch:
-                    earliest_start_time = program.schedule_items.order_by("start_time").first()
-                    latest_end_time = program.schedule_items.order_by("cached_end_time").last()
-
-                    program.cached_earliest_start_time = earliest_start_time.start_time if earliest_start_time else None
-                    program.cached_latest_end_time = latest_end_time.cached_end_time if latest_end_time else None
-
-                    bulk_update.append(program)
-                cls.objects.bulk_update(bulk_update, ["cached_earliest_start_time", "cached_latest_end_time"])
-
-        logger.info("Finished refreshing cached times for programs")
+        """
+        Refreshes cached_earliest_start_time and cached_latest_end_time for all programs in the
+        queryset with a single UPDATE using per-program Min/Max aggregates of their schedule items.
+        """
+        from .schedule import ScheduleItem
+
+        def schedule_item_aggregate(aggregate: models.Aggregate):
+            return models.Subquery(
+                ScheduleItem.objects.filter(program=models.OuterRef("pk"))
+                .order_by()
+                .values("program")
+                .annotate(value=aggregate)
+                .values("value")
+            )
+
+        num_updated = cls.objects.filter(id__in=queryset.values("id")).update(
+            cached_earliest_start_time=schedule_item_aggregate(models.Min("start_time")),
+            cached_latest_end_time=schedule_item_aggregate(models.Max("cached_end_time")),
+        )
+
+        logger.info("Refreshed cached times for %d programs", num_updated)
+        invalidate_program_cache.add_many(queryset.order_by().values_list("event_id", flat=True).distinct())
 
     @classmethod
     def import_program_from_v1(
@@ -37,6 +37,8 @@ class ScheduleItem(models.Model):
     )
     cached_location = models.JSONField(blank=True, default=dict)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ["cached_event", "start_time"]
         unique_together = [("cached_event", "slug")]
@@ -63,7 +65,7 @@ class ScheduleItem(models.Model):
             self.cached_end_time = self.start_time + self.length
 
         if commit:
-            self.save(update_fields=["cached_end_time", "cached_event", "cached_location"])
+            self.save(update_fields=["cached_end_time", "cached_event", "cached_location", "updated_at"])
 
     def with_generated_fields(self) -> Self:
         """
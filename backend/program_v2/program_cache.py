@@ -0,0 +1,131 @@
+"""
+Caching of public program listings.
+
+Each event has a program version in the Django cache. It is bumped (once per transaction)
+whenever program, schedule or dimension data of the event changes. All cache keys include
+the version, so bumping it invalidates every listing and calendar export of the event.
+The version is a millisecond timestamp and doubles as Last-Modified of the listings.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import replace
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+from django.core.cache import cache
+from django.http import Http404
+from django.utils.timezone import now
+
+from core.utils.transaction_utils import OnCommitBatch
+
+if TYPE_CHECKING:
+    from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
+
+    from .filters import ProgramFilters
+    from .models.program import Program
+
+
+PROGRAM_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _version_key(event_id: int) -> str:
+    return f"program_v2:version:{event_id}"
+
+
+def _make_version() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def get_program_version(event_id: int) -> int:
+    key = _version_key(event_id)
+    if (version := cache.get(key)) is None:
+        # add instead of set so that we do not overwrite a version bumped in the meantime
+        cache.add(key, _make_version(), PROGRAM_CACHE_TIMEOUT)
+        version = cache.get(key, _make_version())
+    return version
+
+
+def get_program_last_modified(version: int) -> datetime:
+    return datetime.fromtimestamp(version / 1000, UTC)
+
+
+def bump_program_versions(event_ids: Iterable[int]):
+    keys = [_version_key(event_id) for event_id in event_ids]
+    if not keys:
+        return
+
+    old_versions = cache.get_many(keys)
+    new_version = _make_version()
+
+    # make sure the version changes even if bumped twice within the same millisecond
+    cache.set_many(
+        {key: max(new_version, old_versions.get(key, 0) + 1) for key in keys},
+        PROGRAM_CACHE_TIMEOUT,
+    )
+
+
+invalidate_program_cache = OnCommitBatch[int](bump_program_versions)
+
+
+def get_event_id(event_slug: str) -> int:
+    """
+    Event slugs do not change, so the mapping is cached to let cached listings be served
+    without touching the database. Raises Http404 if there is no such event.
+    """
+    from core.models.event import Event
+
+    key = f"program_v2:event_id:{event_slug}"
+    if (event_id := cache.get(key)) is None:
+        try:
+            event_id = Event.objects.values_list("id", flat=True).get(slug=event_slug)
+        except Event.DoesNotExist as e:
+            raise Http404(f"Event {event_slug} not found") from e
+        cache.set(key, event_id, PROGRAM_CACHE_TIMEOUT)
+    return event_id
+
+
+def get_digest(*parts: object) -> str:
+    serialized = json.dumps(parts, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+
+
+def get_cached_programs(
+    event_id: int,
+    filters: ProgramFilters,
+    user: AbstractBaseUser | AnonymousUser | None = None,
+) -> Sequence[Program]:
+    """
+    Returns the programs of the event that match the filters, ordered by start time.
+
+    Favorites are user-specific and are not cached. Past programs are filtered out after
+    the cache so that the cached listing does not depend on the current time.
+    """
+    from .models.program import Program
+
+    programs = Program.objects.filter(event_id=event_id).select_related("event")
+
+    if filters.favorites_only:
+        return filters.filter_program(programs, user=user)
+
+    version = get_program_version(event_id)
+    key = f"program_v2:programs:{event_id}:{version}:{get_digest(filters.get_cache_key(hide_past=False))}"
+
+    cached_programs: list[Program] | None = cache.get(key)
+    if cached_programs is None:
+        cached_programs = list(replace(filters, hide_past=False).filter_program(programs))
+        cache.set(key, cached_programs, PROGRAM_CACHE_TIMEOUT)
+
+    if filters.hide_past:
+        t = now()
+        cached_programs = [
+            program
+            for program in cached_programs
+            if program.cached_latest_end_time is not None and program.cached_latest_end_time >= t
+        ]
+
+    return cached_programs
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+
+@shared_task(ignore_result=True)
+def program_refresh_cached_dimensions(program_ids: list[int]):
+    from .models.program import Program
+
+    Program.refresh_cached_dimensions_qs(Program.objects.filter(id__in=program_ids))
@@ -1,24 +1,96 @@
-from django.http import HttpRequest
-from django.shortcuts import get_object_or_404
+from collections.abc import Iterable, Iterator
+
+from django.core.cache import cache
+from django.http import Http404, HttpRequest
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 
-from core.models.event import Event
 from graphql_api.language import DEFAULT_LANGUAGE
 
-from ..calendar_export import export_program_response
+from ..calendar_export import calendar_streaming_response, get_schedule_items, iter_calendar
 from ..filters import ProgramFilters
-from ..models.program import Program
+from ..program_cache import (
+    PROGRAM_CACHE_TIMEOUT,
+    get_cached_programs,
+    get_digest,
+    get_event_id,
+    get_program_last_modified,
+    get_program_version,
+)
+
+
+def _iter_and_cache(key: str, chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Passes the chunks through and caches them once all of them have been sent.
+    """
+    sent = []
+    for chunk in chunks:
+        sent.append(chunk)
+        yield chunk
+    cache.set(key, "".join(sent), PROGRAM_CACHE_TIMEOUT)
+
+
+def _calendar_response(
+    request: HttpRequest,
+    event_slug: str,
+    filters: ProgramFilters,
+    language: str,
+    not_found_if_empty: bool = False,
+):
+    """
+    Serves the calendar export of the programs matching the filters.
+
+    The calendar is streamed as it is rendered. Unless favorites are requested, the rendered
+    calendar is also cached and the response carries an ETag and Last-Modified derived from
+    the program version of the event, so that conditional requests are answered with 304
+    without touching the database.
+    """
+    event_id = get_event_id(event_slug)
+    programs = get_cached_programs(event_id, filters, user=request.user)
+
+    if not_found_if_empty and not programs:
+        raise Http404("Program not found")
+
+    if filters.favorites_only:
+        response = calendar_streaming_response(
+            iter_calendar(get_schedule_items(programs).iterator(), language=language)
+        )
+        patch_vary_headers(response, ["Cookie"])
+    else:
+        version = get_program_version(event_id)
+        last_modified = get_program_last_modified(version)
+        # hide_past is applied after the cache, so the program ids are part of the digest
+        digest = get_digest(language, [program.id for program in programs])
+        etag = f'"{event_id}-{version}-{digest}"'
+
+        if response := get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp())):
+            return response
+
+        key = f"program_v2:calendar:{event_id}:{version}:{digest}"
+        if (body := cache.get(key)) is not None:
+            chunks = [body]
+        else:
+            chunks = _iter_and_cache(key, iter_calendar(get_schedule_items(programs).iterator(), language=language))
+
+        response = calendar_streaming_response(chunks)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+
+    return response
 
 
 # TODO add test for this view
 def calendar_export_view(request: HttpRequest, event_slug: str):
-    event = get_object_or_404(Event, slug=event_slug)
     filters: dict[str, list[str]] = {k: [str(v) for v in vs] for k, vs in request.GET.lists()}
     language = filters.pop("language", [DEFAULT_LANGUAGE])[0]
-    programs = Program.objects.filter(event=event)
-    programs = ProgramFilters.from_query_dict(filters).filter_program(programs, user=request.user)
-    return export_program_response(programs, language=language)
+    return _calendar_response(request, event_slug, ProgramFilters.from_query_dict(filters), language)
 
 
 def single_program_calendar_export_view(request: HttpRequest, event_slug: str, program_slug: str):
-    program = get_object_or_404(Program, event__slug=event_slug, slug=program_slug)
-    return export_program_response([program], language=request.GET.get("language", DEFAULT_LANGUAGE))
+    return _calendar_response(
+        request,
+        event_slug,
+        ProgramFilters(slugs=[program_slug]),
+        request.GET.get("language", DEFAULT_LANGUAGE),
+        not_found_if_empty=True,
+    )
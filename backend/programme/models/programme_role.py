@@ -123,6 +123,8 @@ class ProgrammeRole(models.Model, CsvExportMixin):
         else:
             return self.programme.get_state_display()  # type: ignore
 
+    csv_prefetch_related = ("person", "programme__form_used", "role")
+
     @classmethod
     def get_csv_fields(cls, event):
         from core.models import Person
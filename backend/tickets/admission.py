@@ -0,0 +1,253 @@
+"""
+Admission control for ticket sales openings ("virtual waiting room").
+
+When TicketsEventMeta.max_active_buyers is set, at most that many visitors may be in the
+ticket shop of the event at once. Each admitted visitor holds one of max_active_buyers
+slots in the Django cache. Slots are leases that are renewed on every request and expire
+ADMISSION_LEASE_SECONDS after the last one, so visitors who just leave free their slot
+without telling us.
+
+Other visitors get a position in a FIFO queue. The position is kept in a signed cookie, so
+queueing costs no database writes. Positions up to the queue head are "called" and may
+claim a free slot. The head advances by the number of free slots at most once per
+ADMISSION_ADVANCE_SECONDS, so called visitors who have given up only delay the ones behind
+them by that much.
+
+All state lives under an epoch that is reset if the cache is cleared, in which case queued
+visitors simply get a new position.
+"""
+
+from __future__ import annotations
+
+import secrets
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import TYPE_CHECKING
+
+from django.core import signing
+from django.core.cache import cache
+
+if TYPE_CHECKING:
+    from django.http import HttpRequest, HttpResponse
+
+    from core.models import Event
+
+    from .models import TicketsEventMeta
+
+
+ADMISSION_LEASE_SECONDS = 10 * 60
+ADMISSION_POLL_SECONDS = 5
+# gives called visitors one poll to claim their slot before more visitors are called
+ADMISSION_ADVANCE_SECONDS = ADMISSION_POLL_SECONDS
+ADMISSION_TOKEN_MAX_AGE = 24 * 60 * 60
+ADMISSION_LIMIT_CACHE_SECONDS = 60
+
+COOKIE_NAME_TEMPLATE = "tickets_admission_{event_id}"
+SIGNING_SALT = "tickets.admission"
+REQUEST_ATTRIBUTE_NAME = "tickets_admission"
+
+
+@dataclass(frozen=True)
+class AdmissionToken:
+    epoch: int
+    position: int
+    nonce: str
+    slot: int | None = None
+
+
+@dataclass(frozen=True)
+class AdmissionStatus:
+    token: AdmissionToken
+    admitted: bool
+    ahead: int = 0
+
+    def as_dict(self):
+        return dict(
+            admitted=self.admitted,
+            position=self.token.position,
+            ahead=self.ahead,
+            poll_seconds=ADMISSION_POLL_SECONDS,
+        )
+
+
+def _incr(key: str) -> int:
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+@dataclass
+class AdmissionQueue:
+    event_id: int
+    max_active_buyers: int
+    advance_seconds: int = ADMISSION_ADVANCE_SECONDS
+
+    @classmethod
+    def for_meta(cls, meta: TicketsEventMeta) -> AdmissionQueue | None:
+        """
+        Returns None if the event does not limit the number of active buyers.
+        """
+        if not meta.max_active_buyers:
+            return None
+
+        return cls(event_id=meta.event_id, max_active_buyers=meta.max_active_buyers)
+
+    @property
+    def epoch(self) -> int:
+        key = f"tickets:admission:{self.event_id}:epoch"
+        cache.add(key, time.time_ns(), None)
+        return cache.get(key, 0)
+
+    def _key(self, epoch: int, name: str) -> str:
+        return f"tickets:admission:{self.event_id}:{epoch}:{name}"
+
+    def _slot_keys(self, epoch: int) -> list[str]:
+        return [self._key(epoch, f"slot:{slot}") for slot in range(self.max_active_buyers)]
+
+    def get_free_slots(self, epoch: int) -> list[int]:
+        keys = self._slot_keys(epoch)
+        taken = cache.get_many(keys)
+        return [slot for slot, key in enumerate(keys) if key not in taken]
+
+    def is_holding(self, token: AdmissionToken) -> bool:
+        return (
+            token.slot is not None
+            and token.slot < self.max_active_buyers
+            and cache.get(self._key(token.epoch, f"slot:{token.slot}")) == token.nonce
+        )
+
+    def join(self, epoch: int) -> AdmissionToken:
+        return AdmissionToken(
+            epoch=epoch,
+            position=_incr(self._key(epoch, "tail")),
+            nonce=secrets.token_urlsafe(8),
+        )
+
+    def _advance(self, epoch: int, position: int) -> int:
+        """
+        Calls as many queued visitors as there are free slots. Returns the queue head.
+        """
+        head_key = self._key(epoch, "head")
+        head = cache.get(head_key, 0)
+
+        # the next in line need not wait for the next advance, which keeps a quiet queue from adding latency
+        if (
+            position > head + 1
+            and self.advance_seconds
+            and not cache.add(self._key(epoch, "advance"), 1, self.advance_seconds)
+        ):
+            return head
+
+        if free_slots := len(self.get_free_slots(epoch)):
+            tail = cache.get(self._key(epoch, "tail"), 0)
+            head = min(head + free_slots, tail)
+            cache.set(head_key, head, None)
+
+        return head
+
+    def check(self, token: AdmissionToken | None) -> AdmissionStatus:
+        """
+        Renews the slot of an admitted visitor or tries to admit a queued one.
+        Visitors without a valid token are put at the end of the queue.
+        """
+        epoch = self.epoch
+        if token is None or token.epoch != epoch:
+            token = self.join(epoch)
+
+        if self.is_holding(token):
+            cache.touch(self._key(epoch, f"slot:{token.slot}"), ADMISSION_LEASE_SECONDS)
+            return AdmissionStatus(token=token, admitted=True)
+
+        head = self._advance(epoch, token.position)
+        if token.position > head:
+            return AdmissionStatus(token=token, admitted=False, ahead=token.position - head - 1)
+
+        for slot in self.get_free_slots(epoch):
+            # add is atomic, so if two called visitors race for a slot only one of them gets it
+            if cache.add(self._key(epoch, f"slot:{slot}"), token.nonce, ADMISSION_LEASE_SECONDS):
+                return AdmissionStatus(token=replace(token, slot=slot), admitted=True)
+
+        return AdmissionStatus(token=token, admitted=False)
+
+    def release(self, token: AdmissionToken):
+        if self.is_holding(token):
+            cache.delete(self._key(token.epoch, f"slot:{token.slot}"))
+
+
+def get_cookie_name(event_id: int) -> str:
+    return COOKIE_NAME_TEMPLATE.format(event_id=event_id)
+
+
+def load_token(request: HttpRequest, event_id: int) -> AdmissionToken | None:
+    value = request.COOKIES.get(get_cookie_name(event_id))
+    if not value:
+        return None
+
+    try:
+        return AdmissionToken(**signing.loads(value, salt=SIGNING_SALT, max_age=ADMISSION_TOKEN_MAX_AGE))
+    except (signing.BadSignature, TypeError):
+        return None
+
+
+def save_token(request: HttpRequest, response: HttpResponse, event_id: int, token: AdmissionToken):
+    response.set_cookie(
+        get_cookie_name(event_id),
+        signing.dumps(asdict(token), salt=SIGNING_SALT, compress=True),
+        max_age=ADMISSION_TOKEN_MAX_AGE,
+        secure=request.is_secure(),
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def get_admission_queue_for_slug(event_slug: str) -> AdmissionQueue | None:
+    """
+    Used by the status endpoint that is polled by everyone in the queue, so the
+    settings of the event are cached instead of being read on every poll.
+    """
+    from .models import TicketsEventMeta
+
+    key = f"tickets:admission:settings:{event_slug}"
+    values = cache.get(key)
+    if values is None:
+        values = TicketsEventMeta.objects.filter(event__slug=event_slug).values_list(
+            "event_id",
+            "max_active_buyers",
+        ).first() or (None, None)
+        cache.set(key, values, ADMISSION_LIMIT_CACHE_SECONDS)
+
+    event_id, max_active_buyers = values
+    if not max_active_buyers:
+        return None
+
+    return AdmissionQueue(event_id=event_id, max_active_buyers=max_active_buyers)
+
+
+def has_confirmed_order(request: HttpRequest, event: Event) -> bool:
+    """
+    Customers with a confirmed order have already been through the shop and only need
+    to pay or see their order, so they do not need to queue.
+    """
+    from .helpers import ORDER_KEY_TEMPLATE
+    from .models import Order
+
+    order_id = request.session.get(ORDER_KEY_TEMPLATE.format(event=event))
+    if order_id is None:
+        return False
+
+    return Order.objects.filter(id=order_id, event=event, confirm_time__isnull=False).exists()
+
+
+def release_admission(request: HttpRequest, event: Event):
+    """
+    Frees the slot of the visitor once they no longer need it (ie. they have confirmed
+    their order and are off to pay it), letting the next one in.
+    """
+    status: AdmissionStatus | None = getattr(request, REQUEST_ATTRIBUTE_NAME, None)
+    if status is None or not status.admitted:
+        return
+
+    if queue := AdmissionQueue.for_meta(event.tickets_event_meta):
+        queue.release(status.token)
@@ -0,0 +1,15 @@
+class SoldOut(Exception):
+    def __init__(self, limit_group_id: int):
+        super().__init__(f"Limit group {limit_group_id} is sold out")
+        self.limit_group_id = limit_group_id
+
+
+class OrderCancelled(ValueError):
+    """
+    Raised when a payment arrives for an order that has been cancelled (eg. because its reservation
+    expired) and its products can no longer be reserved for it. The payment needs to be refunded.
+    """
+
+    def __init__(self, order_id: int):
+        super().__init__(f"Order {order_id} has been cancelled and its products are sold out")
+        self.order_id = order_id
@@ -0,0 +1,85 @@
+from collections import Counter
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import LimitGroup, OrderProduct, Product
+
+
+def _saves_reserved_fields(update_fields) -> bool:
+    return update_fields is None or bool({"product", "product_id", "count"}.intersection(update_fields))
+
+
+@receiver(pre_save, sender=OrderProduct)
+def order_product_pre_save(sender, instance: OrderProduct, update_fields=None, **kwargs):
+    # Not loaded from the database with both fields (eg. with .only() or constructed with an existing pk).
+    # If there is no such row, this is a new order product.
+    if instance._saved_values is None and instance.pk is not None and _saves_reserved_fields(update_fields):
+        instance._saved_values = OrderProduct.objects.filter(pk=instance.pk).values_list("product_id", "count").first()
+
+
+@receiver(post_save, sender=OrderProduct)
+def order_product_post_save(sender, instance: OrderProduct, update_fields=None, **kwargs):
+    """
+    Products of confirmed orders are reserved and released by Order.confirm_order, cancel and uncancel.
+    Changes to the products of an order in between (eg. by admins) are applied to the limit groups here.
+    """
+    if not _saves_reserved_fields(update_fields):
+        return
+
+    old_values = instance._saved_values
+    new_values = (instance.product_id, instance.count)
+    instance._saved_values = new_values
+
+    if old_values == new_values or not instance.order.is_active:
+        return
+
+    amounts: Counter[int] = Counter()
+    if old_values is not None:
+        old_product_id, old_count = old_values
+        amounts.subtract(instance.get_limit_group_amounts(old_product_id, old_count))
+    amounts.update(instance.get_limit_group_amounts(*new_values))
+
+    # admins may oversell
+    LimitGroup.reserve(amounts, force=True)
+
+
+@receiver(post_delete, sender=OrderProduct)
+def order_product_post_delete(sender, instance: OrderProduct, **kwargs):
+    if instance.order.is_active:
+        LimitGroup.release(instance.get_limit_group_amounts(instance.product_id, instance.count))
+
+
+@receiver(m2m_changed, sender=Product.limit_groups.through)
+def product_limit_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Products already sold count towards the limit groups they are added to and stop counting towards
+    those they are removed from. Works from both sides of the relation.
+    """
+    if action == "pre_clear":
+        # post_clear does not tell what was cleared
+        if reverse:
+            pk_set = set(instance.product_set.values_list("id", flat=True))
+        else:
+            pk_set = set(instance.limit_groups.values_list("id", flat=True))
+        sign = -1
+    elif action == "post_add":
+        sign = 1
+    elif action == "post_remove":
+        sign = -1
+    else:
+        return
+
+    if not pk_set:
+        return
+
+    if reverse:
+        # instance is a limit group, pk_set are products
+        amounts = {instance.id: sign * sum(Product.get_amounts_sold(pk_set).values())}
+    else:
+        # instance is a product, pk_set are limit groups
+        amount_sold = Product.get_amounts_sold([instance.id]).get(instance.id, 0)
+        amounts = {limit_group_id: sign * amount_sold for limit_group_id in pk_set}
+
+    # admins may oversell
+    LimitGroup.reserve(amounts, force=True)
@@ -1,12 +1,13 @@
 from functools import wraps
 
 from django.contrib import messages
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 
 from core.utils import get_ip
 
+from .admission import REQUEST_ATTRIBUTE_NAME, AdmissionQueue, has_confirmed_order, load_token, save_token
 from .models import Order
 
 __all__ = [
@@ -17,6 +18,7 @@ __all__ = [
     "is_phase_completed",
     "set_order",
     "tickets_admin_required",
+    "tickets_admission_required",
     "tickets_event_required",
 ]
 
@@ -154,3 +156,36 @@ def tickets_event_required(view_func):
         return view_func(request, event, *args, **kwargs)
 
     return wrapper
+
+
+def tickets_admission_required(view_func):
+    """
+    Places customers in the admission queue of the event if it limits the number of active buyers.
+    Only for the views of the ticket shop, under tickets_event_required. Admins are let through.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, event, *args, **kwargs):
+        meta = event.tickets_event_meta
+
+        # v1.5 router delegates to a v1 view that is also decorated, so only check admission once per request
+        if (
+            (queue := AdmissionQueue.for_meta(meta))
+            and not hasattr(request, REQUEST_ATTRIBUTE_NAME)
+            and not meta.is_user_admin(request.user)
+            and not has_confirmed_order(request, event)
+        ):
+            status = queue.check(load_token(request, event.id))
+            setattr(request, REQUEST_ATTRIBUTE_NAME, status)
+
+            if status.admitted:
+                response = view_func(request, event, *args, **kwargs)
+            else:
+                response = render(request, "tickets_queue_view.pug", dict(event=event, status=status))
+
+            save_token(request, response, event.id, status.token)
+            return response
+
+        return view_func(request, event, *args, **kwargs)
+
+    return wrapper
@@ -1,3 +1,5 @@
+import random
+
 # https://docs.google.com/spreadsheet/ccc?key=0Annwjrq9JeBldGQ3aEFRakpJeGtISUVpTnpJRl92dUE&usp=drive_web#gid=0
 KEYSPACE = list(
     set(
@@ -56,3 +58,38 @@ KEYSPACES = {
 
 def select_queue(_):
     return Queue.ONE_QUEUE
+
+
+# lippukala tries 500 times per code, but we generate codes in rounds so this is plenty
+MAX_CODE_GENERATION_ROUNDS = 10
+
+
+def generate_codes(num_codes: int) -> list[str]:
+    """
+    Generates numeric codes that are not used by any lippukala code yet.
+
+    lippukala generates codes in Code.save and checks each of them for collisions
+    separately. This checks a whole round of codes in one query so that codes for
+    Code.objects.bulk_create can be generated in bulk.
+    """
+    from django.conf import settings
+    from lippukala.models import Code
+
+    min_digits = settings.LIPPUKALA_CODE_MIN_N_DIGITS
+    max_digits = settings.LIPPUKALA_CODE_MAX_N_DIGITS
+    codes: set[str] = set()
+
+    for _round in range(MAX_CODE_GENERATION_ROUNDS):
+        candidates = set()
+        while len(candidates) < num_codes - len(codes):
+            num_digits = random.randint(min_digits, max_digits)
+            candidates.add(str(random.randint(10 ** (num_digits - 1), 10**num_digits - 1)))
+
+        candidates -= codes
+        candidates -= set(Code.objects.filter(code__in=candidates).values_list("code", flat=True))
+        codes |= candidates
+
+        if len(codes) == num_codes:
+            return list(codes)
+
+    raise ValueError("Unable to find unused codes. Is the keyspace exhausted?")
@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.core.management import BaseCommand, CommandError
+
+from core.models import Event
+
+from ...models import Order
+
+
+class Command(BaseCommand):
+    help = "Mark orders paid by reference number (eg. when reconciling bank transfers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_slug", metavar="EVENT_SLUG")
+        parser.add_argument("reference_numbers", nargs="+", metavar="REFERENCE_NUMBER")
+        parser.add_argument(
+            "--payment-date",
+            type=date.fromisoformat,
+            default=None,
+            help="Default: today (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--no-email",
+            action="store_false",
+            dest="send_email",
+            default=True,
+            help="Do not send payment confirmation messages",
+        )
+
+    def handle(self, *args, **options):
+        event = Event.objects.get(slug=options["event_slug"])
+        reference_numbers = set(options["reference_numbers"])
+
+        orders = list(
+            Order.objects.filter(event=event, reference_number__in=reference_numbers).select_related(
+                "customer",
+                "event__ticketseventmeta",
+            )
+        )
+
+        if missing := reference_numbers - {order.reference_number for order in orders}:
+            raise CommandError(f"Orders not found: {', '.join(sorted(missing))}")
+
+        try:
+            Order.confirm_payments(
+                orders,
+                payment_date=options["payment_date"],
+                send_email=options["send_email"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        self.stdout.write(f"{event.slug}: confirmed payment of {len(orders)} orders")
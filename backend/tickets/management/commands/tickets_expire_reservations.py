@@ -0,0 +1,36 @@
+from django.core.management import BaseCommand
+from django.db.models import Q
+from django.utils.timezone import now
+
+from core.models import Event
+
+from ...models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel orders that have not been paid within the reservation period of the event, "
+        "releasing the products they have reserved"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "event_slugs",
+            nargs="*",
+            metavar="EVENT_SLUG",
+            help="Default: all events with ticket sales open",
+        )
+
+    def handle(self, *args, **options):
+        if event_slugs := options["event_slugs"]:
+            events = Event.objects.filter(slug__in=event_slugs, ticketseventmeta__isnull=False)
+        else:
+            t = now()
+            events = Event.objects.filter(
+                Q(ticketseventmeta__ticket_sales_ends__gt=t) | Q(ticketseventmeta__ticket_sales_ends__isnull=True),
+                ticketseventmeta__ticket_sales_starts__lte=t,
+            )
+
+        for event in events:
+            num_cancelled = Order.cancel_expired_reservations(event)
+            self.stdout.write(f"{event.slug}: cancelled {num_cancelled} expired reservations")
@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand
+from tabulate import tabulate
+
+from ...models import LimitGroup
+
+
+class Command(BaseCommand):
+    help = "Re-derive the amounts sold of limit groups from orders and fix them if they have drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_slugs", nargs="*", metavar="EVENT_SLUG", help="Default: all events")
+
+    def handle(self, *args, **options):
+        limit_groups = LimitGroup.objects.select_related("event")
+        if event_slugs := options["event_slugs"]:
+            limit_groups = limit_groups.filter(event__slug__in=event_slugs)
+
+        drifted = LimitGroup.reconcile(limit_groups)
+
+        if not drifted:
+            self.stdout.write("No drift found")
+            return
+
+        self.stdout.write(
+            tabulate(
+                [
+                    (
+                        limit_group.event.slug,
+                        limit_group.description,
+                        old_amount_sold,
+                        limit_group.cached_amount_sold,
+                    )
+                    for limit_group, old_amount_sold in drifted
+                ],
+                headers=["event", "limit group", "was", "now"],
+            )
+        )
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_cached_amount_sold(apps, schema_editor):
+    LimitGroup = apps.get_model("tickets", "LimitGroup")
+
+    limit_groups = LimitGroup.objects.annotate(
+        actual_amount_sold=Coalesce(
+            models.Sum(
+                "product__order_product_set__count",
+                filter=models.Q(
+                    product__order_product_set__order__confirm_time__isnull=False,
+                    product__order_product_set__order__cancellation_time__isnull=True,
+                ),
+            ),
+            0,
+        )
+    )
+
+    for limit_group in limit_groups:
+        limit_group.cached_amount_sold = limit_group.actual_amount_sold
+
+    LimitGroup.objects.bulk_update(limit_groups, ["cached_amount_sold"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tickets", "0039_alter_ticketseventmeta_terms_and_conditions_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="limitgroup",
+            name="cached_amount_sold",
+            field=models.IntegerField(
+                default=0,
+                help_text=(
+                    "Total count of products in this limit group in confirmed, non-cancelled orders. "
+                    "Maintained by the order workflow; fix with manage.py tickets_reconcile_inventory if it drifts."
+                ),
+                verbose_name="Amount sold",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticketseventmeta",
+            name="reservation_seconds",
+            field=models.IntegerField(
+                default=1800,
+                help_text=(
+                    "This is how long the customer has after confirmation to complete the payment. "
+                    "Unpaid orders with an unfinished online payment are cancelled after this by "
+                    "manage.py tickets_expire_reservations."
+                ),
+                verbose_name="Reservation period (seconds)",
+            ),
+        ),
+        migrations.RunPython(populate_cached_amount_sold, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tickets", "0040_limitgroup_cached_amount_sold"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticketseventmeta",
+            name="max_active_buyers",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="If set, at most this many customers may use the ticket shop at once. Other customers are placed in a queue and let in as others finish their orders.",
+                null=True,
+                verbose_name="Maximum number of active buyers",
+            ),
+        ),
+    ]
@@ -1,10 +1,12 @@
 import logging
-from functools import cached_property
+from collections.abc import Mapping
 from typing import TYPE_CHECKING
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 
+from ..exceptions import SoldOut
 from .consts import LOW_AVAILABILITY_THRESHOLD
 
 if TYPE_CHECKING:
@@ -23,6 +25,15 @@ class LimitGroup(models.Model):
     description = models.CharField(max_length=255, verbose_name=_("Description"))
     limit = models.IntegerField(verbose_name=_("Maximum amount to sell"))
 
+    cached_amount_sold = models.IntegerField(
+        default=0,
+        verbose_name=_("Amount sold"),
+        help_text=_(
+            "Total count of products in this limit group in confirmed, non-cancelled orders. "
+            "Maintained by the order workflow; fix with manage.py tickets_reconcile_inventory if it drifts."
+        ),
+    )
+
     def __str__(self):
         return f"{self.description} ({self.amount_available}/{self.limit})"
 
@@ -30,23 +41,9 @@ class LimitGroup(models.Model):
         verbose_name = _("limit group")
         verbose_name_plural = _("limit groups")
 
-    @cached_property
+    @property
     def amount_sold(self):
-        from .order_product import OrderProduct
-
-        amount_sold = OrderProduct.objects.filter(
-            product__limit_groups=self,
-            order__confirm_time__isnull=False,
-            order__cancellation_time__isnull=True,
-        ).aggregate(models.Sum("count"))["count__sum"]
-
-        return amount_sold if amount_sold is not None else 0
-
-    def refresh_from_db(self, *args, **kwargs):
-        super().refresh_from_db(*args, **kwargs)
-
-        # invalidate cached properties
-        self.__dict__.pop("amount_sold", None)
+        return self.cached_amount_sold
 
     @property
     def amount_available(self):
@@ -69,6 +66,75 @@ class LimitGroup(models.Model):
         else:
             return ""
 
+    @classmethod
+    def reserve(cls, amounts: Mapping[int, int], force: bool = False):
+        """
+        Atomically adds the amounts to the amounts sold of the limit groups (limit group id -> amount).
+        Negative amounts release.
+
+        Unless `force` is given, raises SoldOut if any limit group would go over its limit,
+        leaving all of the limit groups untouched. The check and the increment are a single
+        conditional UPDATE, so concurrent buyers cannot oversell.
+        """
+        with transaction.atomic():
+            # always update in the same order to avoid deadlocks between concurrent orders
+            for limit_group_id, amount in sorted(amounts.items()):
+                if amount == 0:
+                    continue
+
+                queryset = cls.objects.filter(id=limit_group_id)
+                if amount > 0 and not force:
+                    queryset = queryset.filter(cached_amount_sold__lte=models.F("limit") - amount)
+
+                if not queryset.update(cached_amount_sold=models.F("cached_amount_sold") + amount):
+                    raise SoldOut(limit_group_id)
+
+    @classmethod
+    def release(cls, amounts: Mapping[int, int]):
+        cls.reserve({limit_group_id: -amount for limit_group_id, amount in amounts.items()}, force=True)
+
+    @classmethod
+    def get_actual_amounts_sold(cls, queryset: models.QuerySet["LimitGroup"]) -> dict[int, int]:
+        """
+        Derives the amounts sold from the order products the hard way. Used for reconciliation.
+        """
+        return dict(
+            queryset.annotate(
+                actual_amount_sold=Coalesce(
+                    models.Sum(
+                        "product__order_product_set__count",
+                        filter=models.Q(
+                            product__order_product_set__order__confirm_time__isnull=False,
+                            product__order_product_set__order__cancellation_time__isnull=True,
+                        ),
+                    ),
+                    0,
+                )
+            ).values_list("id", "actual_amount_sold")
+        )
+
+    @classmethod
+    def reconcile(cls, queryset: models.QuerySet["LimitGroup"]) -> list[tuple["LimitGroup", int]]:
+        """
+        Resets the cached amounts sold of the limit groups to those derived from order products.
+        Returns the limit groups that had drifted along with their old cached amounts sold.
+        """
+        drifted = []
+
+        with transaction.atomic():
+            limit_groups = list(queryset.select_for_update(of=("self",)).order_by("id"))
+            actual_amounts_sold = cls.get_actual_amounts_sold(cls.objects.filter(id__in=[lg.id for lg in limit_groups]))
+
+            for limit_group in limit_groups:
+                actual_amount_sold = actual_amounts_sold[limit_group.id]
+                if limit_group.cached_amount_sold != actual_amount_sold:
+                    drifted.append((limit_group, limit_group.cached_amount_sold))
+                    limit_group.cached_amount_sold = actual_amount_sold
+
+            cls.objects.bulk_update([limit_group for limit_group, _ in drifted], ["cached_amount_sold"])
+
+        return drifted
+
     @classmethod
     def get_or_create_dummies(cls):
         from core.models import Event
@@ -1,4 +1,8 @@
+import hashlib
+import json
 import logging
+from collections import Counter
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from datetime import time as dtime
@@ -6,8 +10,10 @@ from typing import TYPE_CHECKING
 
 from dateutil.tz import tzlocal
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.mail import EmailMessage
-from django.db import connection, models
+from django.db import connection, models, transaction
 from django.template.loader import render_to_string
 from django.utils import timezone, translation
 from django.utils.translation import gettext_lazy as _
@@ -16,8 +22,10 @@ from pkg_resources import resource_string
 from core.models.event import Event
 from core.utils import url
 
+from ..exceptions import OrderCancelled, SoldOut
 from ..utils import append_reference_number_checksum, format_date, format_price
 from .consts import LANGUAGE_CHOICES, UNPAID_CANCEL_HOURS
+from .limit_group import LimitGroup
 from .tickets_event_meta import TicketsEventMeta
 
 if TYPE_CHECKING:
@@ -26,6 +34,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("kompassi")
 
+# bump this when changes to lippukala or its settings change the rendered e-tickets
+ETICKETS_PDF_VERSION = 1
+
 
 @dataclass
 class ArrivalsRow:
@@ -149,46 +160,140 @@ class Order(models.Model):
     def clean_up_order_products(self):
         self.order_product_set.filter(count__lte=0).delete()
 
+    def get_limit_group_amounts(self) -> Counter[int]:
+        """
+        Returns the amount this order takes from each limit group (limit group id -> amount).
+        """
+        amounts: Counter[int] = Counter()
+        for op in self.order_product_set.filter(count__gt=0).prefetch_related("product__limit_groups"):
+            for limit_group in op.product.limit_groups.all():
+                amounts[limit_group.id] += op.count
+        return amounts
+
+    @transaction.atomic
     def confirm_order(self):
+        """
+        Reserves the products of the order from their limit groups and confirms the order.
+        Raises SoldOut if there is not enough of them left, in which case nothing is changed.
+        """
         if not self.customer:
             raise ValueError("Customer not set")
         if self.is_confirmed:
             raise ValueError("Already confirmed")
 
         self.clean_up_order_products()
+        LimitGroup.reserve(self.get_limit_group_amounts())
 
         self.reference_number = self._make_reference_number()
         self.confirm_time = timezone.now()
         self.save()
 
+    @classmethod
+    def lock_for_payment(cls, orders: list["Order"]):
+        """
+        Locks the orders for marking them paid and refreshes their state from the database.
+        Must be called in a transaction.
+
+        An order that has been cancelled in the meantime (eg. its reservation expired while the customer
+        was paying) gets its products reserved again and is reinstated. If they have been sold out since,
+        raises OrderCancelled and the payment needs to be refunded.
+        """
+        states = {
+            order_id: state
+            for order_id, *state in cls.objects.select_for_update()
+            .filter(id__in=[order.id for order in orders])
+            .order_by("id")
+            .values_list("id", "confirm_time", "payment_date", "cancellation_time")
+        }
+
+        for order in orders:
+            order.confirm_time, order.payment_date, order.cancellation_time = states[order.id]
+
+            if not order.is_confirmed:
+                raise ValueError(f"Order {order.formatted_order_number} must be confirmed to pay")
+            if order.is_paid:
+                raise ValueError(f"Order {order.formatted_order_number} is already paid")
+
+        for order in orders:
+            if order.is_cancelled:
+                try:
+                    LimitGroup.reserve(order.get_limit_group_amounts())
+                except SoldOut as e:
+                    raise OrderCancelled(order.id) from e
+
+                logger.info("Reinstating cancelled order %s for late payment", order.formatted_order_number)
+                order.cancellation_time = None
+
     def confirm_payment(self, payment_date=None, send_email=True):
-        if not self.is_confirmed:
-            raise ValueError("Must be confirmed to pay")
-        if self.is_paid:
-            raise ValueError("Already paid")
+        if payment_date is None:
+            payment_date = date.today()
+
+        with transaction.atomic():
+            self.lock_for_payment([self])
+            self.payment_date = payment_date
+            self.save()
+
+            if "lippukala" in settings.INSTALLED_APPS:
+                self.lippukala_create_codes()
+
+        if send_email:
+            # renders and caches the e-tickets as a side effect
+            self.send_confirmation_message("payment_confirmation")
+        elif self.contains_electronic_tickets:
+            self.prerender_etickets_pdf()
+
+    @classmethod
+    def confirm_payments(cls, orders: Iterable["Order"], payment_date=None, send_email=True) -> list["Order"]:
+        """
+        Batch version of confirm_payment for bank transfer reconciliation and the like.
+        Marks the orders paid and creates their e-ticket codes in one transaction.
+        Confirmation messages are sent after the transaction has been committed.
+        """
+        orders = list(orders)
 
         if payment_date is None:
             payment_date = date.today()
 
-        self.payment_date = payment_date
+        with transaction.atomic():
+            cls.lock_for_payment(orders)
 
-        self.save()
+            # cancelled orders have been reinstated by lock_for_payment
+            cls.objects.filter(id__in=[order.id for order in orders]).update(
+                payment_date=payment_date,
+                cancellation_time=None,
+            )
+            for order in orders:
+                order.payment_date = payment_date
+
+            if "lippukala" in settings.INSTALLED_APPS:
+                cls.lippukala_create_codes_for_orders(orders)
 
-        if "lippukala" in settings.INSTALLED_APPS:
-            self.lippukala_create_codes()
+                if not send_email:
+                    for order in orders:
+                        if order.contains_electronic_tickets:
+                            order.prerender_etickets_pdf()
 
         if send_email:
-            self.send_confirmation_message("payment_confirmation")
+            # renders and caches the e-tickets as a side effect
+            for order in orders:
+                order.send_confirmation_message("payment_confirmation")
+
+        return orders
 
     def cancel(self, send_email=True):
         if not self.is_confirmed:
             raise ValueError("Must be confirmed to cancel")
 
-        if "lippukala" in settings.INSTALLED_APPS:
-            self.lippukala_revoke_codes()
+        with transaction.atomic():
+            if "lippukala" in settings.INSTALLED_APPS:
+                self.lippukala_revoke_codes()
+                self.invalidate_etickets_pdf()
 
-        self.cancellation_time = timezone.now()
-        self.save()
+            if not self.is_cancelled:
+                LimitGroup.release(self.get_limit_group_amounts())
+
+            self.cancellation_time = timezone.now()
+            self.save()
 
         if send_email:
             self.send_confirmation_message("cancellation_notice")
@@ -197,11 +302,16 @@ class Order(models.Model):
         if not self.is_cancelled:
             raise ValueError("Must be cancelled to uncancel")
 
-        if "lippukala" in settings.INSTALLED_APPS:
-            self.lippukala_reinstate_codes()
+        with transaction.atomic():
+            if "lippukala" in settings.INSTALLED_APPS:
+                self.lippukala_reinstate_codes()
+                self.invalidate_etickets_pdf()
 
-        self.cancellation_time = None
-        self.save()
+            # admins may reinstate orders even if that oversells
+            LimitGroup.reserve(self.get_limit_group_amounts(), force=True)
+
+            self.cancellation_time = None
+            self.save()
 
         if send_email:
             self.send_confirmation_message("uncancellation_notice")
@@ -276,35 +386,95 @@ class Order(models.Model):
         if "lippukala" not in settings.INSTALLED_APPS:
             raise NotImplementedError("lippukala is not installed")
 
-        if not self.contains_electronic_tickets:
-            return
+        self.lippukala_create_codes_for_orders([self])
+
+    @classmethod
+    def lippukala_create_codes_for_orders(cls, orders: Iterable["Order"], batch_size: int = 500):
+        """
+        Creates lippukala orders and codes for the e-tickets of the orders using bulk_create
+        instead of one INSERT per code. Orders that already have a lippukala order are skipped.
+        """
+        if "lippukala" not in settings.INSTALLED_APPS:
+            raise NotImplementedError("lippukala is not installed")
 
         from lippukala.models import Code
         from lippukala.models import Order as LippukalaOrder
 
-        if not self.customer:
-            raise ValueError("Customer must be set")
+        from tickets.lippukala_integration import generate_codes
+
+        from .order_product import OrderProduct
 
-        lippukala_order, created = LippukalaOrder.objects.get_or_create(
-            reference_number=self.reference_number,
-            defaults=dict(
-                event=self.event.slug,
-                address_text=self.customer.name,
-                free_text=self.event.tickets_event_meta.ticket_free_text,
-            ),
+        orders = [order for order in orders if order.reference_number]
+        if not orders:
+            return
+
+        order_products_by_order_id: dict[int, list[OrderProduct]] = {}
+        for op in OrderProduct.objects.filter(
+            order__in=orders,
+            count__gt=0,
+            product__electronic_ticket=True,
+        ).select_related("product"):
+            order_products_by_order_id.setdefault(op.order_id, []).append(op)
+
+        existing_reference_numbers = set(
+            LippukalaOrder.objects.filter(
+                reference_number__in=[order.reference_number for order in orders],
+            ).values_list("reference_number", flat=True)
         )
 
-        if not created:
-            logger.debug("Lippukala order already exists")
+        orders = [
+            order
+            for order in orders
+            if order.id in order_products_by_order_id and order.reference_number not in existing_reference_numbers
+        ]
+        if not orders:
+            logger.debug("Lippukala orders already exist or there are no electronic tickets")
             return
 
-        for op in self.order_product_set.filter(count__gt=0, product__electronic_ticket=True):
-            for _i in range(op.count * op.product.electronic_tickets_per_product):
-                Code.objects.create(
-                    order=lippukala_order,
-                    prefix=self.lippukala_prefix,
-                    product_text=op.product.electronic_ticket_title,
+        for order in orders:
+            if not order.customer:
+                raise ValueError(f"Customer must be set on order {order.formatted_order_number}")
+
+        lippukala_orders = LippukalaOrder.objects.bulk_create(
+            [
+                LippukalaOrder(
+                    reference_number=order.reference_number,
+                    event=order.event.slug,
+                    address_text=order.customer.name,  # type: ignore
+                    free_text=order.event.tickets_event_meta.ticket_free_text,
                 )
+                for order in orders
+            ],
+            batch_size=batch_size,
+        )
+
+        # (lippukala order, prefix, product text) per code
+        tickets = [
+            (lippukala_order, order.lippukala_prefix, op.product.electronic_ticket_title)
+            for order, lippukala_order in zip(orders, lippukala_orders, strict=True)
+            for op in order_products_by_order_id[order.id]
+            for _i in range(op.count * op.product.electronic_tickets_per_product)
+        ]
+
+        codes = [
+            Code(
+                order=lippukala_order,
+                prefix=prefix,
+                product_text=product_text,
+                code=code,
+            )
+            for (lippukala_order, prefix, product_text), code in zip(
+                tickets,
+                generate_codes(len(tickets)),
+                strict=True,
+            )
+        ]
+
+        # bulk_create bypasses Code.save, so have lippukala spell out the codes like it would there
+        for code in codes:
+            code._generate_literate_code()
+
+        Code.objects.bulk_create(codes, batch_size=batch_size)
 
     def lippukala_revoke_codes(self):
         if "lippukala" not in settings.INSTALLED_APPS:
@@ -341,7 +511,60 @@ class Order(models.Model):
         except LippukalaOrder.DoesNotExist:
             return None
 
-    def get_etickets_pdf(self):
+    @property
+    def etickets_pdf_directory(self):
+        return f"tickets/etickets/{self.event.slug}/{self.id}"
+
+    def get_etickets_pdf_path(self, lippukala_order) -> str:
+        """
+        The rendered PDF only depends on the codes and the print settings, so it is stored under
+        a digest of them. Any change to the codes (such as revoking them) results in a new path.
+        """
+        meta = self.event.tickets_event_meta
+        codes = list(lippukala_order.code_set.order_by("id").values_list("id", "status", "code", "product_text"))
+        state = [
+            ETICKETS_PDF_VERSION,
+            lippukala_order.id,
+            lippukala_order.address_text,
+            lippukala_order.free_text,
+            meta.print_logo_path,
+            meta.print_logo_size_cm,
+            codes,
+        ]
+        digest = hashlib.sha256(json.dumps(state, default=str).encode("utf-8")).hexdigest()
+        return f"{self.etickets_pdf_directory}/{digest}.pdf"
+
+    def get_etickets_pdf(self) -> bytes:
+        """
+        Returns the e-tickets of the order as a PDF, rendering it only if it has not been
+        rendered for the current state of the codes yet.
+        """
+        if "lippukala" not in settings.INSTALLED_APPS:
+            raise NotImplementedError("lippukala not installed")
+
+        lippukala_order = self.lippukala_order
+        if lippukala_order is None:
+            return self.render_etickets_pdf(lippukala_order)
+
+        path = self.get_etickets_pdf_path(lippukala_order)
+
+        try:
+            if default_storage.exists(path):
+                with default_storage.open(path, "rb") as pdf_file:
+                    return pdf_file.read()
+        except Exception:
+            logger.exception("Failed to read cached e-tickets of order %s", self.formatted_order_number)
+
+        pdf = self.render_etickets_pdf(lippukala_order)
+
+        try:
+            default_storage.save(path, ContentFile(pdf))
+        except Exception:
+            logger.exception("Failed to cache e-tickets of order %s", self.formatted_order_number)
+
+        return pdf
+
+    def render_etickets_pdf(self, lippukala_order) -> bytes:
         if "lippukala" not in settings.INSTALLED_APPS:
             raise NotImplementedError("lippukala not installed")
 
@@ -353,10 +576,40 @@ class Order(models.Model):
             print_logo_path=meta.print_logo_path,
             print_logo_size_cm=meta.print_logo_size_cm,
         )
-        printer.process_order(self.lippukala_order)
+        printer.process_order(lippukala_order)
 
         return printer.finish()
 
+    def prerender_etickets_pdf(self):
+        """
+        Renders the e-tickets ahead of time so that downloading them is cheap.
+        Done in the background after the transaction has been committed. Without a background
+        worker, the e-tickets are rendered on the first download instead.
+        """
+        if "lippukala" not in settings.INSTALLED_APPS or "background_tasks" not in settings.INSTALLED_APPS:
+            return
+
+        from ..tasks import order_prerender_etickets_pdf
+
+        transaction.on_commit(lambda: order_prerender_etickets_pdf.delay(self.pk))  # type: ignore
+
+    def invalidate_etickets_pdf(self):
+        """
+        Removes rendered e-tickets of the order once the transaction has been committed.
+        Cached PDFs are keyed by the state of the codes, so this only cleans up stale files.
+        """
+        directory = self.etickets_pdf_directory
+
+        def _invalidate():
+            try:
+                _directories, filenames = default_storage.listdir(directory)
+                for filename in filenames:
+                    default_storage.delete(f"{directory}/{filename}")
+            except Exception:
+                logger.exception("Failed to remove cached e-tickets of order %s", self.formatted_order_number)
+
+        transaction.on_commit(_invalidate)
+
     def send_confirmation_message(self, msgtype):
         if "background_tasks" in settings.INSTALLED_APPS:
             from ..tasks import order_send_confirmation_message
@@ -461,13 +714,43 @@ class Order(models.Model):
     @classmethod
     def cancel_unpaid_orders(cls, event, hours=UNPAID_CANCEL_HOURS, send_email=False):
         orders = cls.get_unpaid_orders_to_cancel(event=event, hours=hours)
-        count = orders.count()
+        return cls._cancel_unpaid_orders(orders, send_email=send_email)
 
-        for order in orders:
-            order.cancel(send_email=send_email)
+    @classmethod
+    def _cancel_unpaid_orders(cls, orders: models.QuerySet["Order"], send_email=False):
+        count = 0
+
+        for order_id in list(orders.values_list("id", flat=True)):
+            with transaction.atomic():
+                # the order may have been paid since it was listed (see lock_for_payment)
+                order = orders.select_for_update().filter(id=order_id).first()
+                if order is None:
+                    continue
+
+                order.cancel(send_email=False)
+                count += 1
+
+            if send_email:
+                order.send_confirmation_message("cancellation_notice")
 
         return count
 
+    @classmethod
+    def cancel_expired_reservations(cls, event, send_email=False):
+        """
+        Cancels confirmed orders whose online payment has not gone through within the reservation period
+        of the event, releasing the products they have reserved.
+
+        Orders without a Checkout payment (eg. those paid by bank transfer) are left for cancel_unpaid_orders.
+        """
+        from payments.models import CheckoutPayment
+
+        reservation_hours = event.tickets_event_meta.reservation_seconds / 3600
+        orders = cls.get_unpaid_orders_to_cancel(event=event, hours=reservation_hours).filter(
+            reference_number__in=CheckoutPayment.objects.filter(event=event).exclude(status="ok").values("reference"),
+        )
+        return cls._cancel_unpaid_orders(orders, send_email=send_email)
+
     @staticmethod
     def get_arrivals_by_hour(event: Event | str):
         event_slug = event if isinstance(event, str) else event.slug
@@ -16,6 +16,23 @@ class OrderProduct(models.Model, CsvExportMixin):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="order_product_set")
     count = models.IntegerField(default=0)
 
+    # (product_id, count) as last loaded from or saved to the database, for maintaining LimitGroup.cached_amount_sold
+    _saved_values: tuple[int, int] | None = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "product_id" in instance.__dict__ and "count" in instance.__dict__:
+            instance._saved_values = (instance.product_id, instance.count)
+        return instance
+
+    @staticmethod
+    def get_limit_group_amounts(product_id: int, count: int) -> dict[int, int]:
+        limit_group_ids = Product.limit_groups.through.objects.filter(product_id=product_id).values_list(
+            "limitgroup_id", flat=True
+        )
+        return {limit_group_id: count for limit_group_id in limit_group_ids}
+
     @property
     def target(self):
         return self.product
@@ -32,6 +49,8 @@ class OrderProduct(models.Model, CsvExportMixin):
     def description(self):
         return "%dx %s" % (self.count, self.product.name if self.product is not None else None)
 
+    csv_prefetch_related = ("order", "product")
+
     @classmethod
     def get_csv_fields(cls, event):
         return [
@@ -44,7 +63,7 @@ class OrderProduct(models.Model, CsvExportMixin):
         ]
 
     @classmethod
-    def get_csv_header(cls, event, fields, m2m_mode):
+    def get_csv_header(cls, event, fields, m2m_mode, m2m_choices=None):
         return [
             "payment_date",
             "order_number",
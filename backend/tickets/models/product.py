@@ -1,4 +1,5 @@
 import logging
+from collections.abc import Iterable
 from functools import cached_property
 from typing import Any
 
@@ -79,14 +80,27 @@ class Product(models.Model):
 
     @property
     def amount_sold(self):
-        from .order_product import OrderProduct
+        # NOTE: A limit group is shared by several products, so this cannot be read from its counter.
+        # Not used when selling; use amount_available (which does read the counters) for that.
+        return self.get_amounts_sold([self.id]).get(self.id, 0)
 
-        cnt = OrderProduct.objects.filter(
-            product=self, order__confirm_time__isnull=False, order__cancellation_time__isnull=True
-        ).aggregate(models.Sum("count"))
+    @staticmethod
+    def get_amounts_sold(product_ids: Iterable[int]) -> dict[int, int]:
+        """
+        Returns the amounts sold of the products in confirmed, non-cancelled orders (product id -> amount).
+        """
+        from .order_product import OrderProduct
 
-        sm = cnt["count__sum"]
-        return sm if sm is not None else 0
+        return dict(
+            OrderProduct.objects.filter(
+                product_id__in=product_ids,
+                order__confirm_time__isnull=False,
+                order__cancellation_time__isnull=True,
+            )
+            .values("product_id")
+            .annotate(amount_sold=models.Sum("count"))
+            .values_list("product_id", "amount_sold")
+        )
 
     def __str__(self):
         return f"{self.name} ({self.formatted_price})"
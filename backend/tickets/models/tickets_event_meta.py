@@ -57,7 +57,9 @@ class TicketsEventMeta(ContactEmailMixin, EventMetaBase):
     reservation_seconds = models.IntegerField(
         verbose_name=_("Reservation period (seconds)"),
         help_text=_(
-            "This is how long the customer has after confirmation to complete the payment. NOTE: Currently unimplemented."
+            "This is how long the customer has after confirmation to complete the payment. "
+            "Unpaid orders with an unfinished online payment are cancelled after this by "
+            "manage.py tickets_expire_reservations."
         ),
         default=1800,
     )
@@ -137,6 +139,16 @@ class TicketsEventMeta(ContactEmailMixin, EventMetaBase):
 
     max_count_per_product = models.SmallIntegerField(blank=True, default=99)
 
+    max_active_buyers = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Maximum number of active buyers"),
+        help_text=_(
+            "If set, at most this many customers may use the ticket shop at once. "
+            "Other customers are placed in a queue and let in as others finish their orders."
+        ),
+    )
+
     tickets_view_version = models.CharField(
         max_length=max(len(key) for (key, _) in TICKETS_VIEW_VERSION_CHOICES),
         choices=TICKETS_VIEW_VERSION_CHOICES,
@@ -7,3 +7,11 @@ def order_send_confirmation_message(order_id: int, msgtype: str):
 
     order = Order.objects.get(pk=order_id)
     order._send_confirmation_message(msgtype)
+
+
+@shared_task(ignore_result=True)
+def order_prerender_etickets_pdf(order_id: int):
+    from .models import Order
+
+    order = Order.objects.get(pk=order_id)
+    order.get_etickets_pdf()
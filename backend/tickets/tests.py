@@ -1,6 +1,14 @@
+from dataclasses import replace
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import models
 from django.test import TestCase
+from django.utils.timezone import now
 
-from .models import LimitGroup, Order, Product
+from .admission import AdmissionQueue
+from .exceptions import OrderCancelled, SoldOut
+from .models import LimitGroup, Order, OrderProduct, Product
 
 
 class LimitGroupsTestCase(TestCase):
@@ -34,3 +42,270 @@ class LimitGroupsTestCase(TestCase):
         assert not weekend.in_stock
         assert not saturday.in_stock
         assert sunday.in_stock
+
+    def test_reserve(self):
+        limit_saturday, limit_sunday = LimitGroup.get_or_create_dummies()
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=weekend, count=4000)
+        order.confirm_order()
+
+        limit_saturday.refresh_from_db()
+        limit_sunday.refresh_from_db()
+        assert limit_saturday.amount_sold == 4000
+        assert limit_sunday.amount_sold == 4000
+
+        # saturday fits, sunday would exceed its limit
+        with self.assertRaises(SoldOut):
+            LimitGroup.reserve({limit_saturday.id: 500, limit_sunday.id: 1001})
+
+        # nothing was reserved
+        limit_saturday.refresh_from_db()
+        limit_sunday.refresh_from_db()
+        assert limit_saturday.amount_sold == 4000
+        assert limit_sunday.amount_sold == 4000
+
+        order.cancel(send_email=False)
+
+        limit_saturday.refresh_from_db()
+        assert limit_saturday.amount_sold == 0
+
+    def test_reconcile(self):
+        limit_saturday, limit_sunday = LimitGroup.get_or_create_dummies()
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=10)
+        order.confirm_order()
+
+        LimitGroup.objects.filter(id=limit_saturday.id).update(cached_amount_sold=42)
+
+        drifted = LimitGroup.reconcile(LimitGroup.objects.filter(event=order.event))
+        assert [(limit_group.id, old_amount_sold) for limit_group, old_amount_sold in drifted] == [
+            (limit_saturday.id, 42)
+        ]
+
+        limit_saturday.refresh_from_db()
+        assert limit_saturday.amount_sold == 10
+
+    def test_limit_groups_changed(self):
+        limit_saturday, limit_sunday = LimitGroup.get_or_create_dummies()
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=10)
+        order.confirm_order()
+
+        saturday.limit_groups.add(limit_sunday)
+        limit_sunday.refresh_from_db()
+        assert limit_sunday.amount_sold == 10
+
+        limit_sunday.product_set.remove(saturday)
+        limit_sunday.refresh_from_db()
+        assert limit_sunday.amount_sold == 0
+
+        saturday.limit_groups.clear()
+        limit_saturday.refresh_from_db()
+        assert limit_saturday.amount_sold == 0
+
+    def test_order_product_changed(self):
+        limit_saturday, limit_sunday = LimitGroup.get_or_create_dummies()
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order_product = order.order_product_set.create(product=saturday, count=10)
+        order.confirm_order()
+
+        # loaded without the product
+        order_product = OrderProduct.objects.only("id", "order", "count").get(id=order_product.id)
+        order_product.count = 12
+        order_product.save()
+        limit_saturday.refresh_from_db()
+        assert limit_saturday.amount_sold == 12
+
+        # constructed with an existing pk
+        OrderProduct(id=order_product.id, order=order, product=saturday, count=5).save()
+        limit_saturday.refresh_from_db()
+        assert limit_saturday.amount_sold == 5
+
+        OrderProduct.objects.get(id=order_product.id).delete()
+        limit_saturday.refresh_from_db()
+        assert limit_saturday.amount_sold == 0
+
+    def test_late_payment(self):
+        limit_saturday, limit_sunday = LimitGroup.get_or_create_dummies()
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=10)
+        order.confirm_order()
+        order.cancel(send_email=False)
+
+        # the products are still available, so the order is reinstated
+        order.confirm_payment(send_email=False)
+
+        order.refresh_from_db()
+        limit_saturday.refresh_from_db()
+        assert order.is_paid
+        assert not order.is_cancelled
+        assert limit_saturday.amount_sold == 10
+
+    def test_late_payment_sold_out(self):
+        limit_saturday, limit_sunday = LimitGroup.get_or_create_dummies()
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=10)
+        order.confirm_order()
+        order.cancel(send_email=False)
+
+        LimitGroup.objects.filter(id=limit_saturday.id).update(cached_amount_sold=models.F("limit"))
+
+        with self.assertRaises(OrderCancelled):
+            order.confirm_payment(send_email=False)
+
+        order.refresh_from_db()
+        assert not order.is_paid
+        assert order.is_cancelled
+
+    def test_cancel_expired_reservations(self):
+        from payments.models import CheckoutPayment
+
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=10)
+        order.confirm_order()
+        Order.objects.filter(id=order.id).update(confirm_time=now() - timedelta(days=1))
+
+        # no online payment started, so waiting for a bank transfer
+        assert Order.cancel_expired_reservations(order.event) == 0
+
+        CheckoutPayment.objects.create(
+            event=order.event,
+            reference=order.reference_number,
+            price_cents=order.price_cents,
+            items=[],
+            customer={},
+        )
+
+        assert Order.cancel_expired_reservations(order.event) == 1
+
+        order.refresh_from_db()
+        assert order.is_cancelled
+
+
+class AdmissionQueueTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_admission(self):
+        queue = AdmissionQueue(event_id=1, max_active_buyers=1, advance_seconds=0)
+
+        first = queue.check(None)
+        assert first.admitted
+        assert queue.check(first.token).admitted
+
+        second = queue.check(None)
+        third = queue.check(None)
+        assert not second.admitted
+        assert not third.admitted
+        assert third.ahead == 1
+
+        # a forged token must not get in
+        assert not queue.check(replace(third.token, slot=first.token.slot)).admitted
+
+        queue.release(first.token)
+
+        second = queue.check(second.token)
+        assert second.admitted
+        assert not queue.check(third.token).admitted
+
+
+class StatisticsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_product_statistics(self):
+        from .views.admin_views import get_order_statistics, get_product_statistics
+
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=10)
+        order.confirm_order()
+
+        rows = {row.product_id: row for row in get_product_statistics(order.event)}
+        assert rows[saturday.id].count == 10
+        assert rows[saturday.id].paid_count == 0
+        assert rows[saturday.id].cents == 10 * saturday.price_cents
+        assert rows[sunday.id].count == 0
+
+        assert get_order_statistics(order.event)["num_confirmed_orders"] == 1
+
+
+class ConfirmPaymentsTestCase(TestCase):
+    def test_confirm_payments(self):
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=2)
+        order.confirm_order()
+
+        Order.confirm_payments([order], send_email=False)
+
+        order.refresh_from_db()
+        assert order.is_paid
+
+        with self.assertRaises(ValueError):
+            Order.confirm_payments([order], send_email=False)
+
+    def test_confirm_payments_cancelled(self):
+        limit_saturday, limit_sunday = LimitGroup.get_or_create_dummies()
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=2)
+        order.confirm_order()
+        order.cancel(send_email=False)
+
+        LimitGroup.objects.filter(id=limit_saturday.id).update(cached_amount_sold=models.F("limit"))
+
+        with self.assertRaises(OrderCancelled):
+            Order.confirm_payments([order], send_email=False)
+
+        LimitGroup.objects.filter(id=limit_saturday.id).update(cached_amount_sold=0)
+
+        Order.confirm_payments([order], send_email=False)
+
+        order.refresh_from_db()
+        limit_saturday.refresh_from_db()
+        assert order.is_paid
+        assert not order.is_cancelled
+        assert limit_saturday.amount_sold == 2
+
+    def test_literate_codes(self):
+        from lippukala.models import Code
+
+        weekend, saturday, sunday = Product.get_or_create_dummies()
+
+        order, unused = Order.get_or_create_dummy()
+        order.order_product_set.create(product=saturday, count=2)
+        order.confirm_order()
+
+        Order.confirm_payments([order], send_email=False)
+
+        codes = list(Code.objects.filter(order__reference_number=order.reference_number))
+        assert len(codes) == 2
+
+        # the codes created in bulk must read the same as those created by Code.save
+        for code in codes:
+            code.delete()
+            reference = Code.objects.create(
+                order=code.order,
+                prefix=code.prefix,
+                product_text=code.product_text,
+                code=code.code,
+            )
+            assert reference.literate_code == code.literate_code
@@ -18,6 +18,7 @@ from .views import (
     tickets_admin_stats_view,
     tickets_admin_tools_view,
     tickets_confirm_view,
+    tickets_queue_status_view,
     tickets_router_view,
     tickets_thanks_view,
     tickets_tickets_view,
@@ -29,6 +30,11 @@ urlpatterns = [
         tickets_router_view,
         name="tickets_welcome_view",
     ),
+    re_path(
+        r"events/(?P<event_slug>[a-z0-9-]+)/tickets/queue/status/?$",
+        tickets_queue_status_view,
+        name="tickets_queue_status_view",
+    ),
     re_path(
         r"events/(?P<event_slug>[a-z0-9-]+)/tickets/products/?$",
         tickets_tickets_view,
@@ -14,6 +14,7 @@ from .admin_views import (
 from .tickets_admin_export_view import tickets_admin_export_view, tickets_admin_paulig_export_view
 from .tickets_admin_export_yearly_statistics_view import tickets_admin_export_yearly_statistics_view
 from .tickets_admin_reports_view import tickets_admin_reports_view
+from .tickets_queue_status_view import tickets_queue_status_view
 from .tickets_v1_5_views import tickets_router_view
 from .tickets_v1_views import (
     ALL_PHASES,
@@ -1,11 +1,13 @@
 import datetime
-from collections import defaultdict
+from dataclasses import dataclass
 
 from csp.decorators import csp_exempt
 from django.contrib import messages
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.core.paginator import EmptyPage, InvalidPage, Paginator
-from django.db.models import Q, Sum
+from django.db import connection
+from django.db.models import Count, Q
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.timezone import now
@@ -14,6 +16,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods, require_POST, require_safe
 from lippukala.consts import BEYOND_LOGIC, MANUAL_INTERVENTION_REQUIRED
 from lippukala.views import POSView
+from pkg_resources import resource_string
 
 from core.csv_export import CSV_EXPORT_FORMATS, csv_response
 from core.sort_and_filter import Filter
@@ -45,41 +48,81 @@ __all__ = [
     "tickets_admin_stats_view",
 ]
 
+PRODUCT_STATISTICS_QUERY = resource_string(__name__, "queries/product_statistics.sql").decode("utf-8")
+TICKETS_BY_DATE_QUERY = resource_string(__name__, "queries/tickets_by_date.sql").decode("utf-8")
+
+# short enough not to confuse admins, long enough to take the load off during sales rushes
+STATISTICS_CACHE_SECONDS = 30
+
+
+@dataclass
+class ProductStatisticsRow:
+    product_id: int
+    product_name: str
+    price_cents: int
+    count: int
+    paid_count: int
+
+    @property
+    def cents(self):
+        return self.count * self.price_cents
+
+    @property
+    def paid_cents(self):
+        return self.paid_count * self.price_cents
+
+
+def get_product_statistics(event) -> list[ProductStatisticsRow]:
+    key = f"tickets:product_statistics:{event.id}"
+    rows = cache.get(key)
+    if rows is None:
+        with connection.cursor() as cursor:
+            cursor.execute(PRODUCT_STATISTICS_QUERY, [event.id])
+            rows = [ProductStatisticsRow(*row) for row in cursor.fetchall()]
+        cache.set(key, rows, STATISTICS_CACHE_SECONDS)
+    return rows
+
+
+def get_order_statistics(event) -> dict[str, int]:
+    key = f"tickets:order_statistics:{event.id}"
+    counts = cache.get(key)
+    if counts is None:
+        counts = event.order_set.filter(confirm_time__isnull=False).aggregate(
+            num_confirmed_orders=Count("id"),
+            num_cancelled_orders=Count("id", filter=Q(cancellation_time__isnull=False)),
+            num_paid_orders=Count("id", filter=Q(cancellation_time__isnull=True, payment_date__isnull=False)),
+        )
+        cache.set(key, counts, STATISTICS_CACHE_SECONDS)
+    return counts
+
+
+def get_tickets_by_date(event) -> dict[datetime.date, int]:
+    key = f"tickets:tickets_by_date:{event.id}"
+    tickets_by_date = cache.get(key)
+    if tickets_by_date is None:
+        with connection.cursor() as cursor:
+            cursor.execute(TICKETS_BY_DATE_QUERY, [event.id, "%lippu%"])
+            tickets_by_date = dict(cursor.fetchall())
+        cache.set(key, tickets_by_date, STATISTICS_CACHE_SECONDS)
+    return tickets_by_date
+
 
 @tickets_admin_required
 def tickets_admin_stats_view(request, vars, event):
-    confirmed_orders = event.order_set.filter(confirm_time__isnull=False)
-    cancelled_orders = confirmed_orders.filter(cancellation_time__isnull=False)
-    paid_orders = confirmed_orders.filter(cancellation_time__isnull=True, payment_date__isnull=False)
-
     data = []
     total_cents = 0
     total_paid_cents = 0
 
-    for product in event.product_set.all():
-        soldop_set = product.order_product_set.filter(
-            order__confirm_time__isnull=False, order__cancellation_time__isnull=True
-        )
-        paidop_set = soldop_set.filter(order__payment_date__isnull=False)
-
-        count = soldop_set.aggregate(count=Sum("count"))["count"]
-        count = count if count is not None else 0
-
-        paid_count = paidop_set.aggregate(count=Sum("count"))["count"]
-        paid_count = paid_count if paid_count is not None else 0
-
-        cents = count * product.price_cents
-        total_cents += cents
-
-        paid_cents = paid_count * product.price_cents
-        total_paid_cents += paid_cents
+    for row in get_product_statistics(event):
+        total_cents += row.cents
+        total_paid_cents += row.paid_cents
 
         item = dict(
-            product=product,
-            count=count,
-            cents=format_price(cents),
-            paid_count=paid_count,
-            paid_cents=format_price(paid_cents),
+            product_name=row.product_name,
+            count=row.count,
+            cents=format_price(row.cents),
+            paid_count=row.paid_count,
+            paid_cents=format_price(row.paid_cents),
         )
         data.append(item)
 
@@ -88,11 +131,9 @@ def tickets_admin_stats_view(request, vars, event):
 
     vars.update(
         data=data,
-        num_confirmed_orders=confirmed_orders.count(),
-        num_cancelled_orders=cancelled_orders.count(),
-        num_paid_orders=paid_orders.count(),
         total_price=total_price,
         total_paid_price=total_paid_price,
+        **get_order_statistics(event),
     )
 
     return render(request, "tickets_admin_stats_view.pug", vars)
@@ -100,32 +141,19 @@ def tickets_admin_stats_view(request, vars, event):
 
 @tickets_admin_required
 def tickets_admin_stats_by_date_view(request, vars, event, raw=False):
-    confirmed_orders = event.order_set.filter(
-        confirm_time__isnull=False,
-        cancellation_time__isnull=True,
-        order_product_set__product__name__contains="lippu",
-    ).distinct()
-    tickets_by_date = defaultdict(int)
-
-    for order in confirmed_orders:
-        date = order.confirm_time.date()
-
-        # XXX this deserves an "XXX"
-        for op in order.order_product_set.filter(product__name__contains="lippu").distinct():
-            tickets_by_date[date] += op.count
-
-    min_date = min(tickets_by_date.keys())
-    max_date = max(tickets_by_date.keys())
-
-    cur_date = min_date
+    tickets_by_date = get_tickets_by_date(event)
 
     tsv = list()
 
-    while cur_date <= max_date:
-        tickets = tickets_by_date[cur_date]
-        tsv.append(f"{cur_date.isoformat()}\t{tickets}")
+    if tickets_by_date:
+        cur_date = min(tickets_by_date.keys())
+        max_date = max(tickets_by_date.keys())
+
+        while cur_date <= max_date:
+            tickets = tickets_by_date.get(cur_date, 0)
+            tsv.append(f"{cur_date.isoformat()}\t{tickets}")
 
-        cur_date += datetime.timedelta(1)
+            cur_date += datetime.timedelta(1)
 
     tsv = "\n".join(tsv)
 
@@ -0,0 +1,18 @@
+select
+  p.id as product_id,
+  p.name as product_name,
+  p.price_cents,
+  coalesce(sum(op.count) filter (where o.id is not null), 0) as count,
+  coalesce(sum(op.count) filter (where o.payment_date is not null), 0) as paid_count
+from
+  tickets_product p
+  left join tickets_orderproduct op on op.product_id = p.id
+  left join tickets_order o on (
+    o.id = op.order_id
+    and o.confirm_time is not null
+    and o.cancellation_time is null
+  )
+where
+  p.event_id = %s
+group by p.id
+order by p.ordering asc, p.id asc;
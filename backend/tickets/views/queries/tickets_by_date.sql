@@ -0,0 +1,16 @@
+select
+  -- NOTE: dates are in UTC as they have always been in this report
+  (o.confirm_time at time zone 'UTC')::date as confirm_date,
+  sum(op.count) as tickets
+from
+  tickets_order o
+  join tickets_orderproduct op on o.id = op.order_id
+  join tickets_product p on op.product_id = p.id
+where
+  o.event_id = %s
+  and o.confirm_time is not null
+  and o.cancellation_time is null
+  -- XXX this deserves an "XXX"
+  and p.name like %s
+group by 1
+order by 1 asc;
@@ -0,0 +1,22 @@
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from ..admission import get_admission_queue_for_slug, load_token, save_token
+
+
+@never_cache
+@require_safe
+def tickets_queue_status_view(request, event_slug):
+    """
+    Polled by the queue page. Kept light on purpose: it does not touch the database
+    (apart from the cached event settings) nor the session.
+    """
+    queue = get_admission_queue_for_slug(event_slug)
+    if queue is None:
+        return JsonResponse(dict(admitted=True))
+
+    status = queue.check(load_token(request, queue.event_id))
+    response = JsonResponse(status.as_dict())
+    save_token(request, response, queue.event_id, status.token)
+    return response
@@ -11,14 +11,18 @@ from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_http_methods
 
 from core.utils import initialize_form
+from payments.helpers import redirect_to_checkout
 from payments.models.checkout_payment import CHECKOUT_PAYMENT_WALL_ORIGIN, CheckoutPayment
 
+from ..admission import release_admission
+from ..exceptions import SoldOut
 from ..forms import CustomerForm, OrderProductForm
-from ..helpers import tickets_event_required
+from ..helpers import tickets_admission_required, tickets_event_required
 from .tickets_v1_views import clear_order, get_order, set_order, tickets_welcome_view
 
 
 @tickets_event_required
+@tickets_admission_required
 @require_http_methods(["GET", "HEAD", "POST"])
 def tickets_router_view(request, event, *args, **kwargs):
     if event.tickets_event_meta.tickets_view_version == "v1.5":
@@ -60,8 +64,23 @@ def tickets_view(request, event):
             messages.error(request, _("Please select at least one product."))
             return render(request, "v1.5/tickets_view.pug", vars)
 
-        # TODO as OrderProductForm sets max_value, this should not be necessary
-        if any(op.product.amount_available < op.count for op in order_products):
+        try:
+            # savepoint so that a sold out product rolls back the order but not the outer transaction
+            with transaction.atomic():
+                order.save()
+
+                customer = customer_form.save(commit=False)
+                customer.order = order
+                customer.save()
+
+                for op in order_products:
+                    op.order = order
+                    op.save()
+
+                # reserves the products atomically, raises SoldOut if there is not enough of them left
+                order.confirm_order()
+        except SoldOut:
+            order.pk = None
             messages.error(
                 request,
                 _(
@@ -71,25 +90,14 @@ def tickets_view(request, event):
             )
             return render(request, "v1.5/tickets_view.pug", vars)
 
-        order.save()
         set_order(request, event, order)
-
-        customer = customer_form.save(commit=False)
-        customer.order = order
-        customer.save()
-
-        for op in order_products:
-            op.order = order
-            op.save()
-
-        order.confirm_order()
+        release_admission(request, event)
 
         payment = CheckoutPayment.from_order(order)
         payment.save()
 
     # does an API call to Paytrail so we need to do it after the transaction
-    result = payment.perform_create_payment_request(request)
-    return redirect(result["href"])
+    return redirect_to_checkout(request, payment)
 
 
 def tickets_confirmed_view(request, event, order):
@@ -138,8 +146,7 @@ def tickets_confirmed_view(request, event, order):
                     payment.save()
 
                     # does an API call to Paytrail so we need to do it after the transaction
-                    result = payment.perform_create_payment_request(request)
-                    return redirect(result["href"])
+                    return redirect_to_checkout(request, payment)
             case _:
                 messages.error(request, _("Please check the form."))
 
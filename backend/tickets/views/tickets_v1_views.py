@@ -8,6 +8,8 @@ from core.utils import initialize_form, url
 from payments.models.checkout_payment import CHECKOUT_PAYMENT_WALL_ORIGIN
 
 # XXX * imports
+from ..admission import release_admission
+from ..exceptions import SoldOut
 from ..forms import AccommodationInformationForm, CustomerForm, NullForm, OrderProductForm
 from ..helpers import (
     clear_order,
@@ -16,6 +18,7 @@ from ..helpers import (
     get_order,
     is_phase_completed,
     set_order,
+    tickets_admission_required,
     tickets_event_required,
 )
 from ..models import OrderProduct
@@ -46,6 +49,7 @@ def decorate(view_obj):
     """
 
     @tickets_event_required
+    @tickets_admission_required
     def wrapper(request, event, *args, **kwargs):
         return view_obj(request, event, *args, **kwargs)
 
@@ -337,15 +341,19 @@ class ConfirmPhase(Phase):
     def validate(self, request, event, form):
         errors = multiform_validate(form)
         order = get_order(request, event)
-        order_products = order.order_product_set.filter(count__gt=0)
 
-        if any(i.product.amount_available < i.count for i in order_products):
-            messages.error(
-                request,
-                _("We're sorry to inform you that a product you have selected has just been sold out."),
-            )
-            errors.append("soldout_confirm")
-            return errors
+        if request.POST.get("action") == "next" and not order.is_confirmed:
+            # Confirming reserves the products atomically, so this is where we find out if they are sold out.
+            # save() then sees the order confirmed.
+            try:
+                order.confirm_order()
+            except SoldOut:
+                messages.error(
+                    request,
+                    _("We're sorry to inform you that a product you have selected has just been sold out."),
+                )
+                errors.append("soldout_confirm")
+                return errors
 
         return []
 
@@ -373,16 +381,16 @@ class ConfirmPhase(Phase):
         return not order.is_confirmed
 
     def next(self, request, event):
+        from payments.helpers import redirect_to_checkout
         from payments.models import CheckoutPayment
 
         order = get_order(request, event)
+        release_admission(request, event)
 
         payment = CheckoutPayment.from_order(order)
         payment.save()
 
-        result = payment.perform_create_payment_request(request)
-
-        return redirect(result["href"])
+        return redirect_to_checkout(request, payment)
 
 
 # Confirm view needs to be able to redirect to Checkout payment wall, so this needs to be included in CSP.